@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# serve the hot read endpoints from backend/async_views.py
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,192 @@
+"""Async (ASGI) versions of the hot read endpoints.
+
+Under uvicorn/daphne these GET handlers run on the event loop and use the
+async ORM (``aiterator``/``acount``), so a slow client or a burst of
+polling no longer pins a worker thread per request. Writes and preflights
+are handed to the synchronous views in ``views.py`` unchanged.
+
+Django still executes each ORM query in its one sync thread, so
+``asyncio.gather`` in ``dashboard``/``daily_records`` mainly overlaps the
+waiting around the queries (cache, thread hand-offs) rather than the SQL
+itself. The payloads are built with the same serializers as the sync
+views and are byte-for-byte identical.
+
+``urls.py`` routes to these views when ``ASYNC_READ_VIEWS`` is on, which
+``asgi.py`` enables by default.
+"""
+import asyncio
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from gridapp.models import FaultFeedback, FaultReport, FieldActivity, ServerRoomEntry
+from gridapp.signals import dashboard_cache_key
+
+from . import views
+from .http_cache import cached_get
+from .pagination import InvalidCursor, akeyset_page, parse_page_size
+
+
+async def _delegate(view, request, *args, **kwargs):
+    """Run a synchronous view from ``views.py`` for anything that is not a GET."""
+    return await sync_to_async(view)(request, *args, **kwargs)
+
+
+def _json(data, status=200):
+    resp = JsonResponse(data, safe=False, status=status)
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+@csrf_exempt
+@cached_get('server_room')
+async def server_room(request):
+    if request.method != 'GET':
+        return await _delegate(views.server_room, request)
+    try:
+        qs = ServerRoomEntry.objects.select_related('staff').all()
+        out = [views._serialize_entry(e) async for e in qs.aiterator()]
+    except Exception:
+        out = []
+    return _json(out)
+
+
+@csrf_exempt
+@cached_get('fault_reports')
+async def fault_reports(request):
+    if request.method != 'GET':
+        return await _delegate(views.fault_reports, request)
+    try:
+        qs = views._filter_faults(FaultReport.objects.select_related('reported_by', 'assigned_to'), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('all') == '1':
+        try:
+            out = [views._serialize_fault(f, request) async for f in qs.aiterator()]
+        except Exception:
+            out = []
+        return _json(out)
+
+    try:
+        limit = parse_page_size(request.GET.get('limit'))
+        rows, next_cursor = await akeyset_page(
+            qs, ['date_reported', 'id'],
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+            key=lambda f: [f.date_reported.isoformat(), f.id],
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return _json({
+        'results': [views._serialize_fault(f, request) for f in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@csrf_exempt
+@cached_get('field_activities')
+async def field_activities(request):
+    if request.method != 'GET':
+        return await _delegate(views.field_activities, request)
+    try:
+        qs = FieldActivity.objects.select_related('staff').all()
+        out = [views._serialize_field_activity(f) async for f in qs.aiterator()]
+    except Exception:
+        out = []
+    return _json(out)
+
+
+async def _dashboard_snapshot(days):
+    dates = views._trend_dates(days)
+    metrics, active_faults = views._dashboard_querysets(dates)
+    metrics, active_faults = await asyncio.gather(_alist(metrics), active_faults.acount())
+    return views._dashboard_payload(dates, metrics, active_faults)
+
+
+async def _alist(qs):
+    return [row async for row in qs.aiterator()]
+
+
+@csrf_exempt
+async def dashboard(request):
+    if request.method != 'GET':
+        return await _delegate(views.dashboard, request)
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), views.DASHBOARD_MAX_DAYS)
+    except ValueError:
+        return JsonResponse({'error': 'invalid days'}, status=400)
+
+    key = await sync_to_async(dashboard_cache_key)(days)
+    data = await cache.aget(key)
+    if data is None:
+        try:
+            data = await _dashboard_snapshot(days)
+            await cache.aset(key, data, views.DASHBOARD_CACHE_TTL)
+        except DatabaseError:
+            return JsonResponse({'error': 'dashboard unavailable'}, status=503)
+    return _json(data)
+
+
+async def _authenticate(request):
+    """JWT check matching ``@permission_classes([IsAuthenticated])``; returns an error response or None."""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        return JsonResponse({'detail': str(e.detail)}, status=401)
+    if result is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    request.user = result[0]
+    return None
+
+
+async def _records_for(qs, serialize):
+    try:
+        return [serialize(row) async for row in qs.aiterator()]
+    except Exception:
+        return []
+
+
+@csrf_exempt
+async def daily_records(request):
+    """Async ``daily_records``: the three per-date lists are fetched concurrently."""
+    if request.method != 'GET':
+        return await _delegate(views.daily_records, request)
+    denied = await _authenticate(request)
+    if denied is not None:
+        return denied
+
+    qdate = request.GET.get('date') or datetime.date.today().isoformat()
+    sre_out, fa_out, faults_out = await asyncio.gather(
+        _records_for(
+            ServerRoomEntry.objects.select_related('staff').filter(date=qdate),
+            views._serialize_entry,
+        ),
+        _records_for(
+            FieldActivity.objects.select_related('staff').filter(date=qdate),
+            views._serialize_field_activity,
+        ),
+        _records_for(
+            FaultReport.objects.select_related('reported_by').filter(date_reported=qdate),
+            lambda f: views._serialize_daily_fault(f, request),
+        ),
+    )
+    return _json({'date': qdate, 'server_room_entries': sre_out, 'field_activities': fa_out, 'faults': faults_out})
+
+
+@csrf_exempt
+async def get_fault_feedbacks(request, fault_id):
+    if request.method != 'GET':
+        return await _delegate(views.get_fault_feedbacks, request, fault_id)
+    try:
+        qs = FaultFeedback.objects.filter(fault_id=fault_id)
+        out = [views._serialize_feedback(fb) async for fb in qs.aiterator()]
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+    return _json(out)
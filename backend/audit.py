@@ -0,0 +1,182 @@
+"""Batched, asynchronous audit log writer.
+
+``record`` stamps an entry with the current time and, once the caller's
+transaction commits, puts it on a bounded in-process queue instead of
+inserting it inside the request. An entry for a write that is rolled back is
+never queued, and no entry is written before the row it describes. A daemon
+thread drains the queue and writes entries with one ``bulk_create`` per
+batch: as soon as ``AUDIT_BATCH_SIZE`` entries are waiting, or
+``AUDIT_FLUSH_INTERVAL`` milliseconds after the first entry of a batch
+arrived. Whatever is still queued is written at interpreter exit.
+
+If a batch cannot be written (locked or unreachable database), its entries go
+to the write spool (backend/spool.py) under the ``audit_log`` resource and
+are replayed with the other spooled writes. When the queue is full the caller
+writes its entry itself, so a slow database slows requests down rather than
+losing entries. Entries still queued when a worker is killed outright are
+lost, at most one flush interval's worth.
+
+With ``AUDIT_ASYNC = False`` (the default under ``manage.py test``) every
+entry is written synchronously inside the caller's transaction, as before.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from gridapp.models import AuditLog
+
+from . import spool
+
+
+logger = logging.getLogger(__name__)
+
+AUDIT_ASYNC = getattr(settings, 'AUDIT_ASYNC', True)
+AUDIT_BATCH_SIZE = getattr(settings, 'AUDIT_BATCH_SIZE', 200)
+AUDIT_FLUSH_INTERVAL = getattr(settings, 'AUDIT_FLUSH_INTERVAL', 250)  # milliseconds
+AUDIT_QUEUE_SIZE = getattr(settings, 'AUDIT_QUEUE_SIZE', 10000)
+AUDIT_SHUTDOWN_TIMEOUT = 10  # seconds
+
+_STOP = object()
+
+
+class _Flush:
+    """Queue marker: the writer sets ``done`` once everything ahead of it is written."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class _Writer:
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=AUDIT_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                item = self.queue.get()
+                batch, markers = [], []
+                deadline = None
+                while item is not _STOP:
+                    if isinstance(item, _Flush):
+                        markers.append(item)
+                        break
+                    batch.append(item)
+                    if len(batch) >= AUDIT_BATCH_SIZE:
+                        break
+                    if deadline is None:
+                        deadline = time.monotonic() + AUDIT_FLUSH_INTERVAL / 1000
+                    try:
+                        item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    # drop a connection a failed batch left broken before reusing it
+                    close_old_connections()
+                    write(batch)
+                for marker in markers:
+                    marker.done.set()
+                if item is _STOP:
+                    return
+        finally:
+            connection.close()
+
+    def stop(self, timeout):
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error('audit writer: queue still full at shutdown, %d entries not written', self.queue.qsize())
+            return
+        self.thread.join(timeout)
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer():
+    global _writer, _writer_pid
+    with _writer_lock:
+        # a forked worker does not inherit the parent's thread
+        if _writer is None or _writer_pid != os.getpid():
+            _writer, _writer_pid = _Writer(), os.getpid()
+        return _writer
+
+
+def _payload(entry):
+    return {**entry, 'timestamp': entry['timestamp'].isoformat()}
+
+
+def write(entries):
+    """Insert ``entries`` (AuditLog field dicts) now; spool them if the database refuses."""
+    try:
+        # a savepoint, so a failure leaves a caller's transaction usable
+        with transaction.atomic():
+            AuditLog.objects.bulk_create([AuditLog(**entry) for entry in entries], batch_size=AUDIT_BATCH_SIZE)
+    except DatabaseError:
+        logger.warning('audit writer: database unavailable, spooling %d entries', len(entries), exc_info=True)
+        try:
+            spool.extend('audit_log', [_payload(entry) for entry in entries])
+        except Exception:
+            logger.exception('audit writer: could not spool %d entries: %r', len(entries), entries)
+        return
+    except Exception:
+        logger.exception('audit writer: dropped %d entries that could not be saved: %r', len(entries), entries)
+
+
+def _enqueue(entry):
+    try:
+        _get_writer().queue.put_nowait(entry)
+    except queue.Full:
+        write([entry])
+
+
+def record(action, model_name, object_id, user='system', changes=None, ip_address=None):
+    """Queue an audit entry once the current transaction commits; it is written within ``AUDIT_FLUSH_INTERVAL`` ms."""
+    entry = {
+        'action': action,
+        'model_name': model_name,
+        'object_id': object_id,
+        'user': user,
+        'changes': changes or {},
+        'ip_address': ip_address,
+        'timestamp': timezone.now(),
+    }
+    if not AUDIT_ASYNC:
+        write([entry])
+        return
+    transaction.on_commit(partial(_enqueue, entry))
+
+
+def flush(timeout=AUDIT_SHUTDOWN_TIMEOUT):
+    """Block until every entry queued so far is written (or spooled); False on timeout."""
+    if _writer is None or _writer_pid != os.getpid():
+        return True
+    marker = _Flush()
+    try:
+        _writer.queue.put(marker, timeout=timeout)
+    except queue.Full:
+        return False
+    return marker.done.wait(timeout)
+
+
+def stop(timeout=AUDIT_SHUTDOWN_TIMEOUT):
+    """Write what is queued and end the writer thread; the next ``record`` starts a new one."""
+    global _writer
+    with _writer_lock:
+        writer, _writer = (_writer, None) if _writer_pid == os.getpid() else (None, _writer)
+    if writer is not None:
+        writer.stop(timeout)
+
+
+atexit.register(stop)
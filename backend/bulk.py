@@ -0,0 +1,164 @@
+"""Bulk fault operations shared by the bulk endpoints and the background job runner.
+
+Ids are processed in chunks of ``BULK_BATCH_SIZE``. Called from a request
+(``progress=None``) the whole operation is one transaction, as before. Called
+from a job, each chunk commits on its own and ``progress.advance()`` is told
+how many ids were handled, so pollers see the counters move and a cancelled
+job keeps what it already committed.
+"""
+import contextlib
+from functools import partial
+
+from django.db import transaction
+
+from gridapp import history, rollups, search, signals
+from gridapp.models import AuditLog, FaultReport
+from gridapp.signals import invalidate_dashboard
+from gridapp.staff import resolve_one
+from gridapp.versions import bump
+
+
+BULK_BATCH_SIZE = 500
+BULK_UPDATE_FIELDS = ['status', 'resolution_remarks', 'assigned_to', 'severity']
+
+
+def normalize_ids(ids):
+    """Coerce client-supplied ids to unique ints, keeping their order. Raises ValueError."""
+    out = []
+    seen = set()
+    for raw in ids:
+        if isinstance(raw, bool):
+            raise ValueError(raw)
+        i = int(raw)
+        if i not in seen:
+            seen.add(i)
+            out.append(i)
+    return out
+
+
+def validate_updates(updates):
+    """Raise ValueError unless ``updates`` is a non-empty dict of updatable fields."""
+    if not updates or not isinstance(updates, dict):
+        raise ValueError('no updates provided')
+    invalid_fields = [k for k in updates.keys() if k not in BULK_UPDATE_FIELDS]
+    if invalid_fields:
+        raise ValueError(f'invalid fields: {", ".join(invalid_fields)}')
+
+
+def chunked(seq, size=None):
+    """Split ``seq`` into lists small enough for an ``id__in`` lookup."""
+    size = size or BULK_BATCH_SIZE
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _outer(progress):
+    return transaction.atomic() if progress is None else contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _deferred(progress):
+    if progress is not None:
+        yield
+        return
+    with rollups.deferred(), search.deferred(), signals.deferred():
+        yield
+
+
+def delete_faults(ids, user='system', ip_address=None, progress=None):
+    """Delete the faults in ``ids``; returns the set of ids that existed."""
+    existing = set()
+    # a request refreshes rollups, the search index and caches once at the end; a job after each committed chunk
+    with _outer(progress), _deferred(progress):
+        for chunk in chunked(ids):
+            with transaction.atomic(), rollups.deferred(), search.deferred(), signals.deferred():
+                found = set(FaultReport.objects.filter(id__in=chunk).values_list('id', flat=True))
+                # the last state of a deleted row, for point-in-time history
+                history.snapshot('FaultReport', found)
+                FaultReport.objects.filter(id__in=chunk).delete()
+                AuditLog.objects.bulk_create([
+                    AuditLog(
+                        action='DELETE',
+                        model_name='FaultReport',
+                        object_id=fault_id,
+                        user=user,
+                        changes={'deleted': True},
+                        ip_address=ip_address,
+                    )
+                    for fault_id in sorted(found)
+                ], batch_size=BULK_BATCH_SIZE)
+            existing |= found
+            if progress is not None:
+                progress.advance(len(chunk))
+    return existing
+
+
+def update_faults(ids, updates, user='system', ip_address=None, progress=None):
+    """Apply ``updates`` (already validated field names) to the faults in ``ids``.
+
+    Returns ``{id: 'updated' | 'unchanged' | 'not_found'}`` keyed by str(id).
+    """
+    updates = dict(updates)
+    assigned_staff = None
+    if updates.get('assigned_to'):
+        assigned_staff = resolve_one(updates['assigned_to'])
+        if assigned_staff is None:
+            # unknown staff: leave assignments untouched, as before
+            del updates['assigned_to']
+    plain_fields = [f for f in updates if f != 'assigned_to']
+
+    results = {str(i): 'not_found' for i in ids}
+    changed = 0
+    try:
+        with _outer(progress):
+            for chunk in chunked(ids):
+                with transaction.atomic():
+                    changed += _update_chunk(chunk, updates, plain_fields, assigned_staff, user, ip_address, results)
+                if progress is not None:
+                    progress.advance(len(chunk))
+    finally:
+        if changed:
+            # QuerySet.update() skips model signals
+            transaction.on_commit(invalidate_dashboard)
+            transaction.on_commit(partial(bump, 'fault_reports'))
+    return results
+
+
+def _update_chunk(chunk, updates, plain_fields, assigned_staff, user, ip_address, results):
+    # group rows by the exact set of fields that change so each group is one UPDATE
+    groups = {}
+    audit_entries = []
+    rows = FaultReport.objects.filter(id__in=chunk).values('id', 'assigned_to__name', *plain_fields)
+    for row in rows:
+        changes = {}
+        for field in plain_fields:
+            if row[field] != updates[field]:
+                changes[field] = {'old': row[field], 'new': updates[field]}
+        if 'assigned_to' in updates:
+            old_value = row['assigned_to__name']
+            new_value = assigned_staff.name if assigned_staff else None
+            if old_value != new_value:
+                changes['assigned_to'] = {'old': old_value, 'new': new_value}
+        if not changes:
+            results[str(row['id'])] = 'unchanged'
+            continue
+        results[str(row['id'])] = 'updated'
+        groups.setdefault(tuple(sorted(changes)), []).append(row['id'])
+        audit_entries.append(AuditLog(
+            action='BULK_UPDATE',
+            model_name='FaultReport',
+            object_id=row['id'],
+            user=user,
+            changes=changes,
+            ip_address=ip_address,
+        ))
+
+    for changed_fields, group_ids in groups.items():
+        values = {f: updates[f] for f in changed_fields if f != 'assigned_to'}
+        if 'assigned_to' in changed_fields:
+            values['assigned_to'] = assigned_staff
+        FaultReport.objects.filter(id__in=group_ids).update(**values)
+        if 'resolution_remarks' in values:
+            search.mark_dirty(FaultReport, *group_ids)
+    AuditLog.objects.bulk_create(audit_entries, batch_size=BULK_BATCH_SIZE)
+    return len(audit_entries)
@@ -0,0 +1,121 @@
+"""Delivery of stored files with HTTP validators, byte ranges and proxy offload.
+
+``serve_file`` answers conditional requests with 304, honours single
+``Range: bytes=`` requests with 206 (or 416), and guesses a real content
+type from the file name. With ``ATTACHMENT_OFFLOAD`` set, the worker only
+sends headers and the front proxy streams the bytes:
+
+    'x-accel-redirect'  nginx; ATTACHMENT_ACCEL_PREFIX must map to an
+                        ``internal`` location aliased to MEDIA_ROOT
+    'x-sendfile'        Apache mod_xsendfile / lighttpd (absolute path)
+"""
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+
+ATTACHMENT_OFFLOAD = getattr(settings, 'ATTACHMENT_OFFLOAD', '')
+ATTACHMENT_ACCEL_PREFIX = getattr(settings, 'ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Return ``(start, end)`` (inclusive) for a single byte range, ``None`` to ignore
+    the header, or ``False`` when the range cannot be satisfied."""
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        # absent, malformed or multi-range: serve the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(fh, start, length):
+    try:
+        fh.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = fh.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        fh.close()
+
+
+def serve_file(request, fieldfile, filename=None, disposition='inline'):
+    """Build the response for a stored file (a FieldFile or anything with name/storage)."""
+    storage = fieldfile.storage
+    name = fieldfile.name
+    filename = filename or name.split('/')[-1]
+    size = storage.size(name)
+    mtime = storage.get_modified_time(name)
+    last_modified = int(mtime.timestamp())
+    etag = '"%x-%x"' % (int(mtime.timestamp() * 1_000_000), size)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        if ATTACHMENT_OFFLOAD == 'x-accel-redirect':
+            # nginx handles ranges and conditionals itself
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = ATTACHMENT_ACCEL_PREFIX + quote(name)
+        elif ATTACHMENT_OFFLOAD == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = storage.path(name)
+        else:
+            response = _file_response(request, fieldfile, size, etag, content_type)
+        # the name is the uploader's; quotes, semicolons and non-ASCII are escaped here
+        response['Content-Disposition'] = content_disposition_header(disposition == 'attachment', filename)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _file_response(request, fieldfile, size, etag, content_type):
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and if_range and if_range != etag:
+        # the client's partial copy is stale; send the whole file instead
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    fh = fieldfile.storage.open(fieldfile.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+        response['Content-Length'] = str(size)
+        return response
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_iter_range(fh, start, length), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return response
@@ -0,0 +1,98 @@
+"""Conditional GET and response caching for the polled list endpoints.
+
+``cached_get`` derives a strong ETag and a Last-Modified date from the
+version stamps in gridapp/versions.py. A request carrying a matching
+validator gets a bodiless 304; otherwise the rendered body is served from
+the cache framework when one exists for the current versions.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from gridapp.versions import get_versions
+
+
+RESPONSE_CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+# headers replayed from a cached response; validators are recomputed
+_CACHED_HEADERS = ('Content-Type', 'Access-Control-Allow-Origin')
+
+
+def cached_get(*resources):
+    """Serve GETs of a view from validators/cache keyed on the versions of ``resources``.
+
+    Works on both plain and ``async def`` views; for the latter the cache
+    lookups run in a worker thread so the event loop is never blocked.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method != 'GET':
+                    return await view(request, *args, **kwargs)
+                hit, key, etag, last_modified = await sync_to_async(_lookup)(request, resources)
+                if hit is not None:
+                    return hit
+                response = await view(request, *args, **kwargs)
+                await sync_to_async(_store)(response, key, etag, last_modified)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            hit, key, etag, last_modified = _lookup(request, resources)
+            if hit is not None:
+                return hit
+            response = view(request, *args, **kwargs)
+            _store(response, key, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def _lookup(request, resources):
+    """Return ``(response or None, cache key, etag, last_modified)`` for a GET."""
+    versions = get_versions(resources)
+    etag = '"%s"' % hashlib.sha1(
+        ':'.join(f'{r}={v}' for r, v in zip(resources, versions)).encode('ascii')
+    ).hexdigest()
+    last_modified = max(versions) // 1_000_000_000
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _with_validators(not_modified, etag, last_modified), None, etag, last_modified
+
+    key = 'response:%s:%s' % (
+        hashlib.sha1(request.build_absolute_uri().encode('utf-8')).hexdigest(), etag.strip('"'),
+    )
+    hit = cache.get(key)
+    if hit is not None:
+        headers, content = hit
+        response = HttpResponse(content)
+        for name, value in headers.items():
+            response[name] = value
+        return _with_validators(response, etag, last_modified), key, etag, last_modified
+    return None, key, etag, last_modified
+
+
+def _store(response, key, etag, last_modified):
+    if response.status_code == 200 and not response.streaming:
+        headers = {h: response[h] for h in _CACHED_HEADERS if response.has_header(h)}
+        cache.set(key, (headers, response.content), RESPONSE_CACHE_TIMEOUT)
+        _with_validators(response, etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # let clients keep the body but always revalidate
+    response['Cache-Control'] = 'no-cache'
+    return response
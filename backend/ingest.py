@@ -0,0 +1,227 @@
+"""Batch ingest of server-room entries, visitors and field activities.
+
+A batch is a JSON array of the objects the single-row POST endpoints accept,
+or an NDJSON body with one object per line. Every row is validated up front
+and invalid ones are reported without stopping the rest. The staff names used
+by the valid rows are resolved through the staff cache (gridapp/staff.py)
+with at most one query, and the missing names are created with a single
+``bulk_create``. The rows are then inserted with ``bulk_create`` in chunks of
+``INGEST_BATCH_SIZE``, all in one transaction. ``bulk_create`` skips the
+model signals, so ``refresh`` updates rollups (which also drops the dashboard
+cache), the search index and response versions once for the whole batch.
+
+The write spool (backend/spool.py) replays its records through the same
+``clean``/``insert``/``refresh`` path.
+"""
+import datetime
+import json
+
+from django.conf import settings
+from django.db import transaction
+
+from gridapp import rollups, search
+from gridapp.models import FieldActivity, ServerRoomEntry, ServerRoomVisitor
+from gridapp.staff import get_or_create_many
+from gridapp.versions import bump_for_model
+
+
+INGEST_BATCH_SIZE = 500
+INGEST_MAX_ROWS = getattr(settings, 'INGEST_MAX_ROWS', 5000)
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+class TooManyRows(Exception):
+    pass
+
+
+# Field parsers: raw JSON value -> model value, raising ValueError on bad input
+
+def _date(value):
+    if not isinstance(value, str):
+        raise ValueError('expected a YYYY-MM-DD date')
+    return datetime.date.fromisoformat(value)
+
+
+def _optional_date(value):
+    return _date(value) if value else datetime.date.today()
+
+
+def _time(value):
+    if not isinstance(value, str):
+        raise ValueError('expected a HH:MM[:SS] time')
+    return datetime.time.fromisoformat(value)
+
+
+def _optional_time(value):
+    return _time(value) if value else None
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        raise ValueError('expected a string')
+    return str(value)
+
+
+def _char(max_length, blank=True):
+    def parse(value):
+        value = _text(value)
+        if not blank and not value.strip():
+            raise ValueError('may not be blank')
+        if len(value) > max_length:
+            raise ValueError(f'longer than {max_length} characters')
+        return value
+    return parse
+
+
+# resource -> (model, required fields, {field: parser}); a ``staff`` field holds a
+# staff name and is replaced by the Staff row on insert
+RESOURCES = {
+    'server_room': (
+        ServerRoomEntry,
+        ['staff', 'date', 'time_in', 'time_out', 'reason', 'equipment_touched', 'supervisor'],
+        {
+            'staff': _char(200, blank=False),
+            'date': _date,
+            'time_in': _time,
+            'time_out': _optional_time,
+            'reason': _text,
+            'equipment_touched': _text,
+            'supervisor': _char(200),
+        },
+    ),
+    'server_room_visitors': (
+        ServerRoomVisitor,
+        ['staff_id', 'name', 'purpose', 'time_in'],
+        {
+            'staff_id': _char(100, blank=False),
+            'name': _char(200, blank=False),
+            'purpose': _text,
+            'date': _optional_date,
+            'time_in': _time,
+            'time_out': _optional_time,
+        },
+    ),
+    'field_activities': (
+        FieldActivity,
+        ['staff', 'substation', 'date', 'time_out', 'time_returned', 'purpose', 'work_done',
+         'materials_used', 'supervisor_approval'],
+        {
+            'staff': _char(200, blank=False),
+            'substation': _char(200, blank=False),
+            'date': _date,
+            'time_out': _time,
+            'time_returned': _optional_time,
+            'purpose': _text,
+            'work_done': _text,
+            'materials_used': _text,
+            'supervisor_approval': _char(200),
+        },
+    ),
+}
+
+
+def parse_ndjson(lines, max_rows=None):
+    """Parse NDJSON ``lines`` (bytes or str); an unparsable line becomes a ValueError in its place."""
+    max_rows = INGEST_MAX_ROWS if max_rows is None else max_rows
+    rows = []
+    for line in lines:
+        if not line.strip():
+            continue
+        if len(rows) >= max_rows:
+            raise TooManyRows(max_rows)
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            rows.append(ValueError('invalid json'))
+    return rows
+
+
+def parse_body(request, max_rows=None):
+    """Rows of a batch request: NDJSON by content type, otherwise a JSON array.
+
+    Raises ValueError for a malformed JSON body and TooManyRows past ``max_rows``.
+    """
+    max_rows = INGEST_MAX_ROWS if max_rows is None else max_rows
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        # read line by line so a large upload is never held as one string
+        return parse_ndjson(request, max_rows)
+    rows = json.loads(request.body.decode('utf-8'))
+    if not isinstance(rows, list):
+        raise ValueError('expected a JSON array of objects')
+    if len(rows) > max_rows:
+        raise TooManyRows(max_rows)
+    return rows
+
+
+def clean(resource, rows):
+    """Validate ``rows``; returns ``(valid, errors)``.
+
+    ``valid`` is a list of ``(index, values)`` with parsed model values and
+    ``errors`` maps the index of each rejected row to ``{field: message}``.
+    """
+    _, required, parsers = RESOURCES[resource]
+    valid, errors = [], {}
+    for index, row in enumerate(rows):
+        if isinstance(row, Exception):
+            errors[index] = {'row': str(row)}
+            continue
+        if not isinstance(row, dict):
+            errors[index] = {'row': 'expected an object'}
+            continue
+        row_errors = {field: 'missing field' for field in required if field not in row}
+        values = {}
+        for field, parse in parsers.items():
+            if field in row_errors:
+                continue
+            try:
+                values[field] = parse(row.get(field))
+            except ValueError as e:
+                row_errors[field] = str(e)
+        if row_errors:
+            errors[index] = row_errors
+        else:
+            valid.append((index, values))
+    return valid, errors
+
+
+def insert(resource, rows):
+    """Insert cleaned ``rows`` (values dicts) in one transaction; returns the new instances in order.
+
+    Call ``refresh`` once the transaction has committed.
+    """
+    model = RESOURCES[resource][0]
+    with transaction.atomic():
+        if 'staff' in RESOURCES[resource][2]:
+            staff = get_or_create_many(row['staff'] for row in rows)
+            rows = [{**row, 'staff': staff[row['staff']]} for row in rows]
+        return model.objects.bulk_create([model(**row) for row in rows], batch_size=INGEST_BATCH_SIZE)
+
+
+def refresh(model, objs):
+    """Do what the post_save signals would have done for the bulk-created ``objs``."""
+    if not objs:
+        return
+    if model in rollups.ROLLUP_SOURCES:
+        rollups.refresh_days({getattr(o, rollups.ROLLUP_SOURCES[model][0]) for o in objs})
+    if model in search.SOURCES:
+        search.reindex(model, [o.pk for o in objs])
+    bump_for_model(model.__name__)
+
+
+def ingest(resource, rows):
+    """Validate and insert a batch; returns ``(created_count, per-row results)``.
+
+    Database errors propagate and nothing is inserted.
+    """
+    valid, errors = clean(resource, rows)
+    objs = insert(resource, [values for _, values in valid]) if valid else []
+    refresh(RESOURCES[resource][0], objs)
+
+    results = [None] * len(rows)
+    for (index, _), obj in zip(valid, objs):
+        results[index] = {'index': index, 'status': 'created', 'id': obj.pk}
+    for index, row_errors in errors.items():
+        results[index] = {'index': index, 'status': 'invalid', 'errors': row_errors}
+    return len(objs), results
@@ -0,0 +1,101 @@
+"""Endpoints for background jobs (see backend/jobs.py).
+
+    POST   /api/jobs/                  {"kind": ..., "params": {...}, "user": ...} -> 202 + status
+    GET    /api/jobs/?status=running   recent jobs
+    GET    /api/jobs/<id>/             status and progress, for polling
+    DELETE /api/jobs/<id>/             cancel a queued or running job
+    GET    /api/jobs/<id>/download/    the result file of a finished export
+"""
+import json
+
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+
+from gridapp.models import Job
+
+from . import jobs
+from .file_delivery import serve_file
+from .views import _get_client_ip, _job_accepted
+
+
+def _cors(resp, methods):
+    resp['Access-Control-Allow-Origin'] = '*'
+    resp['Access-Control-Allow-Methods'] = methods
+    resp['Access-Control-Allow-Headers'] = 'Content-Type'
+    return resp
+
+
+@csrf_exempt
+def job_list(request):
+    """Submit a job (POST) or list the most recent ones (GET, optional ?status=)"""
+    if request.method == 'OPTIONS':
+        return _cors(JsonResponse({'ok': True}), 'GET,POST,OPTIONS')
+
+    if request.method == 'GET':
+        qs = Job.objects.all()
+        if request.GET.get('status'):
+            qs = qs.filter(status=request.GET['status'])
+        out = [jobs.describe(job, request, with_result=False) for job in qs.defer('result')[:50]]
+        resp = JsonResponse(out, safe=False)
+        resp['Access-Control-Allow-Origin'] = '*'
+        return resp
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'error': 'invalid json'}, status=400)
+
+    params = data.get('params') or {}
+    if not isinstance(params, dict):
+        return JsonResponse({'error': 'params must be an object'}, status=400)
+    if data.get('kind', '').startswith('bulk_'):
+        params['ip_address'] = _get_client_ip(request)
+    try:
+        job = jobs.submit(data.get('kind', ''), params, user=data.get('user', 'system'))
+    except (KeyError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return _job_accepted(request, job)
+
+
+@csrf_exempt
+def job_detail(request, job_id):
+    """GET a job's status and progress; DELETE cancels it"""
+    if request.method == 'OPTIONS':
+        return _cors(JsonResponse({'ok': True}), 'GET,DELETE,OPTIONS')
+
+    try:
+        job = Job.objects.get(pk=job_id)
+    except Job.DoesNotExist:
+        return JsonResponse({'error': 'job not found'}, status=404)
+
+    if request.method == 'DELETE':
+        # a running job stops at its next progress update
+        Job.objects.filter(pk=job.pk, status__in=['queued', 'running']).update(
+            status='cancelled', finished_at=timezone.now(),
+        )
+        job.refresh_from_db()
+    elif request.method != 'GET':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    resp = JsonResponse(jobs.describe(job, request))
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+def job_download(request, job_id):
+    """Download the file produced by a finished job"""
+    try:
+        job = Job.objects.get(pk=job_id)
+    except Job.DoesNotExist:
+        return JsonResponse({'error': 'job not found'}, status=404)
+    if job.status != 'succeeded' or not job.result_file:
+        return JsonResponse({'error': 'no result available', 'status': job.status}, status=409)
+
+    filename = (job.result or {}).get('filename')
+    response = serve_file(request, job.result_file, filename=filename, disposition='attachment')
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
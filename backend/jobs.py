@@ -0,0 +1,261 @@
+"""Database-backed background jobs for long exports and bulk fault edits.
+
+A job is a ``gridapp.models.Job`` row. Endpoints ``submit`` it and answer
+202 straight away; ``manage.py run_jobs`` claims queued rows with a
+conditional UPDATE (so any number of runners can share the table, no broker
+needed) and executes them in a process pool. Handlers report progress through
+``Progress``, which writes the counters at most once per
+``JOB_PROGRESS_INTERVAL`` seconds; that write also serves as the heartbeat
+and is where a cancelled job notices it should stop.
+"""
+import datetime
+import os
+import tempfile
+import time
+import traceback
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.utils import timezone
+
+from gridapp.models import Job
+
+from . import bulk
+from .exports import iter_values, write_csv, write_xlsx
+
+
+JOB_SYNC_LIMIT = getattr(settings, 'JOB_SYNC_LIMIT', 2000)
+JOB_PROGRESS_INTERVAL = getattr(settings, 'JOB_PROGRESS_INTERVAL', 1.0)
+JOB_STALE_AFTER = getattr(settings, 'JOB_STALE_AFTER', 900)
+JOB_RETENTION_DAYS = getattr(settings, 'JOB_RETENTION_DAYS', 7)
+
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+# kind -> (validate(params) -> params, run(job, progress) -> result dict)
+HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def register(kind, validate):
+    def decorator(run):
+        HANDLERS[kind] = (validate, run)
+        return run
+    return decorator
+
+
+class Progress:
+    """Batched progress counter for a running job."""
+
+    def __init__(self, job, interval=None):
+        self.job_id = job.pk
+        self.total = None
+        self.done = 0
+        self.interval = JOB_PROGRESS_INTERVAL if interval is None else interval
+        self._flushed_at = time.monotonic()
+
+    def start(self, total):
+        self.total = total
+        self.flush()
+
+    def advance(self, n=1):
+        self.done += n
+        if time.monotonic() - self._flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self):
+        updated = Job.objects.filter(pk=self.job_id, status='running').update(
+            progress_done=self.done, progress_total=self.total, updated_at=timezone.now(),
+        )
+        self._flushed_at = time.monotonic()
+        if not updated:
+            raise JobCancelled()
+
+
+def submit(kind, params, user='system'):
+    """Validate ``params`` for ``kind`` and queue the job. Raises ValueError on bad input."""
+    if kind not in HANDLERS:
+        raise ValueError(f'unknown job kind {kind}')
+    validate, _ = HANDLERS[kind]
+    return Job.objects.create(kind=kind, params=validate(dict(params)), created_by=user)
+
+
+def describe(job, request=None, with_result=True):
+    """JSON-ready status of ``job``; URLs are absolute when ``request`` is given.
+
+    Lists pass ``with_result=False``: a bulk job's result holds one entry per id, and
+    the job's ``status_url`` has it.
+    """
+    def url(path):
+        return request.build_absolute_uri(path) if request is not None else path
+
+    out = {
+        'id': str(job.id),
+        'kind': job.kind,
+        'status': job.status,
+        'progress': {'done': job.progress_done, 'total': job.progress_total},
+        'created_by': job.created_by,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': url(f'/api/jobs/{job.id}/'),
+    }
+    if with_result and job.result is not None:
+        out['result'] = job.result
+    if job.error:
+        out['error'] = job.error
+    if job.result_file:
+        out['download_url'] = url(f'/api/jobs/{job.id}/download/')
+    return out
+
+
+def claim(limit):
+    """Mark up to ``limit`` of the oldest queued jobs as running; returns their ids."""
+    claimed = []
+    candidates = Job.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:limit]
+    for job_id in list(candidates):
+        # only one runner wins the queued -> running transition
+        if Job.objects.filter(pk=job_id, status='queued').update(status='running', started_at=timezone.now()):
+            claimed.append(job_id)
+    return claimed
+
+
+def requeue_stale():
+    """Put running jobs whose worker stopped reporting back in the queue."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=JOB_STALE_AFTER)
+    return Job.objects.filter(status='running', updated_at__lt=cutoff).update(status='queued', started_at=None)
+
+
+def fail(job_id, error):
+    Job.objects.filter(pk=job_id).exclude(status__in=FINISHED).update(
+        status='failed', error=error, finished_at=timezone.now(),
+    )
+
+
+def purge(days=None):
+    """Delete finished jobs (and their result files) older than ``days``."""
+    cutoff = timezone.now() - datetime.timedelta(days=JOB_RETENTION_DAYS if days is None else days)
+    count = 0
+    for job in Job.objects.filter(status__in=FINISHED, finished_at__lt=cutoff).iterator():
+        if job.result_file:
+            job.result_file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
+
+
+def run(job_id):
+    """Execute one claimed job; called in a pool worker."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        progress = Progress(job)
+        _, handler = HANDLERS[job.kind]
+        try:
+            result = handler(job, progress)
+            progress.flush()
+        except JobCancelled:
+            if job.result_file:
+                job.result_file.delete(save=False)
+            return 'cancelled'
+        Job.objects.filter(pk=job.pk, status='running').update(
+            status='succeeded',
+            result=result,
+            result_file=job.result_file.name or None,
+            finished_at=timezone.now(),
+        )
+        return 'succeeded'
+    except Exception:
+        fail(job_id, traceback.format_exc(limit=5))
+        return 'failed'
+    finally:
+        close_old_connections()
+
+
+# Exports -------------------------------------------------------------------
+
+def _validate_export(params):
+    from . import views
+    source = params.get('source')
+    if source not in views.EXPORT_SOURCES:
+        raise ValueError(f'unknown export source {source}')
+    # build it once so bad dates or ids are rejected at submit time
+    views._export_queryset(params)
+    return params
+
+
+@register('export', _validate_export)
+def run_export(job, progress):
+    from . import views
+    filename, columns, qs = views._export_queryset(job.params)
+    header = [name for name, _ in columns]
+    progress.start(qs.count())
+
+    def rows():
+        for row in iter_values(qs, [lookup for _, lookup in columns]):
+            progress.advance()
+            yield row
+
+    fmt = job.params.get('format', 'csv')
+    fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+    try:
+        if fmt == 'xlsx':
+            with os.fdopen(fd, 'wb') as fh:
+                write_xlsx(fh, header, rows(), title=os.path.splitext(filename)[0])
+        else:
+            with os.fdopen(fd, 'w', newline='', encoding='utf-8') as fh:
+                write_csv(fh, header, rows())
+        with open(path, 'rb') as fh:
+            job.result_file.save(filename, File(fh), save=False)
+    finally:
+        os.remove(path)
+    return {'rows': progress.done, 'filename': filename}
+
+
+# Bulk fault edits ----------------------------------------------------------
+
+def _validate_ids(params):
+    ids = params.get('ids')
+    if not ids or not isinstance(ids, list):
+        raise ValueError('missing or invalid ids')
+    try:
+        params['ids'] = bulk.normalize_ids(ids)
+    except (TypeError, ValueError):
+        raise ValueError('ids must be integers')
+    return params
+
+
+def _validate_bulk_update(params):
+    params = _validate_ids(params)
+    bulk.validate_updates(params.get('updates'))
+    return params
+
+
+@register('bulk_delete_faults', _validate_ids)
+def run_bulk_delete(job, progress):
+    ids = job.params['ids']
+    progress.start(len(ids))
+    existing = bulk.delete_faults(
+        ids, user=job.created_by, ip_address=job.params.get('ip_address'), progress=progress,
+    )
+    return {
+        'deleted_count': len(existing),
+        'results': {str(i): 'deleted' if i in existing else 'not_found' for i in ids},
+    }
+
+
+@register('bulk_update_faults', _validate_bulk_update)
+def run_bulk_update(job, progress):
+    ids = job.params['ids']
+    progress.start(len(ids))
+    results = bulk.update_faults(
+        ids, job.params['updates'], user=job.created_by, ip_address=job.params.get('ip_address'),
+        progress=progress,
+    )
+    return {
+        'updated_count': sum(1 for status in results.values() if status == 'updated'),
+        'results': results,
+    }
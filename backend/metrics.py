@@ -0,0 +1,202 @@
+"""Prometheus metrics for the API, served at ``/api/metrics``.
+
+``MetricsMiddleware`` records for every request, labelled with its route
+(the URL pattern, e.g. ``api/faults/<int:pk>/``, so ids do not multiply the
+series) and method:
+
+* ``gridco_http_request_duration_seconds``: time to produce the response;
+* ``gridco_http_response_size_bytes``: body size, when known up front
+  (streamed exports are only counted if they set Content-Length);
+* ``gridco_http_responses_total``: responses by status code;
+* ``gridco_http_db_queries``: SQL queries run for the request;
+* ``gridco_http_db_duration_seconds``: time spent in those queries.
+
+Queries are counted by a wrapper added to each database connection's
+``execute_wrappers`` (as with ``connection.execute_wrapper``, but for the
+connection's lifetime) when it is opened. The wrapper charges them to the
+request in the current context, which also covers the async views whose ORM
+calls run in asgiref's sync thread; background threads (audit writer,
+renditions) are not counted.
+
+Under gunicorn every worker keeps its own samples, so set
+``PROMETHEUS_MULTIPROC_DIR`` to a directory shared by the workers. Workers
+then write their samples to files there and whichever worker answers the
+scrape merges all of them; gunicorn.conf.py empties the directory at startup
+and calls ``multiprocess.mark_process_dead`` from its ``child_exit`` hook.
+Needs prometheus-client; without it (or with ``METRICS_ENABLED = False``) the
+middleware drops out and the endpoint answers 503.
+
+The endpoint answers clients in ``METRICS_ALLOWED_IPS`` (addresses or
+networks, matched against REMOTE_ADDR; loopback by default) and requests
+carrying ``Authorization: Bearer <METRICS_TOKEN>``; anyone else gets 403.
+Behind a reverse proxy every client shares the proxy's address, so use the
+token there.
+"""
+import contextvars
+import hmac
+import ipaddress
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # prometheus-client is optional
+    prometheus_client = None
+
+
+METRICS_ENABLED = getattr(settings, 'METRICS_ENABLED', True)
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# [query count, seconds in queries] of the request being handled
+_request_db = contextvars.ContextVar('request_db', default=None)
+
+if prometheus_client is not None:
+    LABELS = ['route', 'method']
+    REQUEST_DURATION = prometheus_client.Histogram(
+        'gridco_http_request_duration_seconds', 'Time to produce a response.', LABELS, buckets=LATENCY_BUCKETS,
+    )
+    RESPONSE_SIZE = prometheus_client.Histogram(
+        'gridco_http_response_size_bytes', 'Response body size.', LABELS, buckets=SIZE_BUCKETS,
+    )
+    RESPONSES = prometheus_client.Counter(
+        'gridco_http_responses', 'Responses by status code.', LABELS + ['status'],
+    )
+    DB_QUERIES = prometheus_client.Histogram(
+        'gridco_http_db_queries', 'SQL queries run per request.', LABELS, buckets=QUERY_BUCKETS,
+    )
+    DB_DURATION = prometheus_client.Histogram(
+        'gridco_http_db_duration_seconds', 'Time spent in SQL queries per request.', LABELS,
+        buckets=LATENCY_BUCKETS,
+    )
+
+
+def _count_queries(execute, sql, params, many, context):
+    stats = _request_db.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - start
+
+
+def _instrument(connection):
+    if _count_queries not in connection.execute_wrappers:
+        # first, so ``with connection.execute_wrapper(...)`` blocks still pop their own
+        connection.execute_wrappers.insert(0, _count_queries)
+
+
+@receiver(connection_created)
+def _instrument_connection(sender, connection, **kwargs):
+    if METRICS_ENABLED:
+        _instrument(connection)
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.route or match.view_name or 'unknown'
+
+
+def _response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length and length.isdigit() else None
+
+
+def _observe(request, response, elapsed, db):
+    labels = (_route(request), request.method if request.method in METHODS else 'other')
+    REQUEST_DURATION.labels(*labels).observe(elapsed)
+    RESPONSES.labels(*labels, str(response.status_code)).inc()
+    DB_QUERIES.labels(*labels).observe(db[0])
+    DB_DURATION.labels(*labels).observe(db[1])
+    size = _response_size(response)
+    if size is not None:
+        RESPONSE_SIZE.labels(*labels).observe(size)
+
+
+class MetricsMiddleware:
+    """Time each request and count its SQL queries; put it first in MIDDLEWARE."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not METRICS_ENABLED or prometheus_client is None:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        # connections this thread opened before the middleware was loaded
+        for connection in connections.all(initialized_only=True):
+            _instrument(connection)
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        _observe(request, response, time.perf_counter() - start, db)
+        return response
+
+    async def _acall(self, request):
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_db.reset(token)
+        _observe(request, response, time.perf_counter() - start, db)
+        return response
+
+
+def _allowed(request):
+    if METRICS_TOKEN:
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if hmac.compare_digest(header.encode(), f'Bearer {METRICS_TOKEN}'.encode()):
+            return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of the metrics of every worker."""
+    if not _allowed(request):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    if not METRICS_ENABLED or prometheus_client is None:
+        return JsonResponse({'error': 'metrics are not enabled'}, status=503)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return HttpResponse(prometheus_client.generate_latest(registry), content_type=prometheus_client.CONTENT_TYPE_LATEST)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -28,6 +29,9 @@ DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
+# `manage.py test`: caches and background writers below switch to per-run, in-process variants
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Application definition
 
@@ -64,6 +68,8 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    # first, so the time spent in the other middleware is counted too
+    'backend.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -97,11 +103,21 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Configure with DATABASE_URL (see backend/database.py); defaults to the bundled SQLite file.
+# CONN_MAX_AGE keeps connections open across requests; health checks drop dead ones first.
+# SQLITE_WAL switches a SQLite file to WAL journaling for good; it defaults to on only when
+# DATABASE_URL names the database, so the committed db.sqlite3 keeps its rollback journal.
+from .database import parse_database_url
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': parse_database_url(
+        os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3'),
+        base_dir=BASE_DIR,
+        conn_max_age=int(os.environ.get('CONN_MAX_AGE', '60')),
+        conn_health_checks=os.environ.get('CONN_HEALTH_CHECKS', 'True') == 'True',
+        sqlite_tuning=os.environ.get('SQLITE_TUNING', 'True') == 'True',
+        sqlite_wal=os.environ.get('SQLITE_WAL', str('DATABASE_URL' in os.environ)) == 'True',
+    )
 }
 
 
@@ -167,6 +183,79 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Caching
+# File-based by default so resource version stamps and cached responses are shared by
+# every worker of this checkout (in its gitignored .cache directory, so separate checkouts
+# never see each other's entries); point CACHE_BACKEND/CACHE_LOCATION at e.g. Redis to
+# share wider. Test runs get a private in-memory cache.
+if TESTING:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+        }
+    }
+
+# Serialized GET responses are keyed on resource versions, so this only bounds disk use.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '300'))  # seconds
+
+# Dashboard snapshots are cached briefly and dropped on writes (see gridapp/signals.py).
+DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', '30'))  # seconds
+
+# Attachment delivery: '' (Django streams the file), 'x-accel-redirect' (nginx) or 'x-sendfile'
+ATTACHMENT_OFFLOAD = os.environ.get('ATTACHMENT_OFFLOAD', '')
+ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+
+# Background threads generating thumbnail/web renditions of image attachments (needs Pillow)
+RENDITION_WORKERS = int(os.environ.get('RENDITION_WORKERS', '2'))
+
+# Background jobs (backend/jobs.py, run by `manage.py run_jobs`). Bulk requests with more
+# ids than JOB_SYNC_LIMIT are queued instead of run in the request.
+JOB_SYNC_LIMIT = int(os.environ.get('JOB_SYNC_LIMIT', '2000'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+
+# Most rows accepted by one request to the /api/bulk/ ingest endpoints (backend/ingest.py)
+INGEST_MAX_ROWS = int(os.environ.get('INGEST_MAX_ROWS', '5000'))
+
+# Writes the database refuses (locked/unreachable) are spooled here and replayed by
+# `manage.py run_jobs` every WRITE_SPOOL_REPLAY_INTERVAL seconds, or on demand by
+# `manage.py replay_spool` (backend/spool.py). Spooled
+# records exist nowhere else until replayed, so the directory lives on persistent storage
+# outside the source tree (XDG state directory by default).
+WRITE_SPOOL_DIR = os.environ.get('WRITE_SPOOL_DIR', os.path.join(
+    os.environ.get('XDG_STATE_HOME', os.path.expanduser('~/.local/state')), 'gridco', 'spool',
+))
+WRITE_SPOOL_FSYNC = os.environ.get('WRITE_SPOOL_FSYNC', 'True') == 'True'
+WRITE_SPOOL_REPLAY_INTERVAL = int(os.environ.get('WRITE_SPOOL_REPLAY_INTERVAL', '30'))
+
+# Audit log entries are queued and written in batches by a background thread
+# (backend/audit.py): every AUDIT_BATCH_SIZE entries or AUDIT_FLUSH_INTERVAL ms.
+# False writes each entry inside the request's transaction (the default for test runs).
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', str(not TESTING)) == 'True'
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '200'))
+AUDIT_FLUSH_INTERVAL = int(os.environ.get('AUDIT_FLUSH_INTERVAL', '250'))
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+
+# Fault history (gridapp/history.py): `manage.py checkpoint_history` snapshots faults with
+# this many audit entries since their last checkpoint, bounding what a lookup replays.
+HISTORY_CHECKPOINT_INTERVAL = int(os.environ.get('HISTORY_CHECKPOINT_INTERVAL', '50'))
+
+# Per-route latency, size, status and query metrics served at /api/metrics (backend/metrics.py,
+# needs prometheus-client). Under gunicorn also set PROMETHEUS_MULTIPROC_DIR to a directory
+# shared by the workers so the scrape covers all of them (gunicorn.conf.py maintains it).
+# The endpoint answers METRICS_ALLOWED_IPS (comma-separated addresses or networks) and
+# requests with "Authorization: Bearer $METRICS_TOKEN".
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+
+# Route the hot read endpoints to the async views in backend/async_views.py.
+# asgi.py turns this on; under WSGI the sync views avoid a per-request event loop.
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB
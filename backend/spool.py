@@ -0,0 +1,324 @@
+"""Durable on-disk spool for writes that could not reach the database.
+
+When an ORM write fails (locked or unreachable database), the views append
+the validated record to ``<WRITE_SPOOL_DIR>/<resource>.jsonl``, one JSON
+line per record, and answer 202. Appends are group-committed: concurrent
+requests in a worker share one write + fsync, and each only returns once its
+line is on disk. A short-lived lock file serialises appends across worker
+processes.
+
+The audit writer (backend/audit.py) spools the batches it cannot insert the
+same way, under the ``audit_log`` resource.
+
+``replay`` moves a resource's segment aside under that lock and inserts its
+records through the batch ingest path (backend/ingest.py), or with a plain
+``bulk_create`` for audit entries. It never runs on the request path:
+``manage.py run_jobs`` replays every ``WRITE_SPOOL_REPLAY_INTERVAL`` seconds
+(``replay_pending``), so spooled records land soon after the database is
+healthy again, and ``manage.py replay_spool`` replays on demand. If a worker
+dies between the commit and removing the replayed file, that file is
+replayed again; records carry a ``spool_id`` for tracing such duplicates.
+"""
+import contextlib
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from functools import partial
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+
+from gridapp.models import AuditLog
+
+from . import ingest
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+logger = logging.getLogger(__name__)
+
+WRITE_SPOOL_DIR = getattr(settings, 'WRITE_SPOOL_DIR', os.path.expanduser('~/.local/state/gridco/spool'))
+WRITE_SPOOL_FSYNC = getattr(settings, 'WRITE_SPOOL_FSYNC', True)
+WRITE_SPOOL_REPLAY_INTERVAL = getattr(settings, 'WRITE_SPOOL_REPLAY_INTERVAL', 30)  # seconds
+
+
+class LockBusy(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def _file_lock(path, blocking=True):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            else:
+                msvcrt.locking(fd, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            raise LockBusy(path)
+        yield
+    finally:
+        # closing the descriptor releases the lock
+        os.close(fd)
+
+
+def _segment_path(resource):
+    return os.path.join(WRITE_SPOOL_DIR, f'{resource}.jsonl')
+
+
+class _Ticket:
+    __slots__ = ('line', 'done', 'error')
+
+    def __init__(self, line):
+        self.line = line
+        self.done = False
+        self.error = None
+
+
+class _Segment:
+    """Group-committing appender for one resource's segment file."""
+
+    def __init__(self, resource):
+        self.resource = resource
+        self._cond = threading.Condition()
+        self._pending = []
+        self._flushing = False
+
+    def append(self, line):
+        ticket = _Ticket(line)
+        with self._cond:
+            self._pending.append(ticket)
+            while not ticket.done:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                # lead one write + fsync for everything queued so far
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                self._cond.release()
+                error = None
+                try:
+                    self._write([t.line for t in batch])
+                except Exception as e:
+                    error = e
+                finally:
+                    self._cond.acquire()
+                for t in batch:
+                    t.done, t.error = True, error
+                self._flushing = False
+                self._cond.notify_all()
+        if ticket.error is not None:
+            raise ticket.error
+
+    def _write(self, lines):
+        os.makedirs(WRITE_SPOOL_DIR, exist_ok=True)
+        path = _segment_path(self.resource)
+        data = ''.join(lines).encode('utf-8')
+        with _file_lock(path + '.lock'):
+            # reopened per flush so a segment moved aside by replay is never written to
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            try:
+                os.write(fd, data)
+                if WRITE_SPOOL_FSYNC:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def _segment(resource):
+    with _segments_lock:
+        if resource not in _segments:
+            _segments[resource] = _Segment(resource)
+        return _segments[resource]
+
+
+def _record_line(payload):
+    spool_id = uuid.uuid4().hex
+    record = {'spool_id': spool_id, 'spooled_at': datetime.datetime.now().isoformat(), 'payload': payload}
+    return spool_id, json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def append(resource, payload):
+    """Durably spool ``payload`` (a JSON-serialisable dict) for ``resource``; returns its spool id."""
+    return extend(resource, [payload])[0]
+
+
+def extend(resource, payloads):
+    """Durably spool several payloads with a single write; returns their spool ids."""
+    if resource not in REPLAYERS:
+        raise ValueError(f'unknown spool resource {resource}')
+    if not payloads:
+        return []
+    ids, lines = zip(*(_record_line(payload) for payload in payloads))
+    _segment(resource).append(''.join(lines))
+    return list(ids)
+
+
+def pending(resource):
+    """Whether ``resource`` has records waiting to be replayed."""
+    path = _segment_path(resource)
+    return os.path.exists(path) or bool(_replay_files(resource))
+
+
+def _replay_files(resource):
+    """Segments moved aside by a replay that did not finish, oldest first."""
+    prefix = f'{resource}.jsonl.replay-'
+    names = [n for n in _listdir() if n.startswith(prefix) and n[len(prefix):].isdigit()]
+    return sorted(names, key=lambda n: int(n[len(prefix):]))
+
+
+def _listdir():
+    try:
+        return os.listdir(WRITE_SPOOL_DIR)
+    except FileNotFoundError:
+        return []
+
+
+# Replay ----------------------------------------------------------------------
+
+def _read_records(path):
+    records, bad = [], []
+    with open(path, 'rb') as fh:
+        for raw in fh:
+            try:
+                records.append(json.loads(raw)['payload'])
+            except (ValueError, KeyError):
+                # a torn final line from a crash mid-append, or corruption
+                bad.append(raw if raw.endswith(b'\n') else raw + b'\n')
+    return records, bad
+
+
+def _insert_each(resource, rows):
+    """Insert cleaned rows one at a time, returning (inserted objects, rejected rows)."""
+    objs, rejected = [], []
+    for values in rows:
+        try:
+            objs.extend(ingest.insert(resource, [values]))
+        except (IntegrityError, DataError):
+            rejected.append(values)
+    return objs, rejected
+
+
+def _insert_rows(resource, payloads):
+    """Insert single-row POST payloads through the batch ingest path."""
+    valid, errors = ingest.clean(resource, payloads)
+    rejected = [payloads[index] for index in errors]
+    rows = [values for _, values in valid]
+    try:
+        objs = ingest.insert(resource, rows) if rows else []
+    except (IntegrityError, DataError):
+        # a record that can never be inserted must not block the ones behind it
+        objs, bad_rows = _insert_each(resource, rows)
+        rejected.extend(bad_rows)
+    return objs, rejected
+
+
+def _insert_audit_entries(payloads):
+    """Insert audit entries spooled by the audit writer (backend/audit.py)."""
+    entries, rejected = [], []
+    for payload in payloads:
+        try:
+            timestamp = datetime.datetime.fromisoformat(payload['timestamp'])
+            entries.append((payload, AuditLog(**{**payload, 'timestamp': timestamp})))
+        except (KeyError, TypeError, ValueError):
+            rejected.append(payload)
+    try:
+        with transaction.atomic():
+            objs = AuditLog.objects.bulk_create([entry for _, entry in entries], batch_size=ingest.INGEST_BATCH_SIZE)
+    except (IntegrityError, DataError):
+        objs = []
+        for payload, entry in entries:
+            try:
+                with transaction.atomic():
+                    entry.save(force_insert=True)
+                objs.append(entry)
+            except (IntegrityError, DataError):
+                rejected.append(payload)
+    return objs, rejected
+
+
+def _no_refresh(objs):
+    pass
+
+
+# resource -> (insert(payloads) -> (new objects, rejected payloads), refresh(new objects));
+# refresh runs once the replayed file is gone, so a failure there never replays it twice
+REPLAYERS = {
+    name: (partial(_insert_rows, name), partial(ingest.refresh, model))
+    for name, (model, _, _) in ingest.RESOURCES.items()
+}
+REPLAYERS['audit_log'] = (_insert_audit_entries, _no_refresh)
+
+
+def _quarantine(resource, path, lines):
+    with open(path + '.bad', 'ab') as fh:
+        fh.writelines(lines)
+    logger.warning('spool %s: %d record(s) could not be replayed, kept in %s.bad', resource, len(lines), path)
+
+
+def _bad_line(payload):
+    return json.dumps({'payload': payload}, default=str).encode('utf-8') + b'\n'
+
+
+def _replay_file(resource, path):
+    insert, refresh = REPLAYERS[resource]
+    payloads, bad = _read_records(path)
+    objs, rejected = insert(payloads)
+    # OperationalError (database still down) propagates and leaves the file for the next attempt
+    bad.extend(_bad_line(payload) for payload in rejected)
+    if bad:
+        _quarantine(resource, path, bad)
+    os.remove(path)
+    refresh(objs)
+    return len(objs)
+
+
+def replay(resource=None, blocking=True):
+    """Insert spooled records of ``resource`` (default: all); returns ``{resource: count}``.
+
+    With ``blocking=False`` a resource another process is already replaying is skipped.
+    """
+    counts = {}
+    for name in [resource] if resource else REPLAYERS:
+        if not pending(name):
+            continue
+        try:
+            with _file_lock(_segment_path(name) + '.replay.lock', blocking=blocking):
+                counts[name] = _replay_locked(name)
+        except LockBusy:
+            continue
+    return counts
+
+
+def _replay_locked(resource):
+    path = _segment_path(resource)
+    if os.path.exists(path):
+        with _file_lock(path + '.lock'):
+            os.replace(path, f'{path}.replay-{time.time_ns()}')
+    # leftovers of an interrupted replay are included, in the order they were moved aside
+    return sum(_replay_file(resource, os.path.join(WRITE_SPOOL_DIR, n)) for n in _replay_files(resource))
+
+
+def replay_pending():
+    """Replay every resource with spooled records, skipping any another process is replaying.
+
+    For periodic callers: a failure is logged and the records are kept for the next call.
+    """
+    try:
+        return replay(blocking=False)
+    except Exception:
+        logger.exception('spool: replay failed, will retry later')
+        return {}
@@ -0,0 +1,235 @@
+"""Resumable, chunked attachment uploads for fault reports.
+
+Flow:
+    POST   /api/faults/<pk>/uploads/             {"filename": ..., "size": ...} -> session
+    PUT    /api/uploads/<id>/?offset=N           raw bytes of one chunk
+    GET    /api/uploads/<id>/                    progress, to resume after a dropped connection
+    POST   /api/uploads/<id>/complete/           attach the finished file to the fault
+    DELETE /api/uploads/<id>/                    abandon the upload
+
+Chunks are streamed from the request straight to a part file at their offset,
+so the worker never buffers more than one read block.
+"""
+import json
+import os
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from gridapp.models import AttachmentUpload, FaultReport, validate_file_extension, validate_file_size
+from gridapp.storage import release_attachment
+
+from .views import _create_audit_log
+
+
+UPLOAD_TEMP_DIR = getattr(settings, 'ATTACHMENT_UPLOAD_TEMP_DIR', os.path.join(settings.MEDIA_ROOT, 'uploads', 'partial'))
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def _cors(resp, methods):
+    resp['Access-Control-Allow-Origin'] = '*'
+    resp['Access-Control-Allow-Methods'] = methods
+    resp['Access-Control-Allow-Headers'] = 'Content-Type, Content-Range'
+    return resp
+
+
+def _part_path(upload):
+    return os.path.join(UPLOAD_TEMP_DIR, f'{upload.id}.part')
+
+
+def _status(upload):
+    return {
+        'id': str(upload.id),
+        'fault_id': upload.fault_id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'received': upload.received,
+        'complete': upload.received >= upload.size,
+    }
+
+
+def _write_at(fd, data, offset):
+    if hasattr(os, 'pwrite'):
+        return os.pwrite(fd, data, offset)
+    # Windows has no pwrite
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.write(fd, data)
+
+
+class _PartFile(File):
+    """A finished part file; storage backends move it into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+@csrf_exempt
+def start_upload(request, pk):
+    """Open an upload session for fault ``pk`` after checking the announced name and size"""
+    if request.method == 'OPTIONS':
+        return _cors(JsonResponse({'ok': True}), 'POST,OPTIONS')
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except Exception:
+        return JsonResponse({'error': 'invalid json'}, status=400)
+
+    filename = os.path.basename(str(data.get('filename') or ''))
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': 'missing or invalid size'}, status=400)
+    if not filename or size <= 0:
+        return JsonResponse({'error': 'missing filename or size'}, status=400)
+
+    try:
+        # same rules as the attachment field, checked before any bytes arrive
+        announced = SimpleNamespace(name=filename, size=size)
+        validate_file_extension(announced)
+        validate_file_size(announced)
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+
+    if not FaultReport.objects.filter(pk=pk).exists():
+        return JsonResponse({'error': 'fault not found'}, status=404)
+
+    upload = AttachmentUpload.objects.create(
+        fault_id=pk,
+        filename=filename,
+        size=size,
+        uploaded_by=data.get('user', 'system'),
+    )
+    os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
+    open(_part_path(upload), 'wb').close()
+
+    resp = JsonResponse(_status(upload), status=201)
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+@csrf_exempt
+def upload_detail(request, upload_id):
+    """GET progress, PUT a chunk at ?offset= (or Content-Range), DELETE to abandon"""
+    if request.method == 'OPTIONS':
+        return _cors(JsonResponse({'ok': True}), 'GET,PUT,DELETE,OPTIONS')
+
+    try:
+        upload = AttachmentUpload.objects.get(pk=upload_id)
+    except AttachmentUpload.DoesNotExist:
+        return JsonResponse({'error': 'upload not found'}, status=404)
+
+    if request.method == 'GET':
+        resp = JsonResponse(_status(upload))
+    elif request.method == 'PUT':
+        resp = _receive_chunk(request, upload)
+    elif request.method == 'DELETE':
+        try:
+            os.remove(_part_path(upload))
+        except FileNotFoundError:
+            pass
+        upload.delete()
+        resp = JsonResponse({'message': 'Upload cancelled', 'id': str(upload_id)})
+    else:
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+def _chunk_offset(request):
+    content_range = request.headers.get('Content-Range', '')
+    if content_range.startswith('bytes '):
+        # "bytes start-end/total"
+        return int(content_range[6:].split('-', 1)[0])
+    return int(request.GET.get('offset', 0))
+
+
+def _receive_chunk(request, upload):
+    try:
+        offset = _chunk_offset(request)
+    except ValueError:
+        return JsonResponse({'error': 'invalid offset'}, status=400)
+    if offset < 0 or offset > upload.received:
+        # no gaps: a resumed client continues from `received`
+        return JsonResponse({'error': 'offset must not be beyond received bytes', **_status(upload)}, status=416)
+
+    written = 0
+    fd = os.open(_part_path(upload), os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        while True:
+            block = request.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            if offset + written + len(block) > upload.size:
+                return JsonResponse({'error': 'chunk extends past the announced size', **_status(upload)}, status=400)
+            _write_at(fd, block, offset + written)
+            written += len(block)
+    finally:
+        os.close(fd)
+
+    end = offset + written
+    if end > upload.received:
+        AttachmentUpload.objects.filter(pk=upload.pk, received__lt=end).update(received=end)
+        upload.received = end
+    return JsonResponse(_status(upload))
+
+
+@csrf_exempt
+def complete_upload(request, upload_id):
+    """Attach a fully received upload to its fault with a single row update"""
+    if request.method == 'OPTIONS':
+        return _cors(JsonResponse({'ok': True}), 'POST,OPTIONS')
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        upload = AttachmentUpload.objects.select_related('fault').get(pk=upload_id)
+    except AttachmentUpload.DoesNotExist:
+        return JsonResponse({'error': 'upload not found'}, status=404)
+
+    path = _part_path(upload)
+    if upload.received < upload.size or os.path.getsize(path) != upload.size:
+        return JsonResponse({'error': 'upload incomplete', **_status(upload)}, status=409)
+
+    fault = upload.fault
+    old_name = fault.attachment.name if fault.attachment else None
+    try:
+        with open(path, 'rb') as fh:
+            part = _PartFile(fh, name=upload.filename)
+            validate_file_size(part)
+            validate_file_extension(part)
+            fault.attachment.save(upload.filename, part, save=False)
+        fault.attachment_name = upload.filename
+        fault.save(update_fields=['attachment', 'attachment_name'])
+        if old_name and old_name != fault.attachment.name:
+            release_attachment(old_name, exclude_pk=fault.pk)
+    except ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    if os.path.exists(path):
+        os.remove(path)
+    upload.delete()
+
+    _create_audit_log(
+        action='UPDATE',
+        model_name='FaultReport',
+        object_id=fault.id,
+        user=upload.uploaded_by,
+        changes={'attachment': {'old': old_name, 'new': fault.attachment.name}},
+        request=request
+    )
+
+    resp = JsonResponse({
+        'id': fault.id,
+        'attachment_url': request.build_absolute_uri(fault.attachment.url),
+    })
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
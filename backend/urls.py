@@ -21,19 +21,31 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
 from . import auth_views
+from . import upload_views
+from . import job_views
+from . import async_views
+from . import metrics
 from django.views.generic import TemplateView
 
+# async read endpoints under ASGI (see settings.ASYNC_READ_VIEWS)
+read_views = async_views if settings.ASYNC_READ_VIEWS else views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/server-room/', views.server_room),
+    path('api/server-room/', read_views.server_room),
     path('api/server-room-visitors/', views.server_room_visitors),
-    path('api/fault-reports/', views.fault_reports),
+    path('api/fault-reports/', read_views.fault_reports),
     path('api/faults/<int:pk>/', views.fault_detail),
     path('api/faults/<int:pk>/attachment/', views.fault_attachment_preview),
     path('api/faults/<int:pk>/attachment/delete/', views.fault_attachment_delete),
-    path('api/field-activities/', views.field_activities),
-    path('api/dashboard/', views.dashboard),
+    # Chunked, resumable attachment uploads
+    path('api/faults/<int:pk>/uploads/', upload_views.start_upload),
+    path('api/uploads/<uuid:upload_id>/', upload_views.upload_detail),
+    path('api/uploads/<uuid:upload_id>/complete/', upload_views.complete_upload),
+    path('api/field-activities/', read_views.field_activities),
+    path('api/dashboard/', read_views.dashboard),
     path('api/activity-reports/', views.activity_reports),
+    path('api/search/', views.search),
     # Export endpoints
     path('api/export/field-activities/csv/', views.export_field_activities_csv),
     path('api/export/fault-reports/csv/', views.export_faults_csv),
@@ -43,19 +55,30 @@ urlpatterns = [
     path('api/bulk/faults/delete/', views.bulk_delete_faults),
     path('api/bulk/faults/update/', views.bulk_update_faults),
     path('api/bulk/faults/export/', views.bulk_export_faults),
+    path('api/bulk/server-room/', views.bulk_ingest_server_room),
+    path('api/bulk/server-room-visitors/', views.bulk_ingest_server_room_visitors),
+    path('api/bulk/field-activities/', views.bulk_ingest_field_activities),
+    # Background jobs
+    path('api/jobs/', job_views.job_list),
+    path('api/jobs/<uuid:job_id>/', job_views.job_detail),
+    path('api/jobs/<uuid:job_id>/download/', job_views.job_download),
+    # Prometheus scrape target
+    path('api/metrics', metrics.metrics_view),
     # Audit log
     path('api/audit-log/', views.audit_log_view),
+    path('api/faults/<int:pk>/history/', views.fault_history),
+    path('api/history/faults/', views.fault_history_report),
     # Authentication (JWT)
     path('api/auth/token/', auth_views.EmailOrUsernameTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/user/', auth_views.current_user),
     path('api/auth/lookup/', auth_views.lookup_user_by_email),
     path('api/auth/set-password/', auth_views.set_initial_password),
-    path('api/daily-records/', views.daily_records),
+    path('api/daily-records/', read_views.daily_records),
     path('api/export/daily-records/csv/', views.export_daily_records_csv),
     # Feedback endpoints
     path('api/fault-feedbacks/', views.fault_feedback),
-    path('api/fault-feedbacks/<int:fault_id>/', views.get_fault_feedbacks),
+    path('api/fault-feedbacks/<int:fault_id>/', read_views.get_fault_feedbacks),
     # Catch-all for React Router - must be last
     re_path(r'^(?!api/).*$', views.serve_index_html),
 ]
@@ -5,13 +5,18 @@ from django.conf import settings
 import os
 import json
 import datetime
+from collections import Counter
+from functools import wraps
+from types import SimpleNamespace
 try:
     import importlib
     _decorators = importlib.import_module("rest_framework.decorators")
     api_view = _decorators.api_view
     permission_classes = _decorators.permission_classes
+    renderer_classes = _decorators.renderer_classes
     _permissions = importlib.import_module("rest_framework.permissions")
     IsAuthenticated = _permissions.IsAuthenticated
+    JSONRenderer = importlib.import_module("rest_framework.renderers").JSONRenderer
 except Exception:
     # lightweight no-op fallbacks for environments without DRF installed
     def api_view(methods):
@@ -24,22 +29,93 @@ except Exception:
             return func
         return decorator
 
+    def renderer_classes(classes):
+        def decorator(func):
+            return func
+        return decorator
+
     class IsAuthenticated:
         pass
 
-# In-memory store for demo purposes (fallback)
-_ENTRIES = []
-_VISITORS = []
-_FAULTS = []
-_FIELD_ACTIVITIES = []
+    class JSONRenderer:
+        pass
+
 
-import os
-from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.files.storage import FileSystemStorage
-from gridapp.models import Staff, ServerRoomEntry, FaultReport, FieldActivity, FaultFeedback, ServerRoomVisitor
+from django.db import DatabaseError, IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from gridapp import history, renditions
+from gridapp import search as fulltext
+from gridapp.models import Staff, ServerRoomEntry, FaultReport, FieldActivity, FaultFeedback, ServerRoomVisitor, DailyMetrics, normalize_staff_name
+from gridapp.signals import dashboard_cache_key
+from gridapp.staff import get_or_create_staff, resolve_one
+from gridapp.storage import release_attachment
+from gridapp.versions import bump
+from . import audit, bulk, ingest, jobs, spool
+from .exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_response, iter_values, ndjson_response
+from .file_delivery import serve_file
+from .http_cache import cached_get
+from .pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page, parse_page_size
+
+
+DASHBOARD_CACHE_TTL = getattr(settings, 'DASHBOARD_CACHE_TTL', 30)
+DASHBOARD_MAX_DAYS = 90
+
+
+def _serialize_entry(e):
+    return {
+        'id': e.id,
+        'staff': e.staff.name,
+        'date': str(e.date),
+        'time_in': e.time_in.isoformat(),
+        'time_out': e.time_out.isoformat() if e.time_out else None,
+        'reason': e.reason,
+        'equipment_touched': e.equipment_touched,
+        'supervisor': e.supervisor,
+    }
+
+
+def _serialize_field_activity(f):
+    return {
+        'id': f.id,
+        'staff': f.staff.name,
+        'substation': f.substation,
+        'date': str(f.date),
+        'time_out': f.time_out.isoformat(),
+        'time_returned': f.time_returned.isoformat() if f.time_returned else None,
+        'purpose': f.purpose,
+        'work_done': f.work_done,
+        'materials_used': f.materials_used,
+        'supervisor_approval': f.supervisor_approval,
+    }
+
+
+def _serialize_feedback(fb):
+    return {
+        'id': fb.id,
+        'staff_name': fb.staff_name,
+        'staff_email': fb.staff_email,
+        'feedback_text': fb.feedback_text,
+        'date_submitted': fb.date_submitted.isoformat()
+    }
+
+
+def _spooled(resource, record):
+    """Answer a write the database refused by keeping it in the on-disk spool (see backend/spool.py)."""
+    try:
+        spool_id = spool.append(resource, record)
+    except OSError:
+        return JsonResponse({'error': 'database unavailable'}, status=503)
+    resp = JsonResponse({**record, 'id': None, 'spool_id': spool_id}, status=202)
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
 
 
 @csrf_exempt
+@cached_get('server_room')
 def server_room(request):
     # allow simple CORS for local development
     if request.method == 'OPTIONS':
@@ -52,26 +128,10 @@ def server_room(request):
         out = []
         try:
             qs = ServerRoomEntry.objects.select_related('staff').all()
-            out = [
-                {
-                    'id': e.id,
-                    'staff': e.staff.name,
-                    'date': str(e.date),
-                    'time_in': e.time_in.isoformat(),
-                    'time_out': e.time_out.isoformat() if e.time_out else None,
-                    'reason': e.reason,
-                    'equipment_touched': e.equipment_touched,
-                    'supervisor': e.supervisor,
-                }
-                for e in qs
-            ]
+            out = [_serialize_entry(e) for e in qs]
         except Exception:
             out = []
 
-        # include any in-memory fallback entries so they are visible to the frontend
-        if _ENTRIES:
-            out = out + _ENTRIES
-
         resp = JsonResponse(out, safe=False)
         resp['Access-Control-Allow-Origin'] = '*'
         return resp
@@ -88,17 +148,14 @@ def server_room(request):
                 return JsonResponse({'error': f'missing field {field}'}, status=400)
 
         staff_name = payload.get('staff')
-        staff_obj = None
-        if staff_name:
-            try:
-                staff_obj, _ = Staff.objects.get_or_create(name=staff_name)
-            except Exception:
-                staff_obj = None
+        if not staff_name:
+            return JsonResponse({'error': 'missing field staff'}, status=400)
         try:
-            if staff_obj:
-                date = datetime.date.fromisoformat(payload.get('date'))
-                time_in = datetime.time.fromisoformat(payload.get('time_in'))
-                time_out = datetime.time.fromisoformat(payload.get('time_out')) if payload.get('time_out') else None
+            date = datetime.date.fromisoformat(payload.get('date'))
+            time_in = datetime.time.fromisoformat(payload.get('time_in'))
+            time_out = datetime.time.fromisoformat(payload.get('time_out')) if payload.get('time_out') else None
+            try:
+                staff_obj = get_or_create_staff(staff_name)
                 sre = ServerRoomEntry.objects.create(
                     staff=staff_obj,
                     date=date,
@@ -108,20 +165,20 @@ def server_room(request):
                     equipment_touched=payload.get('equipment_touched'),
                     supervisor=payload.get('supervisor'),
                 )
-                resp = JsonResponse({'id': sre.id, 'staff': sre.staff.name, 'date': str(sre.date)}, status=201)
-            else:
-                entry = {
-                    'id': len(_ENTRIES) + 1,
-                    'staff': payload.get('staff'),
-                    'date': payload.get('date'),
-                    'time_in': payload.get('time_in'),
-                    'time_out': payload.get('time_out'),
+            except IntegrityError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            except DatabaseError:
+                # database locked or unreachable: keep the entry on disk until it can be replayed
+                return _spooled('server_room', {
+                    'staff': staff_name,
+                    'date': date.isoformat(),
+                    'time_in': time_in.isoformat(),
+                    'time_out': time_out.isoformat() if time_out else None,
                     'reason': payload.get('reason'),
                     'equipment_touched': payload.get('equipment_touched'),
                     'supervisor': payload.get('supervisor'),
-                }
-                _ENTRIES.append(entry)
-                resp = JsonResponse(entry, status=201)
+                })
+            resp = JsonResponse({'id': sre.id, 'staff': sre.staff.name, 'date': str(sre.date)}, status=201)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
@@ -132,6 +189,7 @@ def server_room(request):
 
 
 @csrf_exempt
+@cached_get('server_room_visitors')
 def server_room_visitors(request):
     if request.method == 'OPTIONS':
         resp = JsonResponse({'ok': True})
@@ -159,9 +217,6 @@ def server_room_visitors(request):
         except Exception:
             out = []
 
-        if _VISITORS:
-            out = out + _VISITORS
-
         resp = JsonResponse(out, safe=False)
         resp['Access-Control-Allow-Origin'] = '*'
         return resp
@@ -182,7 +237,10 @@ def server_room_visitors(request):
             date_val = datetime.date.fromisoformat(date_str) if date_str else datetime.date.today()
             time_in = datetime.time.fromisoformat(payload.get('time_in'))
             time_out = datetime.time.fromisoformat(payload.get('time_out')) if payload.get('time_out') else None
+        except (TypeError, ValueError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
+        try:
             visit = ServerRoomVisitor.objects.create(
                 staff_id=payload.get('staff_id'),
                 name=payload.get('name'),
@@ -203,18 +261,20 @@ def server_room_visitors(request):
                 },
                 status=201,
             )
-        except Exception as e:
-            entry = {
-                'id': len(_VISITORS) + 1,
+        except IntegrityError as e:
+            # e.g. a null name; retrying later would not help
+            return JsonResponse({'error': str(e)}, status=400)
+        except DatabaseError:
+            return _spooled('server_room_visitors', {
                 'staff_id': payload.get('staff_id'),
                 'name': payload.get('name'),
                 'purpose': payload.get('purpose'),
-                'date': payload.get('date') or str(datetime.date.today()),
-                'time_in': payload.get('time_in'),
-                'time_out': payload.get('time_out'),
-            }
-            _VISITORS.append(entry)
-            resp = JsonResponse(entry, status=201)
+                'date': date_val.isoformat(),
+                'time_in': time_in.isoformat(),
+                'time_out': time_out.isoformat() if time_out else None,
+            })
+        except Exception as e:
+            return JsonResponse({'error': str(e)}, status=500)
 
         resp['Access-Control-Allow-Origin'] = '*'
         return resp
@@ -222,6 +282,68 @@ def server_room_visitors(request):
     return JsonResponse({'error': 'method not allowed'}, status=405)
 
 
+def _serialize_fault(f, request):
+    item = {
+        'id': f.id,
+        'title': f.title,
+        'description': f.description,
+        'date_reported': str(f.date_reported),
+        'reported_by': f.reported_by.name if f.reported_by else None,
+        'assigned_to': f.assigned_to.name if f.assigned_to else None,
+        'assigned_to_id': f.assigned_to.id if f.assigned_to else None,
+        'location': f.location,
+        'severity': f.severity,
+        'status': f.status,
+        'resolution_remarks': f.resolution_remarks,
+    }
+    if f.attachment:
+        item['attachment_url'] = request.build_absolute_uri(f.attachment.url)
+        item['attachment_name'] = f.attachment_name or f.attachment.name.split('/')[-1]
+        if renditions.is_image(f.attachment.name):
+            preview_url = request.build_absolute_uri(f'/api/faults/{f.id}/attachment/')
+            item['thumbnail_url'] = f'{preview_url}?variant=thumb'
+            item['web_url'] = f'{preview_url}?variant=web'
+    return item
+
+
+def _split_param(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _filter_faults(qs, params):
+    """Apply the fault list filters from query params.
+
+    Supported: status and severity (comma separated), location (substring),
+    assigned_to (staff id, name, or "none" for unassigned), date_from/date_to
+    (inclusive, YYYY-MM-DD). Raises ValueError on malformed input.
+    """
+    status = params.get('status')
+    if status:
+        qs = qs.filter(status__in=_split_param(status))
+    severity = params.get('severity')
+    if severity:
+        qs = qs.filter(severity__in=_split_param(severity))
+    location = params.get('location')
+    if location:
+        qs = qs.filter(location__icontains=location)
+    assigned_to = params.get('assigned_to')
+    if assigned_to:
+        if assigned_to.lower() in ('none', 'unassigned'):
+            qs = qs.filter(assigned_to__isnull=True)
+        elif assigned_to.isdigit():
+            qs = qs.filter(assigned_to_id=int(assigned_to))
+        else:
+            qs = qs.filter(assigned_to__name_key=normalize_staff_name(assigned_to))
+    for param, lookup in (('date_from', 'date_reported__gte'), ('date_to', 'date_reported__lte')):
+        value = params.get(param)
+        if value:
+            try:
+                qs = qs.filter(**{lookup: datetime.date.fromisoformat(value)})
+            except ValueError:
+                raise ValueError(f'invalid {param}, expected YYYY-MM-DD')
+    return qs
+
+
 @api_view(['GET', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def fault_detail(request, pk):
@@ -232,22 +354,7 @@ def fault_detail(request, pk):
         return JsonResponse({'error': 'not found'}, status=404)
 
     if request.method == 'GET':
-        item = {
-            'id': f.id,
-            'title': f.title,
-            'description': f.description,
-            'date_reported': str(f.date_reported),
-            'reported_by': f.reported_by.name if f.reported_by else None,
-            'assigned_to': f.assigned_to.name if f.assigned_to else None,
-            'assigned_to_id': f.assigned_to.id if f.assigned_to else None,
-            'location': f.location,
-            'severity': f.severity,
-            'status': f.status,
-            'resolution_remarks': f.resolution_remarks,
-        }
-        if f.attachment:
-            item['attachment_url'] = request.build_absolute_uri(f.attachment.url)
-        return JsonResponse(item)
+        return JsonResponse(_serialize_fault(f, request))
 
     # PATCH
     try:
@@ -266,20 +373,8 @@ def fault_detail(request, pk):
                 old_value = f.assigned_to.name if f.assigned_to else None
                 assigned_value = data[k]
                 if assigned_value:
-                    assigned_staff = None
-                    # Try to find by ID first if it's numeric
-                    if isinstance(assigned_value, int) or (isinstance(assigned_value, str) and assigned_value.isdigit()):
-                        try:
-                            assigned_staff = Staff.objects.get(id=int(assigned_value))
-                        except Staff.DoesNotExist:
-                            pass
-                    # If not found by ID, try by name
-                    if not assigned_staff and isinstance(assigned_value, str):
-                        try:
-                            assigned_staff = Staff.objects.get(name__iexact=assigned_value)
-                        except Staff.DoesNotExist:
-                            pass
-                    # If still not found, return error
+                    # by id if numeric, otherwise (or failing that) by name
+                    assigned_staff = resolve_one(assigned_value)
                     if not assigned_staff:
                         return JsonResponse({'error': f'Staff "{assigned_value}" not found (search by name or id)'}, status=400)
                     f.assigned_to = assigned_staff
@@ -317,6 +412,7 @@ def fault_detail(request, pk):
 
 
 @csrf_exempt
+@cached_get('fault_reports')
 def fault_reports(request):
     # support CORS preflight
     if request.method == 'OPTIONS':
@@ -327,34 +423,37 @@ def fault_reports(request):
         return resp
 
     if request.method == 'GET':
-        out = []
         try:
-            qs = FaultReport.objects.select_related('reported_by', 'assigned_to').all()
-            out = []
-            for f in qs:
-                item = {
-                    'id': f.id,
-                    'title': f.title,
-                    'description': f.description,
-                    'date_reported': str(f.date_reported),
-                    'reported_by': f.reported_by.name if f.reported_by else None,
-                    'assigned_to': f.assigned_to.name if f.assigned_to else None,
-                    'assigned_to_id': f.assigned_to.id if f.assigned_to else None,
-                    'location': f.location,
-                    'severity': f.severity,
-                    'status': f.status,
-                    'resolution_remarks': f.resolution_remarks,
-                }
-                if f.attachment:
-                    item['attachment_url'] = request.build_absolute_uri(f.attachment.url)
-                out.append(item)
-        except Exception:
-            out = []
+            qs = _filter_faults(FaultReport.objects.select_related('reported_by', 'assigned_to'), request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
-        if _FAULTS:
-            out = out + _FAULTS
+        # the whole filtered table as a bare array, only on explicit request (older clients)
+        if request.GET.get('all') == '1':
+            out = []
+            try:
+                out = [_serialize_fault(f, request) for f in qs]
+            except Exception:
+                out = []
+            resp = JsonResponse(out, safe=False)
+            resp['Access-Control-Allow-Origin'] = '*'
+            return resp
 
-        resp = JsonResponse(out, safe=False)
+        # keyset pagination: ?limit= (default DEFAULT_PAGE_SIZE), then ?cursor=<next_cursor>
+        try:
+            limit = parse_page_size(request.GET.get('limit'))
+            rows, next_cursor = keyset_page(
+                qs, ['date_reported', 'id'],
+                cursor=request.GET.get('cursor'),
+                limit=limit,
+                key=lambda f: [f.date_reported.isoformat(), f.id],
+            )
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        resp = JsonResponse({
+            'results': [_serialize_fault(f, request) for f in rows],
+            'next_cursor': next_cursor,
+        })
         resp['Access-Control-Allow-Origin'] = '*'
         return resp
 
@@ -373,10 +472,10 @@ def fault_reports(request):
             reported_by_obj = None
             if reported_by_name:
                 try:
-                    reported_by_obj, _ = Staff.objects.get_or_create(name=reported_by_name)
+                    reported_by_obj = get_or_create_staff(reported_by_name)
                 except Exception:
                     reported_by_obj = None
-            fr = FaultReport.objects.create(
+            fr = FaultReport(
                 title=data.get('title'),
                 description=data.get('description'),
                 date_reported=datetime.date.fromisoformat(data.get('date_reported')),
@@ -387,8 +486,10 @@ def fault_reports(request):
                 resolution_remarks=data.get('resolution_remarks', ''),
             )
             if file:
-                fr.attachment.save(file.name, file)
-                fr.save()
+                # store the file first so the row is inserted once, attachment included
+                fr.attachment.save(file.name, file, save=False)
+                fr.attachment_name = os.path.basename(file.name)
+            fr.save()
             
             # Log the creation
             _create_audit_log(
@@ -396,11 +497,8 @@ def fault_reports(request):
                 model_name='FaultReport',
                 object_id=fr.id,
                 user=reported_by_name or 'system',
-                changes={
-                    'title': {'old': None, 'new': fr.title},
-                    'severity': {'old': None, 'new': fr.severity},
-                    'status': {'old': None, 'new': fr.status},
-                },
+                # the whole row, so history can rebuild the fault from this entry alone
+                changes=history.creation_changes('FaultReport', fr.id),
                 request=request
             )
             
@@ -416,6 +514,7 @@ def fault_reports(request):
 
 
 @csrf_exempt
+@cached_get('field_activities')
 def field_activities(request):
     # support basic CORS preflight
     if request.method == 'OPTIONS':
@@ -429,27 +528,10 @@ def field_activities(request):
         out = []
         try:
             qs = FieldActivity.objects.select_related('staff').all()
-            out = [
-                {
-                    'id': f.id,
-                    'staff': f.staff.name,
-                    'substation': f.substation,
-                    'date': str(f.date),
-                    'time_out': f.time_out.isoformat(),
-                    'time_returned': f.time_returned.isoformat() if f.time_returned else None,
-                    'purpose': f.purpose,
-                    'work_done': f.work_done,
-                    'materials_used': f.materials_used,
-                    'supervisor_approval': f.supervisor_approval,
-                }
-                for f in qs
-            ]
+            out = [_serialize_field_activity(f) for f in qs]
         except Exception:
             out = []
 
-        if _FIELD_ACTIVITIES:
-            out = out + _FIELD_ACTIVITIES
-
         resp = JsonResponse(out, safe=False)
         resp['Access-Control-Allow-Origin'] = '*'
         return resp
@@ -466,41 +548,40 @@ def field_activities(request):
                 return JsonResponse({'error': f'missing field {field}'}, status=400)
 
         staff_name = payload.get('staff')
-        staff_obj = None
-        if staff_name:
-            try:
-                staff_obj, _ = Staff.objects.get_or_create(name=staff_name)
-            except Exception:
-                staff_obj = None
+        if not staff_name:
+            return JsonResponse({'error': 'missing field staff'}, status=400)
         try:
-            if staff_obj:
+            date = datetime.date.fromisoformat(payload.get('date'))
+            time_out = datetime.time.fromisoformat(payload.get('time_out'))
+            time_returned = datetime.time.fromisoformat(payload.get('time_returned')) if payload.get('time_returned') else None
+            try:
+                staff_obj = get_or_create_staff(staff_name)
                 fa = FieldActivity.objects.create(
                     staff=staff_obj,
                     substation=payload.get('substation'),
-                    date=datetime.date.fromisoformat(payload.get('date')),
-                    time_out=datetime.time.fromisoformat(payload.get('time_out')),
-                    time_returned=datetime.time.fromisoformat(payload.get('time_returned')) if payload.get('time_returned') else None,
+                    date=date,
+                    time_out=time_out,
+                    time_returned=time_returned,
                     purpose=payload.get('purpose'),
                     work_done=payload.get('work_done'),
                     materials_used=payload.get('materials_used'),
                     supervisor_approval=payload.get('supervisor_approval'),
                 )
-                resp = JsonResponse({'id': fa.id, 'staff': fa.staff.name, 'substation': fa.substation}, status=201)
-            else:
-                entry = {
-                    'id': len(_FIELD_ACTIVITIES) + 1,
-                    'staff': payload.get('staff'),
+            except IntegrityError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            except DatabaseError:
+                return _spooled('field_activities', {
+                    'staff': staff_name,
                     'substation': payload.get('substation'),
-                    'date': payload.get('date'),
-                    'time_out': payload.get('time_out'),
-                    'time_returned': payload.get('time_returned'),
+                    'date': date.isoformat(),
+                    'time_out': time_out.isoformat(),
+                    'time_returned': time_returned.isoformat() if time_returned else None,
                     'purpose': payload.get('purpose'),
                     'work_done': payload.get('work_done'),
                     'materials_used': payload.get('materials_used'),
                     'supervisor_approval': payload.get('supervisor_approval'),
-                }
-                _FIELD_ACTIVITIES.append(entry)
-                resp = JsonResponse(entry, status=201)
+                })
+            resp = JsonResponse({'id': fa.id, 'staff': fa.staff.name, 'substation': fa.substation}, status=201)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
@@ -510,6 +591,52 @@ def field_activities(request):
     return JsonResponse({'error': 'method not allowed'}, status=405)
 
 
+def _trend_dates(days=7):
+    base = datetime.date.today()
+    return [base - datetime.timedelta(days=i) for i in reversed(range(days))]
+
+
+def _dashboard_snapshot(days=7):
+    """Compute dashboard metrics from the DailyMetrics rollup (one row per day in the window)."""
+    dates = _trend_dates(days)
+    metrics, active_faults = _dashboard_querysets(dates)
+    return _dashboard_payload(dates, list(metrics), active_faults.count())
+
+
+def _dashboard_querysets(dates):
+    """The two independent dashboard queries, unevaluated: rollup rows and open faults."""
+    return (
+        DailyMetrics.objects.filter(date__range=(dates[0], dates[-1])),
+        FaultReport.objects.exclude(status__in=['resolved', 'closed']),
+    )
+
+
+def _most_visited(metrics, top=5):
+    """The ``top`` substations by field activities in the window, summed from the rollup rows."""
+    visits = Counter()
+    for m in metrics:
+        visits.update(m.substation_visits)
+    return sorted(visits.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def _dashboard_payload(dates, metrics, active_faults):
+    most_visited = _most_visited(metrics)
+    metrics = {m.date: m for m in metrics}
+    empty = DailyMetrics()
+    today_metrics = metrics.get(dates[-1], empty)
+
+    return {
+        'total_staff_online_today': today_metrics.server_room_staff,
+        'active_faults': active_faults,
+        'server_room_entries_today': today_metrics.server_room_entries,
+        'field_activities_today': today_metrics.field_activities,
+        'faults_trend': [metrics.get(d, empty).faults_reported for d in dates],
+        'attendance_trend': [metrics.get(d, empty).server_room_staff for d in dates],
+        'most_visited_substations': [{'name': name, 'count': count} for name, count in most_visited],
+        'dates': [d.isoformat() for d in dates],
+    }
+
+
 @csrf_exempt
 def dashboard(request):
     # simple aggregated metrics and small trend arrays
@@ -523,78 +650,43 @@ def dashboard(request):
     if request.method != 'GET':
         return JsonResponse({'error': 'method not allowed'}, status=405)
 
-    today = datetime.date.today().isoformat()
-
+    # trend window in days (?days=N, up to DASHBOARD_MAX_DAYS)
     try:
-        server_room_entries_today = ServerRoomEntry.objects.filter(date=today).count()
-    except Exception:
-        server_room_entries_today = sum(1 for e in _ENTRIES if e.get('date') == today)
+        days = min(max(int(request.GET.get('days', 7)), 1), DASHBOARD_MAX_DAYS)
+    except ValueError:
+        return JsonResponse({'error': 'invalid days'}, status=400)
 
-    try:
-        field_activities_today = FieldActivity.objects.filter(date=today).count()
-    except Exception:
-        field_activities_today = sum(1 for f in _FIELD_ACTIVITIES if f.get('date') == today)
-
-    try:
-        active_faults = FaultReport.objects.exclude(status__in=['resolved', 'closed']).count()
-    except Exception:
-        active_faults = sum(1 for f in _FAULTS if f.get('status') not in ('resolved', 'closed'))
-
-    try:
-        total_staff_online_today = ServerRoomEntry.objects.filter(date=today).values('staff').distinct().count()
-    except Exception:
-        total_staff_online_today = len({e.get('staff') for e in _ENTRIES if e.get('date') == today})
-
-    # simple 7-day trend for faults (counts per day)
-    def date_range(days=7):
-        base = datetime.date.today()
-        return [(base - datetime.timedelta(days=i)).isoformat() for i in reversed(range(days))]
-
-    faults_trend = []
-    attendance_trend = []
-    dates = date_range(7)
-    for d in dates:
+    key = dashboard_cache_key(days)
+    data = cache.get(key)
+    if data is None:
         try:
-            faults_trend.append(FaultReport.objects.filter(date_reported=d).count())
-        except Exception:
-            faults_trend.append(sum(1 for f in _FAULTS if f.get('date_reported') == d))
-        try:
-            attendance_trend.append(ServerRoomEntry.objects.filter(date=d).values('staff').distinct().count())
-        except Exception:
-            attendance_trend.append(len({e.get('staff') for e in _ENTRIES if e.get('date') == d}))
-
-    # most visited substations (from field activities)
-    substation_counts = {}
-    try:
-        for fa in FieldActivity.objects.all():
-            name = fa.substation
-            if not name:
-                continue
-            substation_counts[name] = substation_counts.get(name, 0) + 1
-    except Exception:
-        for f in _FIELD_ACTIVITIES:
-            name = f.get('substation')
-            if not name:
-                continue
-            substation_counts[name] = substation_counts.get(name, 0) + 1
-    most_visited = sorted(substation_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-
-    data = {
-        'total_staff_online_today': total_staff_online_today,
-        'active_faults': active_faults,
-        'server_room_entries_today': server_room_entries_today,
-        'field_activities_today': field_activities_today,
-        'faults_trend': faults_trend,
-        'attendance_trend': attendance_trend,
-        'most_visited_substations': [{'name': n, 'count': c} for n, c in most_visited],
-        'dates': dates,
-    }
+            data = _dashboard_snapshot(days)
+            cache.set(key, data, DASHBOARD_CACHE_TTL)
+        except DatabaseError:
+            return JsonResponse({'error': 'dashboard unavailable'}, status=503)
 
     resp = JsonResponse(data, safe=False)
     resp['Access-Control-Allow-Origin'] = '*'
     return resp
 
 
+def _serialize_daily_fault(f, request):
+    item = {
+        'id': f.id,
+        'title': f.title,
+        'description': f.description,
+        'date_reported': str(f.date_reported),
+        'reported_by': f.reported_by.name if f.reported_by else None,
+        'location': f.location,
+        'severity': f.severity,
+        'status': f.status,
+        'resolution_remarks': f.resolution_remarks,
+    }
+    if f.attachment:
+        item['attachment_url'] = request.build_absolute_uri(f.attachment.url)
+    return item
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def daily_records(request):
@@ -612,98 +704,185 @@ def daily_records(request):
     sre_out = []
     try:
         qs = ServerRoomEntry.objects.select_related('staff').filter(date=qdate)
-        for e in qs:
-            sre_out.append({
-                'id': e.id,
-                'staff': e.staff.name,
-                'date': str(e.date),
-                'time_in': e.time_in.isoformat(),
-                'time_out': e.time_out.isoformat() if e.time_out else None,
-                'reason': e.reason,
-                'equipment_touched': e.equipment_touched,
-                'supervisor': e.supervisor,
-            })
+        sre_out = [_serialize_entry(e) for e in qs]
     except Exception:
-        sre_out = [e for e in _ENTRIES if e.get('date') == qdate]
+        sre_out = []
 
     # field activities
     fa_out = []
     try:
         qs = FieldActivity.objects.select_related('staff').filter(date=qdate)
-        for f in qs:
-            fa_out.append({
-                'id': f.id,
-                'staff': f.staff.name,
-                'substation': f.substation,
-                'date': str(f.date),
-                'time_out': f.time_out.isoformat(),
-                'time_returned': f.time_returned.isoformat() if f.time_returned else None,
-                'purpose': f.purpose,
-                'work_done': f.work_done,
-                'materials_used': f.materials_used,
-                'supervisor_approval': f.supervisor_approval,
-            })
+        fa_out = [_serialize_field_activity(f) for f in qs]
     except Exception:
-        fa_out = [f for f in _FIELD_ACTIVITIES if f.get('date') == qdate]
+        fa_out = []
 
     # faults by reported date
     faults_out = []
     try:
         qs = FaultReport.objects.select_related('reported_by').filter(date_reported=qdate)
-        for f in qs:
-            item = {
-                'id': f.id,
-                'title': f.title,
-                'description': f.description,
-                'date_reported': str(f.date_reported),
-                'reported_by': f.reported_by.name if f.reported_by else None,
-                'location': f.location,
-                'severity': f.severity,
-                'status': f.status,
-                'resolution_remarks': f.resolution_remarks,
-            }
-            if f.attachment:
-                item['attachment_url'] = request.build_absolute_uri(f.attachment.url)
-            faults_out.append(item)
+        faults_out = [_serialize_daily_fault(f, request) for f in qs]
     except Exception:
-        faults_out = [f for f in _FAULTS if f.get('date_reported') == qdate]
+        faults_out = []
 
     resp = JsonResponse({'date': qdate, 'server_room_entries': sre_out, 'field_activities': fa_out, 'faults': faults_out}, safe=False)
     resp['Access-Control-Allow-Origin'] = '*'
     return resp
 
 
-def _csv_response(filename, fieldnames, rows):
-    from django.http import HttpResponse
-    import csv
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    writer = csv.DictWriter(response, fieldnames=fieldnames)
-    writer.writeheader()
-    for r in rows:
-        writer.writerow(r)
-    return response
+@csrf_exempt
+@cached_get('search')
+def search(request):
+    """Ranked full-text search over faults, field activities and server-room entries.
+
+    GET ?q=words[&type=fault,field_activity,server_room][&limit=N][&cursor=...]
+    """
+    if request.method == 'OPTIONS':
+        resp = JsonResponse({'ok': True})
+        resp['Access-Control-Allow-Origin'] = '*'
+        resp['Access-Control-Allow-Methods'] = 'GET,OPTIONS'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type'
+        return resp
+
+    if request.method != 'GET':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    query = request.GET.get('q', '')
+    if not fulltext.terms(query):
+        return JsonResponse({'error': 'missing search terms'}, status=400)
+    kinds = _split_param(request.GET.get('type', ''))
+    unknown = [k for k in kinds if k not in fulltext.KINDS]
+    if unknown:
+        return JsonResponse({'error': f'unknown type: {", ".join(unknown)}'}, status=400)
+    try:
+        limit = parse_page_size(request.GET.get('limit'))
+        after = None
+        if request.GET.get('cursor'):
+            score, doc_id = decode_cursor(request.GET['cursor'], 2)
+            after = (float(score), int(doc_id))
+    except (InvalidCursor, TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e) if isinstance(e, InvalidCursor) else 'invalid cursor'}, status=400)
+
+    rows = fulltext.search(query, kinds=kinds, after=after, limit=limit)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['score'], rows[-1]['id']])
+    resp = JsonResponse({
+        'results': [
+            {
+                'type': r['kind'],
+                'id': r['object_id'],
+                'title': r['title'],
+                'date': str(r['date']) if r['date'] else None,
+                'excerpt': r['excerpt'],
+                'score': r['score'],
+            }
+            for r in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+FIELD_ACTIVITY_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('staff', 'staff__name'),
+    ('substation', 'substation'),
+    ('date', 'date'),
+    ('time_out', 'time_out'),
+    ('time_returned', 'time_returned'),
+    ('purpose', 'purpose'),
+    ('work_done', 'work_done'),
+    ('materials_used', 'materials_used'),
+    ('supervisor_approval', 'supervisor_approval'),
+]
+
+FAULT_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('date_reported', 'date_reported'),
+    ('reported_by', 'reported_by__name'),
+    ('assigned_to', 'assigned_to__name'),
+    ('location', 'location'),
+    ('severity', 'severity'),
+    ('status', 'status'),
+    ('resolution_remarks', 'resolution_remarks'),
+]
+
+
+def _export_response(filename, columns, qs, fmt='csv'):
+    """Stream ``qs`` as CSV or XLSX; ``columns`` is a list of (header, values_list lookup)."""
+    header = [name for name, _ in columns]
+    lookups = [lookup for _, lookup in columns]
+    return export_response(filename, header, iter_values(qs, lookups), fmt)
+
+
+EXPORT_SOURCES = {
+    'field_activities': (FieldActivity, 'date', FIELD_ACTIVITY_EXPORT_COLUMNS),
+    'faults': (FaultReport, 'date_reported', FAULT_EXPORT_COLUMNS),
+}
+
+
+def _export_queryset(params):
+    """Return ``(filename, columns, qs)`` for an export described by ``params``.
+
+    ``params`` holds ``source`` (a key of EXPORT_SOURCES) and optionally
+    ``start``/``end`` (inclusive, YYYY-MM-DD), ``ids``, ``filename`` and
+    ``format`` (csv or xlsx); the same dict is stored on background export
+    jobs. Raises ValueError.
+    """
+    model, date_field, columns = EXPORT_SOURCES[params['source']]
+    fmt = params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'unsupported format {fmt}')
+    qs = model.objects.all()
+    if params.get('start'):
+        qs = qs.filter(**{f'{date_field}__gte': datetime.date.fromisoformat(params['start'])})
+    if params.get('end'):
+        qs = qs.filter(**{f'{date_field}__lte': datetime.date.fromisoformat(params['end'])})
+    if params.get('ids') is not None:
+        qs = qs.filter(id__in=params['ids'])
+    stem = os.path.splitext(params.get('filename') or params['source'])[0]
+    return f'{stem}.{fmt}', columns, qs
+
+
+def _background_requested(request, data=None):
+    value = (data or {}).get('background', request.GET.get('background', ''))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _job_accepted(request, job):
+    """202 response pointing the client at the status URL of a queued job."""
+    body = jobs.describe(job, request)
+    resp = JsonResponse(body, status=202)
+    resp['Location'] = body['status_url']
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+def _export_format(request):
+    """The requested export format (``?format=csv|xlsx``), or None when unsupported."""
+    fmt = request.GET.get('format') or 'csv'
+    return fmt if fmt in EXPORT_FORMATS else None
+
+
+def _export(request, params):
+    """Stream the export now, or queue it as a job with ``?background=1``."""
+    fmt = _export_format(request)
+    if fmt is None:
+        return JsonResponse({'error': 'unsupported format, use csv or xlsx'}, status=400)
+    params = dict(params, format=fmt)
+    if _background_requested(request):
+        return _job_accepted(request, jobs.submit('export', params, user=request.GET.get('user', 'system')))
+    filename, columns, qs = _export_queryset(params)
+    return _export_response(filename, columns, qs, fmt)
 
 
 def export_field_activities_csv(request):
     try:
-        qs = FieldActivity.objects.select_related('staff').all()
-        rows = []
-        for f in qs:
-            rows.append({
-                'id': f.id,
-                'staff': f.staff.name,
-                'substation': f.substation,
-                'date': str(f.date),
-                'time_out': f.time_out.isoformat(),
-                'time_returned': f.time_returned.isoformat() if f.time_returned else '',
-                'purpose': f.purpose,
-                'work_done': f.work_done,
-                'materials_used': f.materials_used,
-                'supervisor_approval': f.supervisor_approval,
-            })
-        fieldnames = ['id','staff','substation','date','time_out','time_returned','purpose','work_done','materials_used','supervisor_approval']
-        return _csv_response('field_activities.csv', fieldnames, rows)
+        return _export(request, {'source': 'field_activities', 'filename': 'field_activities.csv'})
     except Exception:
         return JsonResponse({'error': 'could not export'}, status=500)
 
@@ -725,23 +904,12 @@ def export_activity_reports_weekly_csv(request):
         else:
             qstart_date = datetime.date.fromisoformat(qstart)
 
-        rows = []
-        qs = FieldActivity.objects.select_related('staff').filter(date__gte=qstart_date, date__lte=qend_date)
-        for f in qs:
-            rows.append({
-                'id': f.id,
-                'staff': f.staff.name,
-                'substation': f.substation,
-                'date': str(f.date),
-                'time_out': f.time_out.isoformat(),
-                'time_returned': f.time_returned.isoformat() if f.time_returned else '',
-                'purpose': f.purpose,
-                'work_done': f.work_done,
-                'materials_used': f.materials_used,
-                'supervisor_approval': f.supervisor_approval,
-            })
-        fieldnames = ['id','staff','substation','date','time_out','time_returned','purpose','work_done','materials_used','supervisor_approval']
-        return _csv_response(f'activity_reports_{qstart_date}_{qend_date}.csv', fieldnames, rows)
+        return _export(request, {
+            'source': 'field_activities',
+            'start': qstart_date.isoformat(),
+            'end': qend_date.isoformat(),
+            'filename': f'activity_reports_{qstart_date}_{qend_date}.csv',
+        })
     except Exception:
         return JsonResponse({'error': 'could not export weekly activities'}, status=500)
 
@@ -774,171 +942,79 @@ def export_activity_reports_monthly_csv(request):
             qstart_date = datetime.date(today.year, today.month, 1)
             qend_date = today
 
-        rows = []
-        qs = FieldActivity.objects.select_related('staff').filter(date__gte=qstart_date, date__lte=qend_date)
-        for f in qs:
-            rows.append({
-                'id': f.id,
-                'staff': f.staff.name,
-                'substation': f.substation,
-                'date': str(f.date),
-                'time_out': f.time_out.isoformat(),
-                'time_returned': f.time_returned.isoformat() if f.time_returned else '',
-                'purpose': f.purpose,
-                'work_done': f.work_done,
-                'materials_used': f.materials_used,
-                'supervisor_approval': f.supervisor_approval,
-            })
-        fieldnames = ['id','staff','substation','date','time_out','time_returned','purpose','work_done','materials_used','supervisor_approval']
         # filename uses YYYY-MM range for clarity
-        return _csv_response(f'activity_reports_{qstart_date}_{qend_date}.csv', fieldnames, rows)
+        return _export(request, {
+            'source': 'field_activities',
+            'start': qstart_date.isoformat(),
+            'end': qend_date.isoformat(),
+            'filename': f'activity_reports_{qstart_date}_{qend_date}.csv',
+        })
     except Exception:
         return JsonResponse({'error': 'could not export monthly activities'}, status=500)
 
 
 def export_faults_csv(request):
     try:
-        qs = FaultReport.objects.select_related('reported_by', 'assigned_to').all()
-        rows = []
-        for f in qs:
-            rows.append({
-                'id': f.id,
-                'title': f.title,
-                'description': f.description,
-                'date_reported': str(f.date_reported),
-                'reported_by': f.reported_by.name if f.reported_by else '',
-                'assigned_to': f.assigned_to.name if f.assigned_to else '',
-                'location': f.location,
-                'severity': f.severity,
-                'status': f.status,
-                'resolution_remarks': f.resolution_remarks,
-            })
-        fieldnames = ['id','title','description','date_reported','reported_by','assigned_to','location','severity','status','resolution_remarks']
-        return _csv_response('fault_reports.csv', fieldnames, rows)
+        return _export(request, {'source': 'faults', 'filename': 'fault_reports.csv'})
     except Exception:
         return JsonResponse({'error': 'could not export'}, status=500)
 
 
+DAILY_RECORD_EXPORT_HEADER = ['type', 'id', 'staff', 'substation_or_location', 'date', 'time_in', 'time_out', 'title', 'description', 'severity', 'status', 'resolution_remarks']
+
+
+def _iter_daily_records(qdate):
+    """Yield the combined daily export rows, one source table at a time."""
+    entries = ServerRoomEntry.objects.filter(date=qdate)
+    for id_, staff, date, time_in, time_out, reason in iter_values(
+            entries, ['id', 'staff__name', 'date', 'time_in', 'time_out', 'reason']):
+        yield ['server_room', id_, staff, '', date, time_in, time_out, '', reason, '', '', '']
+
+    activities = FieldActivity.objects.filter(date=qdate)
+    for id_, staff, substation, date, time_out, time_returned, work_done in iter_values(
+            activities, ['id', 'staff__name', 'substation', 'date', 'time_out', 'time_returned', 'work_done']):
+        yield ['field_activity', id_, staff, substation, date, time_out, time_returned, '', work_done, '', '', '']
+
+    faults = FaultReport.objects.filter(date_reported=qdate)
+    for id_, staff, location, date, title, description, severity, status, remarks in iter_values(
+            faults, ['id', 'reported_by__name', 'location', 'date_reported', 'title', 'description', 'severity', 'status', 'resolution_remarks']):
+        yield ['fault', id_, staff, location, date, '', '', title, description, severity, status, remarks]
+
+
+class _CSVFormatRenderer(JSONRenderer):
+    """Lets DRF's ``?format=`` negotiation accept export formats; errors still render as JSON."""
+    format = 'csv'
+
+
+class _XLSXFormatRenderer(JSONRenderer):
+    format = 'xlsx'
+
+
+def _checks_export_format(view):
+    """Answer an unsupported ``?format=`` with our 400 before DRF's negotiation turns it into a 404."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _export_format(request) is None:
+            return JsonResponse({'error': 'unsupported format, use csv or xlsx'}, status=400)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@_checks_export_format
 @api_view(['GET'])
+@renderer_classes([JSONRenderer, _CSVFormatRenderer, _XLSXFormatRenderer])
 def export_daily_records_csv(request):
+    fmt = _export_format(request)
     try:
         # allow any authenticated user to export combined daily records
         qdate = request.GET.get('date') or datetime.date.today().isoformat()
-        rows = []
-        # server room entries
-        try:
-            qs = ServerRoomEntry.objects.select_related('staff').filter(date=qdate)
-            for e in qs:
-                rows.append({
-                    'type': 'server_room',
-                    'id': e.id,
-                    'staff': e.staff.name,
-                    'substation_or_location': '',
-                    'date': str(e.date),
-                    'time_in': e.time_in.isoformat(),
-                    'time_out': e.time_out.isoformat() if e.time_out else '',
-                    'title': '',
-                    'description': e.reason,
-                    'severity': '',
-                    'status': '',
-                    'resolution_remarks': '',
-                })
-        except Exception:
-            for e in _ENTRIES:
-                if e.get('date') == qdate:
-                    rows.append({
-                        'type': 'server_room',
-                        'id': e.get('id'),
-                        'staff': e.get('staff'),
-                        'substation_or_location': '',
-                        'date': e.get('date'),
-                        'time_in': e.get('time_in'),
-                        'time_out': e.get('time_out'),
-                        'title': '',
-                        'description': e.get('reason'),
-                        'severity': '',
-                        'status': '',
-                        'resolution_remarks': '',
-                    })
-
-        # field activities
-        try:
-            qs = FieldActivity.objects.select_related('staff').filter(date=qdate)
-            for f in qs:
-                rows.append({
-                    'type': 'field_activity',
-                    'id': f.id,
-                    'staff': f.staff.name,
-                    'substation_or_location': f.substation,
-                    'date': str(f.date),
-                    'time_in': f.time_out.isoformat(),
-                    'time_out': f.time_returned.isoformat() if f.time_returned else '',
-                    'title': '',
-                    'description': f.work_done,
-                    'severity': '',
-                    'status': '',
-                    'resolution_remarks': '',
-                })
-        except Exception:
-            for f in _FIELD_ACTIVITIES:
-                if f.get('date') == qdate:
-                    rows.append({
-                        'type': 'field_activity',
-                        'id': f.get('id'),
-                        'staff': f.get('staff'),
-                        'substation_or_location': f.get('substation'),
-                        'date': f.get('date'),
-                        'time_in': f.get('time_out'),
-                        'time_out': f.get('time_returned'),
-                        'title': '',
-                        'description': f.get('work_done'),
-                        'severity': '',
-                        'status': '',
-                        'resolution_remarks': '',
-                    })
-
-        # faults
-        try:
-            qs = FaultReport.objects.select_related('reported_by').filter(date_reported=qdate)
-            for f in qs:
-                rows.append({
-                    'type': 'fault',
-                    'id': f.id,
-                    'staff': f.reported_by.name if f.reported_by else '',
-                    'substation_or_location': f.location,
-                    'date': str(f.date_reported),
-                    'time_in': '',
-                    'time_out': '',
-                    'title': f.title,
-                    'description': f.description,
-                    'severity': f.severity,
-                    'status': f.status,
-                    'resolution_remarks': f.resolution_remarks,
-                })
-        except Exception:
-            for f in _FAULTS:
-                if f.get('date_reported') == qdate:
-                    rows.append({
-                        'type': 'fault',
-                        'id': f.get('id'),
-                        'staff': f.get('reported_by'),
-                        'substation_or_location': f.get('location'),
-                        'date': f.get('date_reported'),
-                        'time_in': '',
-                        'time_out': '',
-                        'title': f.get('title'),
-                        'description': f.get('description'),
-                        'severity': f.get('severity'),
-                        'status': f.get('status'),
-                        'resolution_remarks': f.get('resolution_remarks'),
-                    })
-
-        fieldnames = ['type','id','staff','substation_or_location','date','time_in','time_out','title','description','severity','status','resolution_remarks']
-        return _csv_response(f'daily_records_{qdate}.csv', fieldnames, rows)
+        datetime.date.fromisoformat(qdate)
+        return export_response(f'daily_records_{qdate}.csv', DAILY_RECORD_EXPORT_HEADER, _iter_daily_records(qdate), fmt)
     except Exception:
         return JsonResponse({'error': 'could not export daily records'}, status=500)
 
 
+@cached_get('activity_reports')
 def activity_reports(request):
     # simple endpoint to return recent field activities or placeholder reports
     if request.method == 'OPTIONS':
@@ -954,40 +1030,10 @@ def activity_reports(request):
     out = []
     try:
         qs = FieldActivity.objects.select_related('staff').order_by('-date')[:50]
-        out = [
-            {
-                'id': f.id,
-                'staff': f.staff.name,
-                'substation': f.substation,
-                'date': str(f.date),
-                'time_out': f.time_out.isoformat(),
-                'time_returned': f.time_returned.isoformat() if f.time_returned else None,
-                'purpose': f.purpose,
-                'work_done': f.work_done,
-                'materials_used': f.materials_used,
-                'supervisor_approval': f.supervisor_approval,
-            }
-            for f in qs
-        ]
+        out = [_serialize_field_activity(f) for f in qs]
     except Exception:
         out = []
 
-    # include any in-memory fallback field activities so they appear in reports
-    if _FIELD_ACTIVITIES:
-        for f in _FIELD_ACTIVITIES:
-            out.append({
-                'id': f.get('id'),
-                'staff': f.get('staff'),
-                'substation': f.get('substation'),
-                'date': f.get('date'),
-                'time_out': f.get('time_out'),
-                'time_returned': f.get('time_returned'),
-                'purpose': f.get('purpose'),
-                'work_done': f.get('work_done'),
-                'materials_used': f.get('materials_used'),
-                'supervisor_approval': f.get('supervisor_approval'),
-            })
-
     resp = JsonResponse(out, safe=False)
     resp['Access-Control-Allow-Origin'] = '*'
     return resp
@@ -1058,15 +1104,7 @@ def get_fault_feedbacks(request, fault_id):
     if request.method == 'GET':
         try:
             feedbacks = FaultFeedback.objects.filter(fault_id=fault_id)
-            out = []
-            for fb in feedbacks:
-                out.append({
-                    'id': fb.id,
-                    'staff_name': fb.staff_name,
-                    'staff_email': fb.staff_email,
-                    'feedback_text': fb.feedback_text,
-                    'date_submitted': fb.date_submitted.isoformat()
-                })
+            out = [_serialize_feedback(fb) for fb in feedbacks]
             resp = JsonResponse(out, safe=False)
             resp['Access-Control-Allow-Origin'] = '*'
             return resp
@@ -1087,20 +1125,15 @@ def _get_client_ip(request):
 
 
 def _create_audit_log(action, model_name, object_id, user='system', changes=None, request=None):
-    """Create an audit log entry"""
-    from gridapp.models import AuditLog
-    try:
-        ip_address = _get_client_ip(request) if request else None
-        AuditLog.objects.create(
-            action=action,
-            model_name=model_name,
-            object_id=object_id,
-            user=user,
-            changes=changes or {},
-            ip_address=ip_address
-        )
-    except Exception as e:
-        print(f"Error creating audit log: {str(e)}")
+    """Queue an audit log entry for the background writer (backend/audit.py)"""
+    audit.record(
+        action=action,
+        model_name=model_name,
+        object_id=object_id,
+        user=user,
+        changes=changes,
+        ip_address=_get_client_ip(request) if request else None,
+    )
 
 
 @csrf_exempt
@@ -1126,8 +1159,11 @@ def fault_attachment_delete(request, pk):
 
     try:
         attachment_name = fault.attachment.name
-        fault.attachment.delete()  # Deletes file from storage
-        fault.save()
+        fault.attachment = None
+        fault.attachment_name = ''
+        fault.save(update_fields=['attachment', 'attachment_name'])
+        # stored bytes may be shared with other faults; only the last reference removes them
+        release_attachment(attachment_name)
         
         _create_audit_log(
             action='ATTACHMENT_DELETE',
@@ -1148,12 +1184,12 @@ def fault_attachment_delete(request, pk):
 
 @csrf_exempt
 def fault_attachment_preview(request, pk):
-    """Get attachment file for preview/download"""
+    """Get attachment file for preview/download (supports Range and conditional requests)"""
     if request.method == 'OPTIONS':
         resp = JsonResponse({'ok': True})
         resp['Access-Control-Allow-Origin'] = '*'
         resp['Access-Control-Allow-Methods'] = 'GET,OPTIONS'
-        resp['Access-Control-Allow-Headers'] = 'Content-Type'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type, Range, If-None-Match, If-Modified-Since, If-Range'
         return resp
 
     if request.method != 'GET':
@@ -1167,11 +1203,22 @@ def fault_attachment_preview(request, pk):
     if not fault.attachment:
         return JsonResponse({'error': 'no attachment'}, status=404)
 
+    variant = request.GET.get('variant')
+    if variant and variant not in renditions.RENDITIONS:
+        return JsonResponse({'error': f'unknown variant, expected one of: {", ".join(renditions.RENDITIONS)}'}, status=400)
+
     try:
-        response = FileResponse(fault.attachment.open('rb'))
-        response['Content-Type'] = 'application/octet-stream'
-        response['Content-Disposition'] = f'inline; filename="{fault.attachment.name.split("/")[-1]}"'
+        filename = fault.attachment_name or fault.attachment.name.split('/')[-1]
+        # ?variant=thumb|web serves a cached rendition (built now if missing); otherwise, or when
+        # the image cannot be rendered, the original
+        rendition = renditions.get_rendition(fault.attachment.name, variant) if variant else None
+        if rendition:
+            stored = SimpleNamespace(storage=renditions.rendition_storage, name=rendition)
+            response = serve_file(request, stored, filename=f'{os.path.splitext(filename)[0]}-{variant}.jpg')
+        else:
+            response = serve_file(request, fault.attachment, filename=filename)
         response['Access-Control-Allow-Origin'] = '*'
+        response['Access-Control-Expose-Headers'] = 'Content-Range, Content-Length, ETag'
         return response
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1200,26 +1247,23 @@ def bulk_delete_faults(request):
         return JsonResponse({'error': 'missing or invalid ids'}, status=400)
 
     try:
-        faults = FaultReport.objects.filter(id__in=ids)
-        deleted_count = 0
-        
-        for fault in faults:
-            fault_id = fault.id
-            fault.delete()
-            deleted_count += 1
-            
-            _create_audit_log(
-                action='DELETE',
-                model_name='FaultReport',
-                object_id=fault_id,
-                user=data.get('user', 'system'),
-                changes={'deleted': True},
-                request=request
-            )
-        
+        ids = bulk.normalize_ids(ids)
+    except ValueError:
+        return JsonResponse({'error': 'ids must be integers'}, status=400)
+
+    user = data.get('user', 'system')
+    ip_address = _get_client_ip(request)
+    if _background_requested(request, data) or len(ids) > jobs.JOB_SYNC_LIMIT:
+        job = jobs.submit('bulk_delete_faults', {'ids': ids, 'ip_address': ip_address}, user=user)
+        return _job_accepted(request, job)
+    try:
+        existing = bulk.delete_faults(ids, user=user, ip_address=ip_address)
+        deleted_count = len(existing)
+
         resp = JsonResponse({
             'message': f'Successfully deleted {deleted_count} fault(s)',
-            'deleted_count': deleted_count
+            'deleted_count': deleted_count,
+            'results': {str(i): 'deleted' if i in existing else 'not_found' for i in ids},
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1254,59 +1298,30 @@ def bulk_update_faults(request):
     if not updates:
         return JsonResponse({'error': 'no updates provided'}, status=400)
 
-    allowed_fields = ['status', 'resolution_remarks', 'assigned_to', 'severity']
-    invalid_fields = [k for k in updates.keys() if k not in allowed_fields]
-    if invalid_fields:
-        return JsonResponse({'error': f'invalid fields: {", ".join(invalid_fields)}'}, status=400)
+    try:
+        bulk.validate_updates(updates)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
 
     try:
-        faults = FaultReport.objects.filter(id__in=ids)
-        updated_count = 0
-        
-        for fault in faults:
-            changes = {}
-            
-            for field, value in updates.items():
-                if field == 'assigned_to':
-                    old_value = fault.assigned_to.name if fault.assigned_to else None
-                    if value:
-                        # Try to find staff by ID or name
-                        try:
-                            assigned_staff = Staff.objects.get(id=value)
-                        except (Staff.DoesNotExist, ValueError):
-                            try:
-                                assigned_staff = Staff.objects.get(name__iexact=value)
-                            except Staff.DoesNotExist:
-                                continue
-                        fault.assigned_to = assigned_staff
-                        new_value = assigned_staff.name
-                    else:
-                        fault.assigned_to = None
-                        new_value = None
-                    if old_value != new_value:
-                        changes[field] = {'old': old_value, 'new': new_value}
-                else:
-                    old_value = getattr(fault, field)
-                    if old_value != value:
-                        setattr(fault, field, value)
-                        changes[field] = {'old': old_value, 'new': value}
-            
-            if changes:
-                fault.save()
-                updated_count += 1
-                
-                _create_audit_log(
-                    action='BULK_UPDATE',
-                    model_name='FaultReport',
-                    object_id=fault.id,
-                    user=data.get('user', 'system'),
-                    changes=changes,
-                    request=request
-                )
-        
+        ids = bulk.normalize_ids(ids)
+    except ValueError:
+        return JsonResponse({'error': 'ids must be integers'}, status=400)
+
+    user = data.get('user', 'system')
+    ip_address = _get_client_ip(request)
+    if _background_requested(request, data) or len(ids) > jobs.JOB_SYNC_LIMIT:
+        job = jobs.submit('bulk_update_faults', {'ids': ids, 'updates': updates, 'ip_address': ip_address}, user=user)
+        return _job_accepted(request, job)
+
+    try:
+        results = bulk.update_faults(ids, updates, user=user, ip_address=ip_address)
+        updated_count = sum(1 for status in results.values() if status == 'updated')
+
         resp = JsonResponse({
             'message': f'Successfully updated {updated_count} fault(s)',
-            'updated_count': updated_count
+            'updated_count': updated_count,
+            'results': results,
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1343,34 +1358,126 @@ def bulk_export_faults(request):
         return JsonResponse({'error': 'no ids provided'}, status=400)
 
     try:
-        faults = FaultReport.objects.filter(id__in=ids).select_related('reported_by', 'assigned_to')
-        rows = []
-        
-        for f in faults:
-            rows.append({
-                'id': f.id,
-                'title': f.title,
-                'description': f.description,
-                'date_reported': str(f.date_reported),
-                'reported_by': f.reported_by.name if f.reported_by else '',
-                'assigned_to': f.assigned_to.name if f.assigned_to else '',
-                'location': f.location,
-                'severity': f.severity,
-                'status': f.status,
-                'resolution_remarks': f.resolution_remarks,
-            })
-        
-        fieldnames = ['id', 'title', 'description', 'date_reported', 'reported_by', 'assigned_to', 'location', 'severity', 'status', 'resolution_remarks']
-        response = _csv_response(f'faults_export.csv', fieldnames, rows)
+        response = _export(request, {'source': 'faults', 'ids': ids, 'filename': 'faults_export.csv'})
         response['Access-Control-Allow-Origin'] = '*'
         return response
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _bulk_ingest(request, resource):
+    """Shared body of the batch ingest endpoints (see backend/ingest.py)"""
+    if request.method == 'OPTIONS':
+        resp = JsonResponse({'ok': True})
+        resp['Access-Control-Allow-Origin'] = '*'
+        resp['Access-Control-Allow-Methods'] = 'POST,OPTIONS'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type'
+        return resp
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        rows = ingest.parse_body(request)
+    except ingest.TooManyRows as e:
+        return JsonResponse({'error': f'too many rows, at most {e} per batch'}, status=413)
+    except Exception:
+        return JsonResponse({'error': 'invalid json'}, status=400)
+    if not rows:
+        return JsonResponse({'error': 'no rows provided'}, status=400)
+
+    try:
+        created, results = ingest.ingest(resource, rows)
+    except IntegrityError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except DatabaseError:
+        # nothing was inserted; the client can resend the whole batch
+        return JsonResponse({'error': 'database unavailable'}, status=503)
+
+    resp = JsonResponse({
+        'created': created,
+        'failed': len(rows) - created,
+        'results': results,
+    }, status=201 if created else 400)
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+@csrf_exempt
+def bulk_ingest_server_room(request):
+    """Create many server room entries from a JSON array or NDJSON body"""
+    return _bulk_ingest(request, 'server_room')
+
+
+@csrf_exempt
+def bulk_ingest_server_room_visitors(request):
+    """Create many server room visitor records from a JSON array or NDJSON body"""
+    return _bulk_ingest(request, 'server_room_visitors')
+
+
+@csrf_exempt
+def bulk_ingest_field_activities(request):
+    """Create many field activities from a JSON array or NDJSON body"""
+    return _bulk_ingest(request, 'field_activities')
+
+
+AUDIT_LOG_FIELDS = ['id', 'action', 'model_name', 'object_id', 'user', 'changes', 'timestamp', 'ip_address']
+
+
+def _parse_timestamp(value, name):
+    """Parse an ISO date or datetime query parameter; naive values are in the current time zone."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'invalid {name}')
+        parsed = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _audit_queryset(params):
+    """Filtered AuditLog queryset for the query string ``params``. Raises ValueError."""
+    from gridapp.models import AuditLog
+
+    qs = AuditLog.objects.all()
+    if params.get('model_name'):
+        qs = qs.filter(model_name=params['model_name'])
+    if params.get('object_id'):
+        try:
+            qs = qs.filter(object_id=int(params['object_id']))
+        except ValueError:
+            raise ValueError('invalid object_id')
+    if params.get('action'):
+        qs = qs.filter(action=params['action'])
+    if params.get('user'):
+        qs = qs.filter(user=params['user'])
+    elif params.get('user_prefix'):
+        # a plain range instead of LIKE so the (user, timestamp, id) index is used
+        prefix = params['user_prefix']
+        qs = qs.filter(user__gte=prefix, user__lt=prefix + '\U0010ffff')
+    if params.get('since'):
+        qs = qs.filter(timestamp__gte=_parse_timestamp(params['since'], 'since'))
+    if params.get('until'):
+        qs = qs.filter(timestamp__lt=_parse_timestamp(params['until'], 'until'))
+    return qs
+
+
+def _serialize_audit_log(row):
+    return {**row, 'timestamp': row['timestamp'].isoformat()}
+
+
 @csrf_exempt
 def audit_log_view(request):
-    """Retrieve audit logs with optional filtering"""
+    """Retrieve audit logs, newest first.
+
+    Filters: model_name, object_id, action, user (exact) or user_prefix,
+    since/until (ISO date or datetime; until is exclusive). Passing ``cursor``
+    (empty for the first page) returns ``{"results", "next_cursor"}`` pages
+    keyed on (timestamp, id); without it the first ``limit`` rows are returned
+    as a list. ``format=ndjson`` streams every matching row.
+    """
     if request.method == 'OPTIONS':
         resp = JsonResponse({'ok': True})
         resp['Access-Control-Allow-Origin'] = '*'
@@ -1381,46 +1488,127 @@ def audit_log_view(request):
     if request.method != 'GET':
         return JsonResponse({'error': 'method not allowed'}, status=405)
 
-    from gridapp.models import AuditLog
-    
     try:
-        model_name = request.GET.get('model_name')
-        object_id = request.GET.get('object_id')
-        user = request.GET.get('user')
-        action = request.GET.get('action')
-        limit = int(request.GET.get('limit', 100))
-        
-        qs = AuditLog.objects.all()
-        
-        if model_name:
-            qs = qs.filter(model_name=model_name)
-        if object_id:
-            qs = qs.filter(object_id=object_id)
-        if user:
-            qs = qs.filter(user__icontains=user)
-        if action:
-            qs = qs.filter(action=action)
-        
-        logs = qs[:limit]
-        out = []
-        
-        for log in logs:
-            out.append({
-                'id': log.id,
-                'action': log.action,
-                'model_name': log.model_name,
-                'object_id': log.object_id,
-                'user': log.user,
-                'changes': log.changes,
-                'timestamp': log.timestamp.isoformat(),
-                'ip_address': log.ip_address,
+        qs = _audit_queryset(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    qs = qs.values(*AUDIT_LOG_FIELDS)
+
+    if request.GET.get('format') == 'ndjson':
+        rows = qs.order_by('-timestamp', '-id').iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        resp = ndjson_response('audit_log.ndjson', map(_serialize_audit_log, rows))
+        resp['Access-Control-Allow-Origin'] = '*'
+        return resp
+
+    try:
+        limit = parse_page_size(request.GET.get('limit'), default=100)
+        if 'cursor' in request.GET:
+            rows, next_cursor = keyset_page(
+                qs, ['timestamp', 'id'],
+                cursor=request.GET.get('cursor'),
+                limit=limit,
+                key=lambda row: [row['timestamp'].isoformat(), row['id']],
+            )
+            resp = JsonResponse({
+                'results': [_serialize_audit_log(row) for row in rows],
+                'next_cursor': next_cursor,
             })
-        
-        resp = JsonResponse(out, safe=False)
+        else:
+            rows = qs.order_by('-timestamp', '-id')[:limit]
+            resp = JsonResponse([_serialize_audit_log(row) for row in rows], safe=False)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except (ValidationError, ValueError, TypeError):
+        # a well-formed cursor holding values of the wrong type
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+HISTORY_FILTERS = ('status', 'severity', 'location', 'assigned_to', 'reported_by')
+
+
+def _history_at(params):
+    if not params.get('at'):
+        return timezone.now()
+    return _parse_timestamp(params['at'], 'at')
+
+
+@csrf_exempt
+def fault_history(request, pk):
+    """State of one fault as of ``at`` (ISO date or datetime, default now), rebuilt from the audit log."""
+    if request.method == 'OPTIONS':
+        resp = JsonResponse({'ok': True})
         resp['Access-Control-Allow-Origin'] = '*'
+        resp['Access-Control-Allow-Methods'] = 'GET,OPTIONS'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type'
         return resp
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
+
+    if request.method != 'GET':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        at = _history_at(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    state = history.state_at('FaultReport', pk, at)
+    if state is None:
+        return JsonResponse({'error': 'fault did not exist at that time'}, status=404)
+    resp = JsonResponse({'id': pk, 'at': at.isoformat(), 'state': state})
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
+
+
+@csrf_exempt
+def fault_history_report(request):
+    """State of every fault that existed at ``at``, highest id first.
+
+    ``at`` is an ISO date or datetime (default now). Filters on the state at
+    that time: status, severity, location, assigned_to, reported_by (exact).
+    Pages of ``limit`` faults come as ``{"at", "results", "next_cursor"}``;
+    ``format=ndjson`` streams every matching fault.
+    """
+    if request.method == 'OPTIONS':
+        resp = JsonResponse({'ok': True})
+        resp['Access-Control-Allow-Origin'] = '*'
+        resp['Access-Control-Allow-Methods'] = 'GET,OPTIONS'
+        resp['Access-Control-Allow-Headers'] = 'Content-Type'
+        return resp
+
+    if request.method != 'GET':
+        return JsonResponse({'error': 'method not allowed'}, status=405)
+
+    try:
+        at = _history_at(request.GET)
+        limit = parse_page_size(request.GET.get('limit'), default=100)
+        before_id = None
+        if request.GET.get('cursor'):
+            before_id = decode_cursor(request.GET['cursor'], 1)[0]
+            if not isinstance(before_id, int):
+                raise InvalidCursor('invalid cursor')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    filters = {f: request.GET[f] for f in HISTORY_FILTERS if request.GET.get(f)}
+
+    def matching():
+        for object_id, state in history.iter_states('FaultReport', at, before_id=before_id):
+            if all(state.get(f) == value for f, value in filters.items()):
+                yield {'id': object_id, **state}
+
+    if request.GET.get('format') == 'ndjson':
+        resp = ndjson_response(f'faults_{at.date().isoformat()}.ndjson', matching())
+        resp['Access-Control-Allow-Origin'] = '*'
+        return resp
+
+    results = []
+    for row in matching():
+        results.append(row)
+        if len(results) > limit:
+            break
+    next_cursor = encode_cursor([results[limit - 1]['id']]) if len(results) > limit else None
+    resp = JsonResponse({'at': at.isoformat(), 'results': results[:limit], 'next_cursor': next_cursor})
+    resp['Access-Control-Allow-Origin'] = '*'
+    return resp
 
 
 def serve_index_html(request):
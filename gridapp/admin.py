@@ -1,7 +1,6 @@
 from django.contrib import admin
-from .models import Staff, ServerRoomEntry, FaultReport, FieldActivity, FaultFeedback, ServerRoomVisitor, AuditLog
-from django.http import HttpResponse
-import csv
+from .models import Staff, ServerRoomEntry, FaultReport, FieldActivity, FaultFeedback, ServerRoomVisitor, AuditLog, DailyMetrics, Job
+from backend.exports import EXPORT_CHUNK_SIZE, export_response
 
 
 @admin.action(description='Suspend selected staff')
@@ -9,31 +8,39 @@ def suspend_staff(modeladmin, request, queryset):
     queryset.update(is_active=False)
 
 
-@admin.action(description='Export selected to CSV')
-def export_as_csv(modeladmin, request, queryset):
+def _export_selected(modeladmin, queryset, fmt):
     meta = modeladmin.model._meta
     field_names = [f.name for f in meta.fields]
+    related = [f.name for f in meta.fields if f.is_relation]
+
+    rows = (
+        [getattr(obj, f) for f in field_names]
+        for obj in queryset.select_related(*related).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    return export_response(f'{meta}.{fmt}', field_names, rows, fmt)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename={meta}.csv'
-    writer = csv.writer(response)
-    writer.writerow(field_names)
-    for obj in queryset:
-        writer.writerow([getattr(obj, f) for f in field_names])
-    return response
+
+@admin.action(description='Export selected to CSV')
+def export_as_csv(modeladmin, request, queryset):
+    return _export_selected(modeladmin, queryset, 'csv')
+
+
+@admin.action(description='Export selected to Excel (XLSX)')
+def export_as_xlsx(modeladmin, request, queryset):
+    return _export_selected(modeladmin, queryset, 'xlsx')
 
 
 @admin.register(Staff)
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'is_active')
-    actions = [suspend_staff, export_as_csv]
+    actions = [suspend_staff, export_as_csv, export_as_xlsx]
 
 
 @admin.register(ServerRoomEntry)
 class ServerRoomEntryAdmin(admin.ModelAdmin):
     list_display = ('staff', 'date', 'time_in', 'time_out', 'supervisor')
     list_filter = ('date', 'staff')
-    actions = [export_as_csv]
+    actions = [export_as_csv, export_as_xlsx]
 
 
 @admin.register(ServerRoomVisitor)
@@ -41,21 +48,21 @@ class ServerRoomVisitorAdmin(admin.ModelAdmin):
     list_display = ('staff_id', 'name', 'date', 'time_in', 'time_out')
     list_filter = ('date',)
     search_fields = ('staff_id', 'name')
-    actions = [export_as_csv]
+    actions = [export_as_csv, export_as_xlsx]
 
 
 @admin.register(FaultReport)
 class FaultReportAdmin(admin.ModelAdmin):
     list_display = ('title', 'date_reported', 'reported_by', 'assigned_to', 'location', 'status')
     list_filter = ('status', 'date_reported')
-    actions = [export_as_csv]
+    actions = [export_as_csv, export_as_xlsx]
 
 
 @admin.register(FieldActivity)
 class FieldActivityAdmin(admin.ModelAdmin):
     list_display = ('staff', 'substation', 'date', 'time_out', 'time_returned')
     list_filter = ('date', 'substation')
-    actions = [export_as_csv]
+    actions = [export_as_csv, export_as_xlsx]
 
 
 @admin.register(FaultFeedback)
@@ -63,7 +70,27 @@ class FaultFeedbackAdmin(admin.ModelAdmin):
     list_display = ('fault', 'staff_name', 'staff_email', 'date_submitted')
     list_filter = ('date_submitted', 'fault')
     readonly_fields = ('date_submitted',)
-    actions = [export_as_csv]
+    actions = [export_as_csv, export_as_xlsx]
+
+
+@admin.register(DailyMetrics)
+class DailyMetricsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'faults_reported', 'server_room_entries', 'server_room_staff', 'field_activities')
+    readonly_fields = ('date', 'faults_reported', 'server_room_entries', 'server_room_staff', 'field_activities', 'substation_visits', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress_done', 'progress_total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('kind', 'params', 'status', 'progress_done', 'progress_total', 'result', 'result_file', 'error',
+                       'created_by', 'created_at', 'started_at', 'finished_at', 'updated_at')
+
+    def has_add_permission(self, request):
+        return False
 
 
 @admin.register(AuditLog)
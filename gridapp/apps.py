@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class GridappConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'gridapp'
+
+    def ready(self):
+        # register model signal handlers (cache invalidation etc.)
+        from . import signals  # noqa: F401
@@ -0,0 +1,240 @@
+"""Point-in-time state of audited records, rebuilt from AuditLog diffs.
+
+Changes to a FaultReport are logged with ``{field: {'old', 'new'}}`` diffs.
+The state of a record as of ``at`` starts from one anchor and replays only the
+entries between that anchor and ``at``:
+
+* the latest AuditCheckpoint at or before ``at``, rolled forward with the
+  ``new`` values of the entries after it;
+* otherwise the earliest checkpoint after ``at``, or failing that the live
+  row, rolled back with the ``old`` values of the entries after ``at``.
+
+Without a checkpoint at or before ``at``, a record only existed then if its
+CREATE entry is at or before ``at``; one created later, or with no CREATE
+entry at all (rows made outside the audited views), is ``None``. Crossing a
+DELETE forwards also means it did not exist. A deleted record with no
+checkpoint is rebuilt forward from its CREATE entry, which logs the full row.
+
+``checkpoint`` snapshots every record whose log has grown by
+``HISTORY_CHECKPOINT_INTERVAL`` entries since its last checkpoint (run it
+periodically with ``manage.py checkpoint_history``), so the tail replayed is
+about that long however old the record is. Bulk deletes ``snapshot`` rows
+before removing them, as a deleted row can no longer anchor a roll back.
+
+``states_at`` works in batches of ``HISTORY_BATCH_SIZE`` records with a
+fixed number of queries per batch, and ``iter_states`` walks every record
+that existed at a given time, for reports over the whole table.
+"""
+from django.conf import settings
+from django.db.models import Count, F, Max, Min, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .models import AuditCheckpoint, AuditLog, FaultReport
+
+
+HISTORY_CHECKPOINT_INTERVAL = getattr(settings, 'HISTORY_CHECKPOINT_INTERVAL', 50)
+HISTORY_BATCH_SIZE = 300
+
+CREATE_ACTIONS = ('CREATE',)
+DELETE_ACTIONS = ('DELETE', 'BULK_DELETE')
+
+
+def _fault_state(row):
+    return {
+        'title': row['title'],
+        'description': row['description'],
+        'date_reported': row['date_reported'].isoformat(),
+        'reported_by': row['reported_by__name'],
+        'assigned_to': row['assigned_to__name'],
+        'location': row['location'],
+        'severity': row['severity'],
+        'status': row['status'],
+        'resolution_remarks': row['resolution_remarks'],
+        'attachment': row['attachment'] or None,
+        'attachment_name': row['attachment_name'],
+    }
+
+
+# model name -> (model, values() fields, values row -> state); state keys and values
+# are in the terms the views log diffs in (staff by name, attachment by stored name)
+TRACKED = {
+    'FaultReport': (
+        FaultReport,
+        ('id', 'title', 'description', 'date_reported', 'reported_by__name', 'assigned_to__name',
+         'location', 'severity', 'status', 'resolution_remarks', 'attachment', 'attachment_name'),
+        _fault_state,
+    ),
+}
+
+
+def _live_states(model_name, ids):
+    model, fields, build = TRACKED[model_name]
+    rows = model.objects.filter(pk__in=ids).order_by().values(*fields)
+    return {row['id']: build(row) for row in rows}
+
+
+def creation_changes(model_name, object_id):
+    """The CREATE audit diff of a new record: every tracked field, from None to its value."""
+    state = _live_states(model_name, [object_id]).get(object_id, {})
+    return {field: {'old': None, 'new': value} for field, value in state.items()}
+
+
+def snapshot(model_name, ids):
+    """Checkpoint the current state of the ``model_name`` rows ``ids``; returns how many were written."""
+    ids = sorted(set(ids))
+    count = 0
+    for start in range(0, len(ids), HISTORY_BATCH_SIZE):
+        now = timezone.now()
+        states = _live_states(model_name, ids[start:start + HISTORY_BATCH_SIZE])
+        AuditCheckpoint.objects.bulk_create([
+            AuditCheckpoint(model_name=model_name, object_id=object_id, timestamp=now, state=state)
+            for object_id, state in states.items()
+        ])
+        count += len(states)
+    return count
+
+
+def checkpoint(model_name='FaultReport', min_entries=None):
+    """Snapshot the records with at least ``min_entries`` audit entries since their last checkpoint."""
+    min_entries = HISTORY_CHECKPOINT_INTERVAL if min_entries is None else min_entries
+    last = (AuditCheckpoint.objects
+            .filter(model_name=model_name, object_id=OuterRef('object_id'))
+            .order_by('-timestamp').values('timestamp')[:1])
+    due = (AuditLog.objects
+           .filter(model_name=model_name)
+           .annotate(checkpointed=Subquery(last))
+           .filter(Q(checkpointed__isnull=True) | Q(timestamp__gt=F('checkpointed')))
+           .order_by().values('object_id')
+           .annotate(entries=Count('id'))
+           .filter(entries__gte=min_entries)
+           .values_list('object_id', flat=True))
+    # deleted records drop out here: their last state was snapshotted on delete
+    return snapshot(model_name, list(due))
+
+
+def _apply(state, entry, forward):
+    action = entry['action']
+    if forward and action in DELETE_ACTIONS:
+        return None
+    if not forward and action in CREATE_ACTIONS:
+        return None
+    # only a CREATE brings a record into existence
+    if state is None and (not forward or action not in CREATE_ACTIONS):
+        return None
+    state = dict(state or {})
+    side = 'new' if forward else 'old'
+    for field, change in (entry['changes'] or {}).items():
+        # DELETE entries log {'deleted': True}, not a diff
+        if isinstance(change, dict) and side in change:
+            state[field] = change[side]
+    return state
+
+
+def _checkpoints(model_name, ids, at, before):
+    """The latest checkpoint at or before ``at`` (or the earliest after it) of each of ``ids``."""
+    qs = AuditCheckpoint.objects.filter(model_name=model_name, object_id__in=ids)
+    if before:
+        qs, pick = qs.filter(timestamp__lte=at), Max('timestamp')
+    else:
+        qs, pick = qs.filter(timestamp__gt=at), Min('timestamp')
+    marks = dict(qs.order_by().values('object_id').annotate(mark=pick).values_list('object_id', 'mark'))
+    if not marks:
+        return {}
+    found = {}
+    rows = (AuditCheckpoint.objects
+            .filter(model_name=model_name, object_id__in=marks, timestamp__in=set(marks.values()))
+            .values('object_id', 'timestamp', 'state'))
+    for row in rows:
+        if marks[row['object_id']] == row['timestamp']:
+            found[row['object_id']] = row
+    return found
+
+
+def _states_chunk(model_name, ids, at):
+    # object_id -> (anchor state, entries after, entries up to or None, forward)
+    plans = {}
+    for object_id, cp in _checkpoints(model_name, ids, at, before=True).items():
+        plans[object_id] = (cp['state'], cp['timestamp'], at, True)
+    rest = [i for i in ids if i not in plans]
+    absent = set()
+    if rest:
+        created = set(AuditLog.objects
+                      .filter(model_name=model_name, object_id__in=rest, action__in=CREATE_ACTIONS, timestamp__lte=at)
+                      .values_list('object_id', flat=True))
+        absent = set(rest) - created
+        rest = [i for i in rest if i in created]
+    if rest:
+        for object_id, cp in _checkpoints(model_name, rest, at, before=False).items():
+            plans[object_id] = (cp['state'], at, cp['timestamp'], False)
+        rest = [i for i in rest if i not in plans]
+    if rest:
+        live = _live_states(model_name, rest)
+        for object_id in rest:
+            if object_id in live:
+                plans[object_id] = (live[object_id], at, None, False)
+            else:
+                plans[object_id] = (None, None, at, True)
+
+    window = Q()
+    for object_id, (_, after, until, _) in plans.items():
+        condition = Q(object_id=object_id)
+        if after is not None:
+            condition &= Q(timestamp__gt=after)
+        if until is not None:
+            condition &= Q(timestamp__lte=until)
+        window |= condition
+    tails = {}
+    entries = (AuditLog.objects.filter(model_name=model_name).filter(window)
+               .order_by('timestamp', 'id').values('object_id', 'action', 'changes'))
+    for entry in entries if plans else []:
+        tails.setdefault(entry['object_id'], []).append(entry)
+
+    states = dict.fromkeys(absent)
+    for object_id, (state, _, _, forward) in plans.items():
+        tail = tails.get(object_id, [])
+        for entry in tail if forward else reversed(tail):
+            state = _apply(state, entry, forward)
+        states[object_id] = state
+    return states
+
+
+def states_at(model_name, ids, at):
+    """Map each of ``ids`` to the record's state dict as of ``at``, or None if it did not exist."""
+    ids = sorted(set(ids))
+    states = {}
+    for start in range(0, len(ids), HISTORY_BATCH_SIZE):
+        states.update(_states_chunk(model_name, ids[start:start + HISTORY_BATCH_SIZE], at))
+    return states
+
+
+def state_at(model_name, object_id, at):
+    return states_at(model_name, [object_id], at)[object_id]
+
+
+def iter_states(model_name, at, before_id=None):
+    """Yield ``(id, state)`` for every record that existed at ``at``, highest id first.
+
+    ``before_id`` resumes below the id of a previous page.
+    """
+    model = TRACKED[model_name][0]
+    # records deleted since ``at`` are not in the table any more but existed then
+    deleted = set(AuditLog.objects
+                  .filter(model_name=model_name, action__in=DELETE_ACTIONS, timestamp__gt=at)
+                  .values_list('object_id', flat=True))
+    live = model.objects.order_by('-id').values_list('id', flat=True)
+    upper = before_id
+    while True:
+        page = list((live if upper is None else live.filter(id__lt=upper))[:HISTORY_BATCH_SIZE])
+        # below the last full page come only deleted ids
+        lower = page[-1] if len(page) == HISTORY_BATCH_SIZE else None
+        ids = set(page) | {
+            i for i in deleted
+            if (upper is None or i < upper) and (lower is None or i >= lower)
+        }
+        states = states_at(model_name, ids, at)
+        for object_id in sorted(ids, reverse=True):
+            if states[object_id] is not None:
+                yield object_id, states[object_id]
+        if lower is None:
+            return
+        upper = lower
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gridapp import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyMetrics rollup table from the source tables. Defaults to the full history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.date.fromisoformat(options['start']) if options['start'] else None
+            end = datetime.date.fromisoformat(options['end']) if options['end'] else None
+        except ValueError:
+            raise CommandError('Dates must be in YYYY-MM-DD format.')
+        if start and end and start > end:
+            raise CommandError('--start must not be after --end.')
+
+        count = rollups.rebuild(start=start, end=end)
+        self.stdout.write(f'Rebuilt {count} daily metrics rows.')
@@ -0,0 +1,102 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from backend import async_views, views
+from gridapp.models import FaultReport
+
+
+def _urlconf(module):
+    urlconf = ModuleType(f'bench_urls_{module.__name__}')
+    urlconf.urlpatterns = [
+        path('api/server-room/', module.server_room),
+        path('api/fault-reports/', module.fault_reports),
+        path('api/field-activities/', module.field_activities),
+        path('api/dashboard/', module.dashboard),
+        path('api/fault-feedbacks/<int:fault_id>/', module.get_fault_feedbacks),
+    ]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = ('Compare read-endpoint throughput of the sync views served through the WSGI handler '
+            '(one thread per in-flight request) against the async views in backend/async_views.py '
+            'served through the ASGI handler (one event loop). Read-only; uses the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight at once')
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Keep the response cache on (by default every request renders)')
+
+    def handle(self, *args, **options):
+        fault = FaultReport.objects.order_by('-id').first()
+        urls = [
+            '/api/server-room/',
+            '/api/fault-reports/?limit=50',
+            '/api/field-activities/',
+            '/api/dashboard/',
+            f'/api/fault-feedbacks/{fault.id if fault else 1}/',
+        ]
+        n, concurrency = options['requests'], options['concurrency']
+        overrides = {}
+        if not options['with_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+        self.stdout.write(f'{n} requests, concurrency {concurrency}, {len(urls)} endpoints')
+        results = {}
+        with override_settings(ROOT_URLCONF=_urlconf(views), **overrides):
+            results['wsgi'] = self._run_wsgi(urls, n, concurrency)
+        with override_settings(ROOT_URLCONF=_urlconf(async_views), **overrides):
+            results['asgi'] = asyncio.run(self._run_asgi(urls, n, concurrency))
+
+        for label, (elapsed, latencies, errors) in results.items():
+            latencies.sort()
+            self.stdout.write(
+                f'{label:5} {n / elapsed:9.1f} req/s   p50 {statistics.median(latencies) * 1000:7.1f} ms   '
+                f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms   {errors} errors'
+            )
+        wsgi_rate = n / results['wsgi'][0]
+        self.stdout.write(f'asgi/wsgi throughput: {(n / results["asgi"][0]) / wsgi_rate:.2f}x')
+
+    def _run_wsgi(self, urls, n, concurrency):
+        local = threading.local()
+
+        def one(i):
+            # test clients are not thread-safe; one per worker thread
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            client = local.client
+            started = time.perf_counter()
+            status = client.get(urls[i % len(urls)]).status_code
+            return time.perf_counter() - started, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(one, range(n)))
+        elapsed = time.perf_counter() - started
+        connections.close_all()
+        return elapsed, [t for t, _ in timings], sum(1 for _, s in timings if s != 200)
+
+    async def _run_asgi(self, urls, n, concurrency):
+        client = AsyncClient()
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(urls[i % len(urls)])
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        timings = await asyncio.gather(*(one(i) for i in range(n)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [t for t, _ in timings], sum(1 for _, s in timings if s != 200)
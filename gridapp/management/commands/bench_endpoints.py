@@ -0,0 +1,555 @@
+import contextlib
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import audit
+from gridapp import history, rollups, search
+from gridapp.models import (
+    AttachmentUpload, AuditLog, FaultFeedback, FaultReport, FieldActivity, Job, ServerRoomEntry,
+    ServerRoomVisitor, Staff, normalize_staff_name,
+)
+from gridapp.storage import attachment_storage
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+SEED_BATCH_SIZE = 5000
+SEED_STAFF = 200
+SEED_DAYS = 730
+SEED_FILE_SIZE = 256 * 1024  # rough size of the seeded attachment and job result, in bytes
+
+WORDS = ('transformer relay breaker feeder cable insulator outage overheating surge fuse meter pole '
+         'line busbar recloser capacitor earthing switchgear').split()
+LOCATIONS = [f'Substation {i}' for i in range(1, 41)]
+STATUSES = ['open', 'open', 'open', 'in_progress', 'resolved', 'resolved']
+SEVERITIES = ['low', 'medium', 'high', 'critical']
+
+# routes that are not benchmarked, and why
+SKIPPED = {
+    'admin/': 'Django admin',
+    'api/faults/<int:pk>/attachment/delete/': 'deletes the stored file, which the rollback does not restore',
+    'api/faults/<int:pk>/uploads/': 'writes upload parts to disk',
+    'api/uploads/<uuid:upload_id>/complete/': 'needs uploaded parts on disk',
+    'api/auth/token/': 'dominated by password hashing',
+    'api/auth/token/refresh/': 'dominated by token signing',
+    'api/auth/lookup/': 'account lookup, not a data endpoint',
+    'api/auth/set-password/': 'dominated by password hashing',
+    '^(?!api/).*$': 'frontend index.html',
+}
+
+
+def parse_scale(value):
+    if value.lower() in SCALES:
+        return SCALES[value.lower()]
+    try:
+        rows = int(value)
+    except ValueError:
+        raise CommandError(f'--scale must be one of {", ".join(SCALES)} or a row count')
+    if rows < 100:
+        raise CommandError('--scale must be at least 100 rows')
+    return rows
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _batches(rows, build):
+    batch = []
+    for i in range(rows):
+        batch.append(build(i))
+        if len(batch) == SEED_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(rows, log):
+    """Fill an empty database with ``rows`` faults, field activities, server-room entries and audit entries.
+
+    Also stores one fault attachment, one finished export job with its result file and
+    one upload session, so the file endpoints serve real files.
+    """
+    rng = random.Random(42)
+    today = datetime.date.today()
+
+    def day():
+        return today - datetime.timedelta(days=rng.randrange(SEED_DAYS))
+
+    with transaction.atomic():
+        names = [f'Staff {i:03d}' for i in range(SEED_STAFF)]
+        Staff.objects.bulk_create([Staff(name=name, name_key=normalize_staff_name(name)) for name in names])
+        staff = list(Staff.objects.all())
+
+        def fault(i):
+            status = rng.choice(STATUSES)
+            return FaultReport(
+                title=f'{rng.choice(WORDS)} fault at {rng.choice(LOCATIONS)}',
+                description=_text(rng, 12),
+                date_reported=day(),
+                reported_by=rng.choice(staff),
+                assigned_to=rng.choice(staff) if rng.random() < 0.7 else None,
+                location=rng.choice(LOCATIONS),
+                severity=rng.choice(SEVERITIES),
+                status=status,
+                resolution_remarks=_text(rng, 8) if status == 'resolved' else '',
+            )
+
+        def field_activity(i):
+            return FieldActivity(
+                staff=rng.choice(staff),
+                substation=rng.choice(LOCATIONS),
+                date=day(),
+                time_out=datetime.time(rng.randrange(6, 12), rng.randrange(60)),
+                time_returned=datetime.time(rng.randrange(12, 18), rng.randrange(60)),
+                purpose=_text(rng, 5),
+                work_done=_text(rng, 10),
+                materials_used=_text(rng, 3),
+                supervisor_approval=rng.choice(names),
+            )
+
+        def server_room_entry(i):
+            return ServerRoomEntry(
+                staff=rng.choice(staff),
+                date=day(),
+                time_in=datetime.time(rng.randrange(7, 12), rng.randrange(60)),
+                time_out=datetime.time(rng.randrange(12, 18), rng.randrange(60)),
+                reason=_text(rng, 6),
+                equipment_touched=_text(rng, 2),
+                supervisor=rng.choice(names),
+            )
+
+        for label, model, build in (
+            ('fault reports', FaultReport, fault),
+            ('field activities', FieldActivity, field_activity),
+            ('server-room entries', ServerRoomEntry, server_room_entry),
+        ):
+            for batch in _batches(rows, build):
+                model.objects.bulk_create(batch)
+            log(f'  {rows} {label}')
+
+        # a CREATE entry per fault, as the fault views log them; history places a fault in time by it
+        _, fields, fault_state = history.TRACKED['FaultReport']
+        created, batch = {}, []
+        for row in FaultReport.objects.order_by('id').values(*fields).iterator(chunk_size=SEED_BATCH_SIZE):
+            created[row['id']] = timezone.make_aware(datetime.datetime.combine(row['date_reported'], datetime.time.min))
+            batch.append(AuditLog(
+                action='CREATE',
+                model_name='FaultReport',
+                object_id=row['id'],
+                user=row['reported_by__name'],
+                changes={field: {'old': None, 'new': value} for field, value in fault_state(row).items()},
+                timestamp=created[row['id']],
+            ))
+            if len(batch) == SEED_BATCH_SIZE:
+                AuditLog.objects.bulk_create(batch)
+                batch = []
+        AuditLog.objects.bulk_create(batch)
+
+        fault_ids = list(created)
+        now = timezone.now()
+
+        def audit_entry(i):
+            old, new = rng.sample(STATUSES[2:], 2)
+            object_id = rng.choice(fault_ids)
+            since = created[object_id]
+            return AuditLog(
+                action=rng.choice(('UPDATE', 'BULK_UPDATE')),
+                model_name='FaultReport',
+                object_id=object_id,
+                user=rng.choice(names),
+                changes={'status': {'old': old, 'new': new}},
+                timestamp=since + datetime.timedelta(seconds=rng.randrange(max(int((now - since).total_seconds()), 1))),
+            )
+
+        for batch in _batches(rows, audit_entry):
+            AuditLog.objects.bulk_create(batch)
+        log(f'  {rows} audit entries, plus a CREATE entry per fault')
+
+        ServerRoomVisitor.objects.bulk_create([
+            ServerRoomVisitor(staff_id=str(i), name=f'Visitor {i}', purpose=_text(rng, 4), date=day(),
+                              time_in=datetime.time(10, 0))
+            for i in range(max(rows // 100, 10))
+        ], batch_size=SEED_BATCH_SIZE)
+        FaultFeedback.objects.bulk_create([
+            FaultFeedback(fault_id=rng.choice(fault_ids), staff_name=rng.choice(names),
+                          staff_email='staff@example.com', feedback_text=_text(rng, 8))
+            for _ in range(max(rows // 100, 10))
+        ], batch_size=SEED_BATCH_SIZE)
+
+        blob = rng.randbytes(SEED_FILE_SIZE)
+        attached = min(fault_ids)
+        name = attachment_storage().save('bench.pdf', ContentFile(b'%PDF-1.4\n' + blob))
+        FaultReport.objects.filter(pk=attached).update(attachment=name, attachment_name='bench report.pdf')
+        job = Job(kind='export', params={'source': 'faults'}, status='succeeded', progress_done=rows,
+                  result={'rows': rows, 'filename': 'faults.csv'}, finished_at=timezone.now())
+        export = ''.join(f'{i},{_text(rng, 6)}\n' for i in fault_ids[:SEED_FILE_SIZE // 64])
+        job.result_file.save('faults.csv', ContentFile(export.encode('utf-8')), save=False)
+        job.save()
+        AttachmentUpload.objects.create(fault_id=attached, filename='bench.pdf', size=SEED_FILE_SIZE)
+
+    # bulk_create skipped the signals that maintain these
+    rollups.rebuild()
+    log(f'  {search.rebuild()} search documents')
+
+
+def _routes():
+    """The patterns of backend/urls.py; includes (admin) as a whole, static file serving left out."""
+    for p in get_resolver().url_patterns:
+        if isinstance(p, URLPattern) and p.callback.__module__ == 'django.views.static':
+            continue
+        if isinstance(p, (URLPattern, URLResolver)):
+            yield str(p.pattern)
+
+
+def cases(ctx):
+    """(label, route, method, path, data, expected status) for every benchmarked request."""
+    pk, ids = ctx['fault_id'], ctx['fault_ids']
+    today = datetime.date.today()
+    week_ago = (today - datetime.timedelta(days=6)).isoformat()
+    at = (today - datetime.timedelta(days=30)).isoformat()
+    csv_ids = ','.join(map(str, ids[:50]))
+
+    def rows(build, n=100):
+        return [build(i) for i in range(n)]
+
+    entry = {'staff': 'Staff 001', 'date': today.isoformat(), 'time_in': '09:00', 'time_out': '10:00',
+             'reason': 'bench', 'equipment_touched': 'rack', 'supervisor': 'Staff 002'}
+    visitor = {'staff_id': '1', 'name': 'Bench Visitor', 'purpose': 'bench', 'time_in': '09:00'}
+    activity = {'staff': 'Staff 001', 'substation': 'Substation 1', 'date': today.isoformat(),
+                'time_out': '08:00', 'time_returned': '12:00', 'purpose': 'bench', 'work_done': 'bench',
+                'materials_used': '', 'supervisor_approval': 'Staff 002'}
+    fault = {'title': 'bench fault', 'description': 'bench', 'date_reported': today.isoformat(),
+             'reported_by': 'Staff 001', 'location': 'Substation 1', 'severity': 'low', 'status': 'open'}
+    return [
+        ('server-room', 'api/server-room/', 'GET', '/api/server-room/', None, 200),
+        ('server-room POST', 'api/server-room/', 'POST', '/api/server-room/', entry, 201),
+        ('server-room-visitors', 'api/server-room-visitors/', 'GET', '/api/server-room-visitors/', None, 200),
+        ('server-room-visitors POST', 'api/server-room-visitors/', 'POST', '/api/server-room-visitors/', visitor, 201),
+        ('fault-reports first page', 'api/fault-reports/', 'GET', '/api/fault-reports/', None, 200),
+        ('fault-reports all', 'api/fault-reports/', 'GET', '/api/fault-reports/?all=1', None, 200),
+        ('fault-reports page', 'api/fault-reports/', 'GET', '/api/fault-reports/?limit=50', None, 200),
+        ('fault-reports open page', 'api/fault-reports/', 'GET', '/api/fault-reports/?status=open&limit=50', None, 200),
+        ('fault-reports POST', 'api/fault-reports/', 'FORM', '/api/fault-reports/', fault, 201),
+        ('fault detail', 'api/faults/<int:pk>/', 'GET', f'/api/faults/{pk}/', None, 200),
+        ('fault attachment', 'api/faults/<int:pk>/attachment/', 'GET',
+         f'/api/faults/{ctx["attachment_fault_id"]}/attachment/', None, 200),
+        ('upload detail', 'api/uploads/<uuid:upload_id>/', 'GET', f'/api/uploads/{ctx["upload_id"]}/', None, 200),
+        ('field-activities', 'api/field-activities/', 'GET', '/api/field-activities/', None, 200),
+        ('field-activities POST', 'api/field-activities/', 'POST', '/api/field-activities/', activity, 201),
+        ('dashboard', 'api/dashboard/', 'GET', '/api/dashboard/', None, 200),
+        ('dashboard 30 days', 'api/dashboard/', 'GET', '/api/dashboard/?days=30', None, 200),
+        ('activity-reports', 'api/activity-reports/', 'GET', '/api/activity-reports/', None, 200),
+        ('search', 'api/search/', 'GET', '/api/search/?q=transformer+relay', None, 200),
+        ('export field-activities', 'api/export/field-activities/csv/', 'GET',
+         f'/api/export/field-activities/csv/?start={week_ago}', None, 200),
+        ('export fault-reports', 'api/export/fault-reports/csv/', 'GET',
+         f'/api/export/fault-reports/csv/?start={week_ago}', None, 200),
+        ('export weekly', 'api/export/activity-reports/weekly/', 'GET', '/api/export/activity-reports/weekly/', None, 200),
+        ('export monthly', 'api/export/activity-reports/monthly/', 'GET', '/api/export/activity-reports/monthly/', None, 200),
+        ('bulk delete', 'api/bulk/faults/delete/', 'POST', '/api/bulk/faults/delete/', {'ids': ids}, 200),
+        ('bulk update', 'api/bulk/faults/update/', 'POST', '/api/bulk/faults/update/',
+         {'ids': ids, 'updates': {'status': 'in_progress'}}, 200),
+        ('bulk export', 'api/bulk/faults/export/', 'GET', f'/api/bulk/faults/export/?ids={csv_ids}', None, 200),
+        ('bulk ingest server-room', 'api/bulk/server-room/', 'POST', '/api/bulk/server-room/', rows(lambda i: entry), 201),
+        ('bulk ingest visitors', 'api/bulk/server-room-visitors/', 'POST', '/api/bulk/server-room-visitors/',
+         rows(lambda i: visitor), 201),
+        ('bulk ingest field-activities', 'api/bulk/field-activities/', 'POST', '/api/bulk/field-activities/',
+         rows(lambda i: activity), 201),
+        ('jobs', 'api/jobs/', 'GET', '/api/jobs/', None, 200),
+        ('job detail', 'api/jobs/<uuid:job_id>/', 'GET', f'/api/jobs/{ctx["job_id"]}/', None, 200),
+        ('job download', 'api/jobs/<uuid:job_id>/download/', 'GET', f'/api/jobs/{ctx["job_id"]}/download/', None, 200),
+        ('metrics', 'api/metrics', 'GET', '/api/metrics', None, 200),
+        ('audit-log', 'api/audit-log/', 'GET', '/api/audit-log/', None, 200),
+        ('audit-log page', 'api/audit-log/', 'GET', '/api/audit-log/?cursor=&limit=100', None, 200),
+        ('audit-log one fault', 'api/audit-log/', 'GET', f'/api/audit-log/?model_name=FaultReport&object_id={pk}', None, 200),
+        ('fault history', 'api/faults/<int:pk>/history/', 'GET', f'/api/faults/{pk}/history/?at={at}', None, 200),
+        ('history report page', 'api/history/faults/', 'GET', f'/api/history/faults/?at={at}&status=open&limit=100',
+         None, 200),
+        ('auth user', 'api/auth/user/', 'GET', '/api/auth/user/', None, 200),
+        ('daily-records', 'api/daily-records/', 'GET', '/api/daily-records/', None, 200),
+        ('export daily-records', 'api/export/daily-records/csv/', 'GET', '/api/export/daily-records/csv/', None, 200),
+        ('fault-feedbacks POST', 'api/fault-feedbacks/', 'POST', '/api/fault-feedbacks/',
+         {'fault_id': pk, 'staff_name': 'Staff 001', 'staff_email': 'staff@example.com', 'feedback_text': 'bench'}, 201),
+        ('fault-feedbacks', 'api/fault-feedbacks/<int:fault_id>/', 'GET', f'/api/fault-feedbacks/{ctx["feedback_fault_id"]}/', None, 200),
+    ]
+
+
+@contextlib.contextmanager
+def _rolled_back():
+    # writes are undone after each request so every repeat sees the same data;
+    # on_commit work (rollups, search index) still runs and is timed
+    with transaction.atomic():
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            yield
+        transaction.set_rollback(True)
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[max(0, int(round(len(values) * fraction)) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Seed a scratch database at a given scale (1k/100k/1m rows each of faults, field '
+            'activities, server-room entries and audit entries), request every endpoint in '
+            'backend/urls.py through the test client and write p50/p95 latency, query counts and '
+            'peak RSS to a JSON file. --compare flags regressions against a stored baseline. '
+            'Never touches the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', default='1k', help='1k, 100k, 1m or a row count per table')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=1, help='Untimed requests per endpoint first')
+        parser.add_argument('--only', help='Only run endpoints whose label contains this text')
+        parser.add_argument('--output', help='Results file (default bench-<scale>.json)')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Keep the seeded database and reuse it on the next run at the same scale')
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Keep the response cache on (by default every request renders)')
+        parser.add_argument('--compare', metavar='BASELINE', help='Flag regressions against this results file')
+        parser.add_argument('--results', metavar='FILE',
+                            help='With --compare, compare this results file instead of running the suite')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Relative p95 / peak RSS increase counted as a regression (default 0.25)')
+        parser.add_argument('--min-ms', type=float, default=2.0,
+                            help='Ignore p95 increases smaller than this many milliseconds')
+
+    def handle(self, *args, **options):
+        if options['results']:
+            if not options['compare']:
+                raise CommandError('--results needs --compare')
+            results = self._load(options['results'])
+        else:
+            rows = parse_scale(options['scale'])
+            results = self._run(rows, options)
+            output = options['output'] or f'bench-{options["scale"].lower()}.json'
+            with open(output, 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f'Results written to {output}')
+        if options['compare']:
+            self._compare(results, self._load(options['compare']), options['threshold'], options['min_ms'])
+
+    def _load(self, path):
+        try:
+            with open(path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'cannot read {path}: {e}')
+
+    # Running -----------------------------------------------------------------
+
+    def _run(self, rows, options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            # on disk: an in-memory database of a million rows per table would dominate peak RSS
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), 'gridco_bench.sqlite3')
+        old_name = connection.settings_dict['NAME']
+        keepdb = options['keepdb']
+        media_root = os.path.join(tempfile.gettempdir(), 'gridco_bench_media')
+        overrides = {
+            # the test client's host, which the deployed ALLOWED_HOSTS would answer with a 400
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            # seeded files stay out of the real media directory
+            'MEDIA_ROOT': media_root,
+        }
+        if not options['with_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        if not keepdb:
+            shutil.rmtree(media_root, ignore_errors=True)
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+        try:
+            with override_settings(**overrides):
+                if FaultReport.objects.count() != rows:
+                    if FaultReport.objects.exists():
+                        raise CommandError('The kept bench database was seeded at another scale; run without --keepdb.')
+                    self.stdout.write(f'Seeding {rows} rows per table...')
+                    started = time.perf_counter()
+                    seed(rows, self.stdout.write)
+                    self.stdout.write(f'Seeded in {time.perf_counter() - started:.1f}s')
+                else:
+                    self.stdout.write('Reusing the seeded bench database.')
+                endpoints = self._run_cases(options)
+        finally:
+            # the writer thread holds its own connection to the bench database
+            audit.stop()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+            if not keepdb:
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        return {
+            'meta': {
+                'scale': options['scale'].lower(),
+                'rows': rows,
+                'repeat': options['repeat'],
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'cache': bool(options['with_cache']),
+                'started_at': timezone.now().isoformat(),
+                'peak_rss_kb': _peak_rss_kb(),
+            },
+            'endpoints': endpoints,
+        }
+
+    def _context(self):
+        user, _ = get_user_model().objects.get_or_create(username='bench', defaults={'is_staff': True})
+        fault_ids = list(FaultReport.objects.order_by('id').values_list('id', flat=True)[:100])
+        # the oldest fault has the longest history, and existed at the history cases' ``at``
+        oldest = FaultReport.objects.order_by('date_reported', 'id').values_list('id', flat=True).first()
+        return {
+            'token': str(AccessToken.for_user(user)),
+            'fault_id': oldest,
+            'attachment_fault_id': FaultReport.objects.exclude(attachment='').values_list('id', flat=True).first(),
+            'feedback_fault_id': FaultFeedback.objects.values_list('fault_id', flat=True).first(),
+            'fault_ids': fault_ids,
+            'job_id': Job.objects.filter(status='succeeded').values_list('id', flat=True).first(),
+            'upload_id': AttachmentUpload.objects.values_list('id', flat=True).first(),
+        }
+
+    def _run_cases(self, options):
+        ctx = self._context()
+        todo = cases(ctx)
+        covered = {case[1] for case in todo}
+        missing = [r for r in _routes() if r not in covered and r not in SKIPPED]
+        for route in missing:
+            self.stderr.write(f'not benchmarked: {route} (add a case or a SKIPPED reason)')
+        if options['only']:
+            todo = [case for case in todo if options['only'] in case[0]]
+
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {ctx["token"]}')
+        # a failing case is reported once below, not logged on every repeat
+        request_log = logging.getLogger('django.request')
+        level, request_log.level = request_log.level, logging.ERROR
+        audit_mark = AuditLog.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        results, unexpected = {}, []
+        self.stdout.write(f'{"endpoint":32} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"bytes":>10}')
+        try:
+            for label, route, method, path, data, expected in todo:
+                results[label] = r = self._run_case(client, route, method, path, data, options)
+                self.stdout.write(
+                    f'{label:32} {r["status"]:>6} {r["p50_ms"]:9.2f} {r["p95_ms"]:9.2f} {r["queries"]:8} {r["bytes"]:10}'
+                )
+                if r['status'] != expected:
+                    unexpected.append(f'{label} ({r["status"]}, expected {expected})')
+        finally:
+            request_log.setLevel(level)
+        # entries the audit writer inserted for the rolled-back writes
+        audit.flush()
+        AuditLog.objects.filter(id__gt=audit_mark).delete()
+        if unexpected:
+            # timings of error responses are no baseline
+            raise CommandError(f'{len(unexpected)} endpoint(s) answered with an unexpected status: '
+                               f'{", ".join(unexpected)}')
+        return results
+
+    def _request(self, client, method, path, data):
+        if method == 'GET':
+            return client.get(path)
+        if method == 'FORM':
+            return client.post(path, data)
+        return client.post(path, json.dumps(data), content_type='application/json')
+
+    def _run_case(self, client, route, method, path, data, options):
+        timings, queries = [], []
+        status, size = None, 0
+
+        def count(execute, sql, params, many, context):
+            queries[-1] += 1
+            return execute(sql, params, many, context)
+
+        for i in range(options['warmup'] + options['repeat']):
+            queries.append(0)
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                with _rolled_back() if method != 'GET' else contextlib.nullcontext():
+                    response = self._request(client, method, path, data)
+                    # a streamed export is only done once its last chunk is out
+                    body = b''.join(response.streaming_content) if response.streaming else response.content
+                    response.close()
+                elapsed = time.perf_counter() - started
+            if i >= options['warmup']:
+                timings.append(elapsed)
+            status, size = response.status_code, len(body)
+        queries = queries[options['warmup']:]
+        return {
+            'route': route,
+            'method': 'POST' if method == 'FORM' else method,
+            'path': path,
+            'status': status,
+            'bytes': size,
+            'p50_ms': round(statistics.median(timings) * 1000, 3),
+            'p95_ms': round(_percentile(timings, 0.95) * 1000, 3),
+            'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+            'queries': max(queries),
+            'peak_rss_kb': _peak_rss_kb(),
+        }
+
+    # Comparing ---------------------------------------------------------------
+
+    def _compare(self, results, baseline, threshold, min_ms):
+        if results['meta'].get('rows') != baseline['meta'].get('rows'):
+            self.stderr.write(f'warning: comparing {results["meta"].get("scale")} results against a '
+                              f'{baseline["meta"].get("scale")} baseline')
+        regressions = []
+        for label, now in results['endpoints'].items():
+            before = baseline['endpoints'].get(label)
+            if before is None:
+                self.stdout.write(f'new       {label}')
+                continue
+            problems = []
+            if now['status'] != before['status']:
+                problems.append(f'status {before["status"]} -> {now["status"]}')
+            if now['queries'] > before['queries']:
+                problems.append(f'queries {before["queries"]} -> {now["queries"]}')
+            slower = now['p95_ms'] - before['p95_ms']
+            if slower > min_ms and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                problems.append(f'p95 {before["p95_ms"]:.2f} -> {now["p95_ms"]:.2f} ms')
+            if problems:
+                regressions.append(label)
+                self.stdout.write(f'REGRESSED {label}: {", ".join(problems)}')
+            elif -slower > min_ms and before['p95_ms'] > now['p95_ms'] * (1 + threshold):
+                self.stdout.write(f'faster    {label}: p95 {before["p95_ms"]:.2f} -> {now["p95_ms"]:.2f} ms')
+        for label in baseline['endpoints'].keys() - results['endpoints'].keys():
+            self.stdout.write(f'missing   {label}')
+
+        peak, base_peak = results['meta'].get('peak_rss_kb'), baseline['meta'].get('peak_rss_kb')
+        if peak and base_peak and peak > base_peak * (1 + threshold):
+            regressions.append('peak RSS')
+            self.stdout.write(f'REGRESSED peak RSS: {base_peak // 1024} -> {peak // 1024} MB')
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against the baseline')
+        self.stdout.write('No regressions against the baseline.')
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from backend.database import SQLITE_PRAGMAS
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent-write throughput of a default SQLite connection against the '
+            'tuned profile from backend/database.py (WAL, synchronous=NORMAL, busy_timeout, '
+            'IMMEDIATE transactions). Runs against a scratch file, never the configured database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Concurrent writer threads')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+
+    def handle(self, *args, **options):
+        results = {}
+        for label, pragmas, begin in (
+            ('default', [], 'BEGIN'),
+            ('tuned', SQLITE_PRAGMAS, 'BEGIN IMMEDIATE'),
+        ):
+            results[label] = self._run(pragmas, begin, options['writers'], options['seconds'])
+            commits, errors = results[label]
+            self.stdout.write(
+                f'{label:8} {commits / options["seconds"]:10.1f} commits/s   {errors} lock errors'
+            )
+        base = results['default'][0] or 1
+        self.stdout.write(f'speedup: {results["tuned"][0] / base:.2f}x')
+
+    def _run(self, pragmas, begin, writers, seconds):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            setup = sqlite3.connect(path)
+            setup.execute('CREATE TABLE entry (id INTEGER PRIMARY KEY, day TEXT, reason TEXT)')
+            setup.commit()
+            setup.close()
+
+            stop = time.monotonic() + seconds
+            counts = []
+            lock = threading.Lock()
+
+            def writer():
+                # Python's sqlite3 default: 5s busy timeout, deferred transactions
+                conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+                for pragma in pragmas:
+                    conn.execute(pragma)
+                commits = errors = 0
+                while time.monotonic() < stop:
+                    try:
+                        conn.execute(begin)
+                        # read-then-write, like the views' get_or_create + insert
+                        conn.execute('SELECT count(*) FROM entry WHERE day = ?', ('2026-01-01',)).fetchone()
+                        conn.execute('INSERT INTO entry (day, reason) VALUES (?, ?)', ('2026-01-01', 'bench'))
+                        conn.execute('COMMIT')
+                        commits += 1
+                    except sqlite3.OperationalError:
+                        errors += 1
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                conn.close()
+                with lock:
+                    counts.append((commits, errors))
+
+            threads = [threading.Thread(target=writer) for _ in range(writers)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            return sum(c for c, _ in counts), sum(e for _, e in counts)
+        finally:
+            for suffix in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from gridapp import history
+
+
+class Command(BaseCommand):
+    help = ('Snapshot the state of audited records whose log has grown since their last '
+            'checkpoint, so point-in-time history only replays a short tail. Run periodically.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(history.TRACKED), default='FaultReport')
+        parser.add_argument(
+            '--min-entries', type=int, default=None,
+            help=f'Audit entries since the last checkpoint that make one due '
+                 f'(default {history.HISTORY_CHECKPOINT_INTERVAL}; 1 checkpoints every changed record)',
+        )
+
+    def handle(self, *args, **options):
+        count = history.checkpoint(options['model'], options['min_entries'])
+        self.stdout.write(f'Wrote {count} checkpoint(s).')
@@ -0,0 +1,28 @@
+import datetime
+import os
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from backend.upload_views import _part_path
+from gridapp.models import AttachmentUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked attachment uploads (and their part files) that have not progressed recently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Idle time after which an upload is abandoned (default: 24)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options['hours'])
+        stale = AttachmentUpload.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for upload in stale.iterator():
+            try:
+                os.remove(_part_path(upload))
+            except FileNotFoundError:
+                pass
+            upload.delete()
+            count += 1
+        self.stdout.write(f'Removed {count} stale upload(s).')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from gridapp import search
+
+
+class Command(BaseCommand):
+    help = ('Recreate the full-text search documents of every fault, field activity and '
+            'server-room entry, e.g. after a restore or a bulk load that bypassed signals.')
+
+    def handle(self, *args, **options):
+        count = search.rebuild()
+        self.stdout.write(f'Indexed {count} record(s).')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import spool
+
+
+class Command(BaseCommand):
+    help = 'Insert writes that were spooled to disk while the database was unavailable.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--resource', choices=sorted(spool.REPLAYERS), help='Only replay this resource')
+
+    def handle(self, *args, **options):
+        try:
+            counts = spool.replay(options['resource'])
+        except Exception as e:
+            raise CommandError(f'replay failed, spooled records were kept: {e}')
+        if not counts:
+            self.stdout.write('Nothing to replay.')
+        for resource, count in counts.items():
+            self.stdout.write(f'{resource}: {count} record(s) inserted')
@@ -0,0 +1,82 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from backend import jobs, spool
+
+
+class Command(BaseCommand):
+    help = ('Run queued background jobs (exports, bulk fault edits) in a process pool, and replay '
+            'spooled writes periodically. Several runners may share the database; each job is '
+            'claimed by exactly one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 2),
+                            help='Worker processes (default: JOB_WORKERS)')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between queue checks when idle')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        requeued = jobs.requeue_stale()
+        purged = jobs.purge()
+        if requeued or purged:
+            self.stdout.write(f'Requeued {requeued} stale job(s), purged {purged} old job(s).')
+
+        pool = self._pool(workers)
+        running = {}
+        broken = False
+        next_replay = 0
+        try:
+            while True:
+                close_old_connections()
+                if time.monotonic() >= next_replay:
+                    for resource, count in spool.replay_pending().items():
+                        self.stdout.write(f'Replayed {count} spooled {resource} record(s)')
+                    next_replay = time.monotonic() + spool.WRITE_SPOOL_REPLAY_INTERVAL
+                if broken and not running:
+                    pool.shutdown(wait=False)
+                    pool = self._pool(workers)
+                    broken = False
+                # a broken pool fails every in-flight job; wait for them before starting more
+                claimed = [] if broken else jobs.claim(workers - len(running))
+                for job_id in claimed:
+                    running[pool.submit(jobs.run, str(job_id))] = job_id
+                    self.stdout.write(f'Started job {job_id}')
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        # the worker process died; its job will not report back
+                        jobs.fail(job_id, f'worker crashed: {e!r}')
+                        outcome = 'failed'
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                    self.stdout.write(f'Job {job_id} {outcome}')
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping; running jobs will be requeued once stale.')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _pool(self, workers):
+        # spawn: workers start clean instead of inheriting this process's DB connections.
+        # django.setup must run before a task is unpickled, since that imports the models.
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
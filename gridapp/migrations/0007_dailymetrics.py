@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:57
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_daily_metrics(apps, schema_editor):
+    FaultReport = apps.get_model('gridapp', 'FaultReport')
+    ServerRoomEntry = apps.get_model('gridapp', 'ServerRoomEntry')
+    FieldActivity = apps.get_model('gridapp', 'FieldActivity')
+    DailyMetrics = apps.get_model('gridapp', 'DailyMetrics')
+
+    rows = {}
+
+    def row(day):
+        return rows.setdefault(day, DailyMetrics(date=day, substation_visits={}))
+
+    for day, n in FaultReport.objects.order_by().values('date_reported').annotate(n=Count('id')).values_list('date_reported', 'n'):
+        row(day).faults_reported = n
+    for r in ServerRoomEntry.objects.order_by().values('date').annotate(n=Count('id'), staff=Count('staff', distinct=True)):
+        metrics = row(r['date'])
+        metrics.server_room_entries = r['n']
+        metrics.server_room_staff = r['staff']
+    for day, substation, n in FieldActivity.objects.order_by().values('date', 'substation').annotate(n=Count('id')).values_list('date', 'substation', 'n'):
+        metrics = row(day)
+        metrics.field_activities += n
+        if substation:
+            metrics.substation_visits[substation] = n
+
+    DailyMetrics.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0006_alter_serverroomvisitor_id_auditlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('faults_reported', models.PositiveIntegerField(default=0)),
+                ('server_room_entries', models.PositiveIntegerField(default=0)),
+                ('server_room_staff', models.PositiveIntegerField(default=0)),
+                ('field_activities', models.PositiveIntegerField(default=0)),
+                ('substation_visits', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'daily metrics',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.RunPython(backfill_daily_metrics, migrations.RunPython.noop),
+    ]
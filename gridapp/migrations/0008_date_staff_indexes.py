@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0007_dailymetrics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fieldactivity',
+            index=models.Index(fields=['date', 'staff'], name='gridapp_fie_date_7acc91_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldactivity',
+            index=models.Index(fields=['substation', 'date'], name='gridapp_fie_substat_6fea00_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serverroomentry',
+            index=models.Index(fields=['date', 'staff'], name='gridapp_ser_date_ac337f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='serverroomvisitor',
+            index=models.Index(fields=['date'], name='gridapp_ser_date_d98420_idx'),
+        ),
+    ]
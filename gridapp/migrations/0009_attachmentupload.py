@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:01
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0008_date_staff_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField()),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('uploaded_by', models.CharField(default='system', max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('fault', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='gridapp.faultreport')),
+            ],
+        ),
+    ]
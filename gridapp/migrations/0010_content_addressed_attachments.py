@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:03
+
+import gridapp.models
+import gridapp.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0009_attachmentupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='faultreport',
+            name='attachment_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='faultreport',
+            name='attachment',
+            field=models.FileField(blank=True, db_index=True, null=True, storage=gridapp.storage.attachment_storage, upload_to='attachments/', validators=[gridapp.models.validate_file_size, gridapp.models.validate_file_extension]),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+def _name_key(name):
+    # frozen copy of gridapp.models.normalize_staff_name
+    return ' '.join((name or '').split()).casefold()
+
+
+def merge_duplicate_staff(apps, schema_editor):
+    """Fill name_key and fold staff rows sharing a key into the oldest one."""
+    Staff = apps.get_model('gridapp', 'Staff')
+    ServerRoomEntry = apps.get_model('gridapp', 'ServerRoomEntry')
+    FieldActivity = apps.get_model('gridapp', 'FieldActivity')
+    FaultReport = apps.get_model('gridapp', 'FaultReport')
+    DailyMetrics = apps.get_model('gridapp', 'DailyMetrics')
+
+    groups = {}
+    for staff in Staff.objects.order_by('id'):
+        groups.setdefault(_name_key(staff.name), []).append(staff)
+
+    keep_rows = []
+    merged_days = set()
+    for key, rows in groups.items():
+        keep, duplicates = rows[0], rows[1:]
+        keep.name_key = key
+        keep_rows.append(keep)
+        if not duplicates:
+            continue
+        dup_ids = [d.id for d in duplicates]
+        merged_days.update(
+            ServerRoomEntry.objects.filter(staff_id__in=dup_ids).values_list('date', flat=True).distinct()
+        )
+        ServerRoomEntry.objects.filter(staff_id__in=dup_ids).update(staff=keep)
+        FieldActivity.objects.filter(staff_id__in=dup_ids).update(staff=keep)
+        FaultReport.objects.filter(reported_by_id__in=dup_ids).update(reported_by=keep)
+        FaultReport.objects.filter(assigned_to_id__in=dup_ids).update(assigned_to=keep)
+        if not keep.email:
+            keep.email = next((d.email for d in duplicates if d.email), '')
+        keep.is_active = keep.is_active or any(d.is_active for d in duplicates)
+        Staff.objects.filter(id__in=dup_ids).delete()
+
+    Staff.objects.bulk_update(keep_rows, ['name_key', 'email', 'is_active'], batch_size=500)
+
+    # a day's distinct-staff count drops where merged rows both had entries
+    for day in merged_days:
+        DailyMetrics.objects.filter(date=day).update(
+            server_room_staff=ServerRoomEntry.objects.filter(date=day).values('staff').distinct().count(),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0011_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='staff',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(merge_duplicate_staff, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # separate from 0012 so PostgreSQL does not alter gridapp_staff while the
+    # merge's deferred foreign key checks are still pending
+
+    dependencies = [
+        ('gridapp', '0012_staff_name_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='staff',
+            name='name_key',
+            field=models.CharField(editable=False, max_length=255, unique=True),
+        ),
+    ]
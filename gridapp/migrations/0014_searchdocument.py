@@ -0,0 +1,113 @@
+# Generated by Django 6.0.1 on 2026-10-17 23:52
+
+from django.db import migrations, models
+
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE gridapp_searchdocument_fts USING fts5(
+        title, body,
+        content='gridapp_searchdocument', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER gridapp_searchdocument_ai AFTER INSERT ON gridapp_searchdocument BEGIN
+        INSERT INTO gridapp_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER gridapp_searchdocument_ad AFTER DELETE ON gridapp_searchdocument BEGIN
+        INSERT INTO gridapp_searchdocument_fts(gridapp_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER gridapp_searchdocument_au AFTER UPDATE ON gridapp_searchdocument BEGIN
+        INSERT INTO gridapp_searchdocument_fts(gridapp_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO gridapp_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS gridapp_searchdocument_au',
+    'DROP TRIGGER IF EXISTS gridapp_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS gridapp_searchdocument_ai',
+    'DROP TABLE IF EXISTS gridapp_searchdocument_fts',
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE gridapp_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX gridapp_searchdocument_vector ON gridapp_searchdocument USING GIN (search_vector)',
+]
+
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS gridapp_searchdocument_vector',
+    'ALTER TABLE gridapp_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    # other backends fall back to LIKE queries in gridapp/search.py
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_REVERSE, 'postgresql': POSTGRES_REVERSE})
+
+
+def _join(*parts):
+    return '\n'.join(p for p in parts if p)
+
+
+def backfill_search_documents(apps, schema_editor):
+    # frozen copy of the document builders in gridapp/search.py
+    SearchDocument = apps.get_model('gridapp', 'SearchDocument')
+    sources = [
+        ('fault', apps.get_model('gridapp', 'FaultReport'),
+         ('title', 'description', 'resolution_remarks', 'date_reported'),
+         lambda r: (r['title'], _join(r['description'], r['resolution_remarks']), r['date_reported'])),
+        ('field_activity', apps.get_model('gridapp', 'FieldActivity'),
+         ('substation', 'purpose', 'work_done', 'materials_used', 'date'),
+         lambda r: (r['substation'], _join(r['purpose'], r['work_done'], r['materials_used']), r['date'])),
+        ('server_room', apps.get_model('gridapp', 'ServerRoomEntry'),
+         ('reason', 'date'),
+         lambda r: ('', r['reason'], r['date'])),
+    ]
+    for kind, model, fields, build in sources:
+        batch = []
+        for row in model.objects.order_by().values('id', *fields).iterator(chunk_size=2000):
+            title, body, day = build(row)
+            batch.append(SearchDocument(kind=kind, object_id=row['id'], title=title, body=body, date=day))
+            if len(batch) >= 500:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0013_alter_staff_name_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fault', 'Fault report'), ('field_activity', 'Field activity'), ('server_room', 'Server room entry')], max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.CharField(blank=True, max_length=300)),
+                ('body', models.TextField(blank=True)),
+                ('date', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
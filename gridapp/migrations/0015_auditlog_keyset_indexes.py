@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0014_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='gridapp_aud_timesta_14b58d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['user', '-timestamp', '-id'], name='gridapp_aud_user_3cf1ed_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='gridapp_aud_timesta_b16ae3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='gridapp_aud_user_23b015_idx',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0015_auditlog_keyset_indexes'),
+    ]
+
+    operations = [
+        # auto_now_add -> default=timezone.now is a Python-side change only (neither puts a
+        # default in the schema); skip the table rebuild SQLite would otherwise do
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='auditlog',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-18 00:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0016_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=100)),
+                ('object_id', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('state', models.JSONField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['model_name', 'object_id', 'timestamp'], name='gridapp_aud_model_n_50b9a3_idx'),
+        ),
+        # after the new index exists, which covers the old one's columns
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='gridapp_aud_model_n_c9d9ea_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditcheckpoint',
+            index=models.Index(fields=['model_name', 'object_id', 'timestamp'], name='gridapp_aud_model_n_75e718_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gridapp', '0017_auditcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='faultreport',
+            index=models.Index(fields=['-date_reported', '-id'], name='gridapp_fau_date_re_c63b4c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='faultreport',
+            index=models.Index(fields=['status', '-date_reported', '-id'], name='gridapp_fau_status_7349e5_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='faultreport',
+            name='gridapp_fau_date_re_b1ceca_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='faultreport',
+            name='gridapp_fau_status_6b47a0_idx',
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import datetime
+import uuid
+
+from .storage import attachment_storage
 
 
 def validate_file_size(value):
@@ -19,14 +23,37 @@ def validate_file_extension(value):
         raise ValidationError(f'Unsupported file extension. Allowed: {", ".join(valid_extensions)}')
 
 
+def normalize_staff_name(name):
+    """Lookup key for a staff name: case and surrounding or repeated whitespace are ignored."""
+    return ' '.join((name or '').split()).casefold()
+
+
 class Staff(models.Model):
     name = models.CharField(max_length=200)
+    # normalize_staff_name(name), kept in sync by save(); one row per person
+    name_key = models.CharField(max_length=255, unique=True, editable=False)
     email = models.EmailField(blank=True)
     is_active = models.BooleanField(default=True)
 
     def __str__(self):
         return self.name
 
+    def validate_unique(self, exclude=None):
+        super().validate_unique(exclude=exclude)
+        # name_key is not editable, so forms would otherwise only find out from the IntegrityError
+        if exclude and 'name' in exclude:
+            return
+        taken = Staff.objects.filter(name_key=normalize_staff_name(self.name)).exclude(pk=self.pk)
+        if taken.exists():
+            raise ValidationError({'name': 'A staff member with this name already exists.'})
+
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_staff_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
 
 class ServerRoomEntry(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
@@ -40,6 +67,11 @@ class ServerRoomEntry(models.Model):
     def __str__(self):
         return f"{self.staff} - {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'staff']),
+        ]
+
 
 class ServerRoomVisitor(models.Model):
     staff_id = models.CharField(max_length=100)
@@ -52,6 +84,11 @@ class ServerRoomVisitor(models.Model):
     def __str__(self):
         return f"{self.staff_id} - {self.name} - {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
 
 class FaultReport(models.Model):
     title = models.CharField(max_length=300)
@@ -65,10 +102,13 @@ class FaultReport(models.Model):
     resolution_remarks = models.TextField(blank=True)
     attachment = models.FileField(
         upload_to='attachments/', 
+        storage=attachment_storage,
         null=True, 
         blank=True,
+        db_index=True,  # reference counting looks rows up by stored name
         validators=[validate_file_size, validate_file_extension]
     )
+    attachment_name = models.CharField(max_length=255, blank=True)  # original filename of the upload
 
     def __str__(self):
         return self.title
@@ -76,11 +116,27 @@ class FaultReport(models.Model):
     class Meta:
         ordering = ['-date_reported']
         indexes = [
-            models.Index(fields=['-date_reported']),
-            models.Index(fields=['status', '-date_reported']),
+            # end with -id so keyset pages (backend/pagination.py) are index range scans
+            models.Index(fields=['-date_reported', '-id']),
+            models.Index(fields=['status', '-date_reported', '-id']),
         ]
 
 
+class AttachmentUpload(models.Model):
+    """A resumable, chunked attachment upload for a fault; parts are written to a temp file"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fault = models.ForeignKey(FaultReport, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # total bytes announced by the client
+    received = models.PositiveBigIntegerField(default=0)  # contiguous bytes stored from offset 0
+    uploaded_by = models.CharField(max_length=200, default='system')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size}) for fault {self.fault_id}"
+
+
 class FieldActivity(models.Model):
     staff = models.ForeignKey(Staff, on_delete=models.CASCADE)
     substation = models.CharField(max_length=200)
@@ -95,6 +151,12 @@ class FieldActivity(models.Model):
     def __str__(self):
         return f"{self.staff} @ {self.substation} on {self.date}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'staff']),
+            models.Index(fields=['substation', 'date']),
+        ]
+
 
 class FaultFeedback(models.Model):
     fault = models.ForeignKey(FaultReport, on_delete=models.CASCADE, related_name='feedbacks')
@@ -110,6 +172,87 @@ class FaultFeedback(models.Model):
         ordering = ['-date_submitted']
 
 
+class DailyMetrics(models.Model):
+    """Per-day rollup of activity counts, kept in step with the source tables (see gridapp/rollups.py)"""
+    date = models.DateField(unique=True)
+    faults_reported = models.PositiveIntegerField(default=0)
+    server_room_entries = models.PositiveIntegerField(default=0)
+    server_room_staff = models.PositiveIntegerField(default=0)  # distinct staff in the server room
+    field_activities = models.PositiveIntegerField(default=0)
+    substation_visits = models.JSONField(default=dict)  # {substation: field activity count}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Metrics for {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'daily metrics'
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one fault, field activity or server-room entry (see gridapp/search.py).
+
+    The full-text index lives outside the ORM (migration 0014): an FTS5 table
+    kept in step by triggers on SQLite, a generated tsvector column with a GIN
+    index on PostgreSQL. On SQLite, an AlterField on this model rebuilds the
+    table and drops the triggers, so such a migration must recreate them.
+    """
+    KIND_CHOICES = [
+        ('fault', 'Fault report'),
+        ('field_activity', 'Field activity'),
+        ('server_room', 'Server room entry'),
+    ]
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    title = models.CharField(max_length=300, blank=True)
+    body = models.TextField(blank=True)
+    date = models.DateField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+class Job(models.Model):
+    """A background export or bulk operation, queued here and executed by `manage.py run_jobs`"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)  # a key of backend.jobs.HANDLERS
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/%Y/%m/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.CharField(max_length=200, default='system')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)  # doubles as the worker heartbeat
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
 class AuditLog(models.Model):
     """Track all changes made to records in the system"""
     ACTION_CHOICES = [
@@ -126,7 +269,8 @@ class AuditLog(models.Model):
     object_id = models.IntegerField()
     user = models.CharField(max_length=200, default='system')  # Can be staff name or 'system'
     changes = models.JSONField(default=dict)  # {field: {'old': old_value, 'new': new_value}}
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # stamped when the change happens; the batched audit writer may insert it later
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     
     def __str__(self):
@@ -135,8 +279,30 @@ class AuditLog(models.Model):
     class Meta:
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['model_name', 'object_id']),
-            models.Index(fields=['-timestamp']),
-            models.Index(fields=['user', '-timestamp']),
+            # per-record history reads a time window of one record's entries (gridapp/history.py)
+            models.Index(fields=['model_name', 'object_id', 'timestamp']),
+            # id breaks timestamp ties for the keyset cursors of the audit log API
+            models.Index(fields=['-timestamp', '-id']),
+            models.Index(fields=['user', '-timestamp', '-id']),
+        ]
+
+
+class AuditCheckpoint(models.Model):
+    """Full state of an audited record as of ``timestamp`` (see gridapp/history.py).
+
+    It covers every AuditLog entry of the record stamped at or before
+    ``timestamp``; history replays the entries on either side of it.
+    """
+    model_name = models.CharField(max_length=100)
+    object_id = models.IntegerField()
+    timestamp = models.DateTimeField()
+    state = models.JSONField()  # {field: value}, in the terms of the AuditLog diffs
+
+    def __str__(self):
+        return f"{self.model_name}({self.object_id}) at {self.timestamp}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model_name', 'object_id', 'timestamp']),
         ]
 
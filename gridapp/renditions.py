@@ -0,0 +1,121 @@
+"""Thumbnail and web-sized renditions of image attachments.
+
+Renditions are JPEGs derived from the stored original and cached under
+``MEDIA_ROOT/renditions/<variant>/``. They are generated in a small background
+thread pool when an image is attached, and regenerated on demand if a request
+finds one missing. Without Pillow installed, or when the original cannot be
+decoded (corrupt file, decompression bomb), no rendition is produced and
+callers fall back to the original file.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from .storage import attachment_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional
+    Image = None
+
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    # variant: (max width, max height, JPEG quality)
+    'thumb': (320, 320, 70),
+    'web': (1600, 1600, 80),
+}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+rendition_storage = FileSystemStorage()
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'RENDITION_WORKERS', 2),
+    thread_name_prefix='renditions',
+)
+
+
+def available():
+    return Image is not None
+
+
+def is_image(name):
+    return bool(name) and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def rendition_name(source_name, variant):
+    digest = hashlib.sha1(source_name.encode('utf-8')).hexdigest()
+    return f'renditions/{variant}/{digest[:2]}/{digest}.jpg'
+
+
+def generate(source_name, variant):
+    """Render ``variant`` of ``source_name`` and store it; returns the rendition's name."""
+    max_w, max_h, quality = RENDITIONS[variant]
+    with attachment_storage().open(source_name, 'rb') as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # flatten transparency onto white for JPEG
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.split()[-1])
+            image = background
+        else:
+            image = image.convert('RGB')
+        image.thumbnail((max_w, max_h))
+        out = io.BytesIO()
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+
+    name = rendition_name(source_name, variant)
+    path = rendition_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename so readers never see a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(out.getvalue())
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+    return name
+
+
+def get_rendition(source_name, variant):
+    """Name of the stored rendition, generating it now if it is missing; None if not possible."""
+    if not available() or not is_image(source_name) or variant not in RENDITIONS:
+        return None
+    name = rendition_name(source_name, variant)
+    if rendition_storage.exists(name):
+        return name
+    try:
+        return generate(source_name, variant)
+    except Exception:
+        logger.exception('could not render %s of %s', variant, source_name)
+        return None
+
+
+def _generate_missing(source_name):
+    for variant in RENDITIONS:
+        try:
+            if not rendition_storage.exists(rendition_name(source_name, variant)):
+                generate(source_name, variant)
+        except Exception:
+            logger.exception('could not render %s of %s', variant, source_name)
+
+
+def schedule(source_name):
+    """Queue background generation of every missing rendition of ``source_name``."""
+    if not available() or not is_image(source_name):
+        return
+    if all(rendition_storage.exists(rendition_name(source_name, v)) for v in RENDITIONS):
+        return
+    _executor.submit(_generate_missing, source_name)
+
+
+def delete_renditions(source_name):
+    for variant in RENDITIONS:
+        rendition_storage.delete(rendition_name(source_name, variant))
@@ -0,0 +1,130 @@
+"""Maintenance of the DailyMetrics rollup table.
+
+Whenever a ServerRoomEntry, FieldActivity or FaultReport is written, the
+rollup rows for the affected day(s) are recomputed from that day's source
+rows only (a few indexed queries), after the surrounding transaction commits,
+and the cached dashboard snapshots are dropped once the new rows are in.
+Bulk code paths that bypass model signals should wrap their work in
+``deferred()`` or call ``refresh_days`` themselves.
+"""
+import datetime
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import DailyMetrics, FaultReport, FieldActivity, ServerRoomEntry
+
+
+# model -> fields that feed the rollup; the first one is the row's day
+ROLLUP_SOURCES = {
+    FaultReport: ('date_reported',),
+    ServerRoomEntry: ('date', 'staff_id'),
+    FieldActivity: ('date', 'substation'),
+}
+
+_local = threading.local()
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def compute_day(day):
+    """Return the DailyMetrics field values for ``day`` computed from the source tables."""
+    entries = ServerRoomEntry.objects.filter(date=day).aggregate(
+        entries=Count('id'), staff=Count('staff', distinct=True),
+    )
+    visits = dict(
+        FieldActivity.objects.filter(date=day).order_by()
+        .values('substation').annotate(n=Count('id')).values_list('substation', 'n')
+    )
+    return {
+        'faults_reported': FaultReport.objects.filter(date_reported=day).count(),
+        'server_room_entries': entries['entries'],
+        'server_room_staff': entries['staff'],
+        'field_activities': sum(visits.values()),
+        'substation_visits': {name: n for name, n in visits.items() if name},
+    }
+
+
+def refresh_days(days):
+    """Recompute the rollup rows for ``days``; days with no activity are removed."""
+    from .signals import invalidate_dashboard  # signals imports this module
+
+    days = sorted({_as_date(d) for d in days if d})
+    for day in days:
+        values = compute_day(day)
+        if any(values[k] for k in ('faults_reported', 'server_room_entries', 'field_activities')):
+            DailyMetrics.objects.update_or_create(date=day, defaults=values)
+        else:
+            DailyMetrics.objects.filter(date=day).delete()
+    if days:
+        # a snapshot cached between the write and this refresh holds the old rollups
+        invalidate_dashboard()
+
+
+def mark_dirty(*days):
+    """Schedule a refresh of ``days`` once the current transaction commits."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(_as_date(d) for d in days if d)
+        return
+    days = [d for d in days if d]
+    if days:
+        transaction.on_commit(lambda: refresh_days(days))
+
+
+@contextmanager
+def deferred():
+    """Collect dirty days inside the block and refresh each of them once at the end."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = set()
+    try:
+        yield
+        days = _local.pending
+    finally:
+        _local.pending = None
+    if days:
+        transaction.on_commit(lambda: refresh_days(days))
+
+
+def rebuild(start=None, end=None):
+    """Rebuild every rollup row between ``start`` and ``end`` (inclusive) with grouped queries."""
+    def in_range(qs, field):
+        if start:
+            qs = qs.filter(**{f'{field}__gte': start})
+        if end:
+            qs = qs.filter(**{f'{field}__lte': end})
+        return qs.order_by()
+
+    rows = {}
+
+    def row(day):
+        return rows.setdefault(day, {
+            'faults_reported': 0, 'server_room_entries': 0, 'server_room_staff': 0,
+            'field_activities': 0, 'substation_visits': {},
+        })
+
+    for day, n in in_range(FaultReport.objects, 'date_reported').values('date_reported').annotate(n=Count('id')).values_list('date_reported', 'n'):
+        row(day)['faults_reported'] = n
+    for r in in_range(ServerRoomEntry.objects, 'date').values('date').annotate(n=Count('id'), staff=Count('staff', distinct=True)):
+        row(r['date']).update(server_room_entries=r['n'], server_room_staff=r['staff'])
+    for day, substation, n in in_range(FieldActivity.objects, 'date').values('date', 'substation').annotate(n=Count('id')).values_list('date', 'substation', 'n'):
+        metrics = row(day)
+        metrics['field_activities'] += n
+        if substation:
+            metrics['substation_visits'][substation] = n
+
+    with transaction.atomic():
+        in_range(DailyMetrics.objects, 'date').delete()
+        DailyMetrics.objects.bulk_create(
+            [DailyMetrics(date=day, **values) for day, values in rows.items()],
+            batch_size=500,
+        )
+    return len(rows)
@@ -0,0 +1,253 @@
+"""Full-text search over faults, field activities and server-room entries.
+
+Each searchable row has a SearchDocument holding its text. The index over
+those documents is native to the database (migration 0014):
+
+* SQLite: an external-content FTS5 table kept in step by triggers, ranked
+  with ``bm25()`` (title weighted over body).
+* PostgreSQL: a generated, weighted ``tsvector`` column with a GIN index,
+  ranked with ``ts_rank``.
+* Anything else: ``icontains`` filters, unranked.
+
+Documents follow their source rows the way rollups do: model signals mark a
+row dirty and it is re-read and re-indexed after the transaction commits, so
+a create, edit or delete becomes one upsert or delete. Bulk paths that skip
+signals call ``reindex`` themselves or wrap their work in ``deferred()``.
+"""
+import re
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import FaultReport, FieldActivity, SearchDocument, ServerRoomEntry
+from .versions import bump
+
+
+REINDEX_BATCH_SIZE = 500
+MAX_QUERY_TERMS = 10
+
+_local = threading.local()
+
+
+def _join(*parts):
+    return '\n'.join(p for p in parts if p)
+
+
+# model -> (kind, source fields, values row -> (title, body, date))
+SOURCES = {
+    FaultReport: (
+        'fault',
+        ('title', 'description', 'resolution_remarks', 'date_reported'),
+        lambda r: (r['title'], _join(r['description'], r['resolution_remarks']), r['date_reported']),
+    ),
+    FieldActivity: (
+        'field_activity',
+        ('substation', 'purpose', 'work_done', 'materials_used', 'date'),
+        lambda r: (r['substation'], _join(r['purpose'], r['work_done'], r['materials_used']), r['date']),
+    ),
+    ServerRoomEntry: (
+        'server_room',
+        ('reason', 'date'),
+        lambda r: ('', r['reason'], r['date']),
+    ),
+}
+KINDS = {kind: model for model, (kind, _, _) in SOURCES.items()}
+
+
+def reindex(model, ids):
+    """Bring the documents of ``model`` rows ``ids`` in line with the rows; missing rows lose theirs."""
+    kind, fields, build = SOURCES[model]
+    ids = sorted({i for i in ids if i is not None})
+    if not ids:
+        return
+    for start in range(0, len(ids), REINDEX_BATCH_SIZE):
+        chunk = ids[start:start + REINDEX_BATCH_SIZE]
+        docs = []
+        for row in model.objects.filter(pk__in=chunk).order_by().values('id', *fields):
+            title, body, day = build(row)
+            docs.append(SearchDocument(kind=kind, object_id=row['id'], title=title[:300], body=body, date=day))
+        SearchDocument.objects.bulk_create(
+            docs,
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['title', 'body', 'date'],
+        )
+        gone = set(chunk) - {d.object_id for d in docs}
+        if gone:
+            SearchDocument.objects.filter(kind=kind, object_id__in=gone).delete()
+    bump('search')
+
+
+def mark_dirty(model, *ids):
+    """Schedule a reindex of ``ids`` once the current transaction commits."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.setdefault(model, set()).update(ids)
+        return
+    transaction.on_commit(lambda: reindex(model, ids))
+
+
+@contextmanager
+def deferred():
+    """Collect dirty rows inside the block and reindex them in batches at the end."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = {}
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    for model, ids in pending.items():
+        transaction.on_commit(lambda model=model, ids=ids: reindex(model, ids))
+
+
+def rebuild():
+    """Recreate every document from the source tables; returns how many were written."""
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for model in SOURCES:
+            ids = list(model.objects.order_by().values_list('id', flat=True))
+            reindex(model, ids)
+            count += len(ids)
+        if connection.vendor == 'sqlite' and _backend() == 'fts5':
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO gridapp_searchdocument_fts(gridapp_searchdocument_fts) VALUES ('rebuild')")
+    return count
+
+
+# Queries ---------------------------------------------------------------------
+
+_backends = {}
+
+
+def _backend():
+    alias = connection.alias
+    if alias not in _backends:
+        if connection.vendor == 'sqlite':
+            found = 'gridapp_searchdocument_fts' in connection.introspection.table_names()
+            _backends[alias] = 'fts5' if found else 'like'
+        elif connection.vendor == 'postgresql':
+            _backends[alias] = 'postgresql'
+        else:
+            _backends[alias] = 'like'
+    return _backends[alias]
+
+
+def terms(query):
+    """The words of a user query; punctuation and search operators are dropped."""
+    return re.findall(r'\w+', query.lower())[:MAX_QUERY_TERMS]
+
+
+def search(query, kinds=None, after=None, limit=50):
+    """Rank documents matching every word of ``query`` (the last one as a prefix).
+
+    Returns up to ``limit`` + 1 dicts (``id``, ``kind``, ``object_id``, ``title``,
+    ``date``, ``score``, ``excerpt``), best first. ``after`` is the
+    ``(score, id)`` of the last row of the previous page.
+    """
+    words = terms(query)
+    if not words:
+        return []
+    kinds = [k for k in (kinds or KINDS) if k in KINDS]
+    backend = _backend()
+    if backend == 'fts5':
+        return _search_fts5(words, kinds, after, limit)
+    if backend == 'postgresql':
+        return _search_postgresql(words, kinds, after, limit)
+    return _search_like(words, kinds, after, limit)
+
+
+def _page_sql(inner, after):
+    # descending keyset on (score, id), as in backend/pagination.py
+    sql = f'SELECT id, kind, object_id, title, date, score FROM ({inner}) ranked'
+    params = []
+    if after is not None:
+        sql += ' WHERE score < %s OR (score = %s AND id < %s)'
+        params = [after[0], after[0], after[1]]
+    return sql + ' ORDER BY score DESC, id DESC LIMIT %s', params
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _kind_filter(kinds, column):
+    if len(kinds) == len(KINDS):
+        return '', []
+    return f' AND {column} IN ({", ".join(["%s"] * len(kinds))})', list(kinds)
+
+
+def _search_fts5(words, kinds, after, limit):
+    match = ' '.join(f'"{w}"' for w in words) + '*'
+    kind_sql, kind_params = _kind_filter(kinds, 'd.kind')
+    inner = (
+        'SELECT d.id, d.kind, d.object_id, d.title, d.date, '
+        '-bm25(gridapp_searchdocument_fts, 2.0, 1.0) AS score '
+        'FROM gridapp_searchdocument_fts '
+        'JOIN gridapp_searchdocument d ON d.id = gridapp_searchdocument_fts.rowid '
+        'WHERE gridapp_searchdocument_fts MATCH %s' + kind_sql
+    )
+    sql, page_params = _page_sql(inner, after)
+    rows = _fetch(sql, [match, *kind_params, *page_params, limit + 1])
+    if rows:
+        # excerpts only for the page, not for every match
+        ids = [r['id'] for r in rows]
+        excerpts = dict(_fetch_pairs(
+            "SELECT rowid, snippet(gridapp_searchdocument_fts, 1, '', '', '…', 16) "
+            'FROM gridapp_searchdocument_fts WHERE gridapp_searchdocument_fts MATCH %s '
+            f'AND rowid IN ({", ".join(["%s"] * len(ids))})',
+            [match, *ids],
+        ))
+        for r in rows:
+            r['excerpt'] = excerpts.get(r['id'], '')
+    return rows
+
+
+def _search_postgresql(words, kinds, after, limit):
+    tsquery = ' & '.join(words) + ':*'
+    kind_sql, kind_params = _kind_filter(kinds, 'd.kind')
+    inner = (
+        'SELECT d.id, d.kind, d.object_id, d.title, d.date, ts_rank(d.search_vector, q) AS score '
+        "FROM gridapp_searchdocument d, to_tsquery('english', %s) q "
+        'WHERE d.search_vector @@ q' + kind_sql
+    )
+    sql, page_params = _page_sql(inner, after)
+    rows = _fetch(sql, [tsquery, *kind_params, *page_params, limit + 1])
+    if rows:
+        ids = [r['id'] for r in rows]
+        excerpts = dict(_fetch_pairs(
+            "SELECT id, ts_headline('english', body, to_tsquery('english', %s), "
+            "'StartSel=\"\", StopSel=\"\", MaxWords=20, MinWords=8') "
+            'FROM gridapp_searchdocument WHERE id = ANY(%s)',
+            [tsquery, ids],
+        ))
+        for r in rows:
+            r['excerpt'] = excerpts.get(r['id'], '')
+    return rows
+
+
+def _search_like(words, kinds, after, limit):
+    qs = SearchDocument.objects.filter(kind__in=kinds)
+    for word in words:
+        qs = qs.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    if after is not None:
+        qs = qs.filter(id__lt=after[1])
+    rows = list(qs.order_by('-id').values('id', 'kind', 'object_id', 'title', 'date', 'body')[:limit + 1])
+    for r in rows:
+        r['score'] = 0.0
+        r['excerpt'] = r.pop('body')[:200]
+    return rows
+
+
+def _fetch_pairs(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
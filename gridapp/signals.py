@@ -0,0 +1,151 @@
+"""Model signal handlers that keep derived data in step with writes.
+
+Cache invalidations (resource versions, dashboard snapshots) run once the
+surrounding transaction commits: run earlier, a concurrent read could cache
+pre-commit rows under the new version. Bulk code paths wrap their work in
+``deferred()`` so each invalidation runs once for the block, not per row.
+"""
+import datetime
+import threading
+from contextlib import contextmanager
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import renditions, rollups, search, staff, versions
+from .models import FaultReport, FieldActivity, ServerRoomEntry, ServerRoomVisitor, Staff
+from .storage import release_attachment
+
+
+DASHBOARD_GENERATION_KEY = 'dashboard:generation'
+
+_local = threading.local()
+
+
+def dashboard_cache_key(days=7, day=None):
+    day = day or datetime.date.today()
+    generation = cache.get(DASHBOARD_GENERATION_KEY, 0)
+    return f'dashboard:snapshot:{generation}:{day.isoformat()}:{days}'
+
+
+def invalidate_dashboard():
+    """Drop cached dashboard snapshots; call after writes that bypass model signals."""
+    try:
+        cache.incr(DASHBOARD_GENERATION_KEY)
+    except ValueError:
+        cache.set(DASHBOARD_GENERATION_KEY, 1, None)
+
+
+def _on_commit(key, func):
+    """Run ``func`` once the current transaction commits; once per ``key`` inside ``deferred()``."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending[key] = func
+        return
+    transaction.on_commit(func)
+
+
+@contextmanager
+def deferred():
+    """Collect the invalidations made inside the block and run each of them once after commit."""
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = {}
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+    for func in pending.values():
+        transaction.on_commit(func)
+
+
+@receiver([post_save, post_delete], sender=ServerRoomEntry)
+@receiver([post_save, post_delete], sender=FieldActivity)
+@receiver([post_save, post_delete], sender=FaultReport)
+def _dashboard_source_changed(sender, **kwargs):
+    _on_commit('dashboard', invalidate_dashboard)
+
+
+@receiver(pre_save, sender=ServerRoomEntry)
+@receiver(pre_save, sender=FieldActivity)
+@receiver(pre_save, sender=FaultReport)
+def _remember_rollup_fields(sender, instance, raw=False, **kwargs):
+    # keep the stored values of the rollup fields so post_save can tell what moved
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = rollups.ROLLUP_SOURCES[sender]
+    instance._rollup_old = sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+@receiver(post_save, sender=ServerRoomEntry)
+@receiver(post_save, sender=FieldActivity)
+@receiver(post_save, sender=FaultReport)
+def _rollup_source_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fields = rollups.ROLLUP_SOURCES[sender]
+    day = getattr(instance, fields[0])
+    old = instance.__dict__.pop('_rollup_old', None)
+    if created or old is None:
+        rollups.mark_dirty(day)
+    elif any(str(old[f]) != str(getattr(instance, f)) for f in fields):
+        rollups.mark_dirty(old[fields[0]], day)
+
+
+@receiver(post_delete, sender=ServerRoomEntry)
+@receiver(post_delete, sender=FieldActivity)
+@receiver(post_delete, sender=FaultReport)
+def _rollup_source_deleted(sender, instance, **kwargs):
+    rollups.mark_dirty(getattr(instance, rollups.ROLLUP_SOURCES[sender][0]))
+
+
+@receiver(post_save, sender=ServerRoomEntry)
+@receiver(post_save, sender=FieldActivity)
+@receiver(post_save, sender=FaultReport)
+def _search_source_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # e.g. attachment bookkeeping saves touch none of the indexed text
+    if update_fields is not None and not set(update_fields) & set(search.SOURCES[sender][1]):
+        return
+    search.mark_dirty(sender, instance.pk)
+
+
+@receiver(post_delete, sender=ServerRoomEntry)
+@receiver(post_delete, sender=FieldActivity)
+@receiver(post_delete, sender=FaultReport)
+def _search_source_deleted(sender, instance, **kwargs):
+    search.mark_dirty(sender, instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Staff)
+def _staff_changed(sender, instance, **kwargs):
+    staff.forget(instance)
+
+
+@receiver([post_save, post_delete], sender=ServerRoomEntry)
+@receiver([post_save, post_delete], sender=ServerRoomVisitor)
+@receiver([post_save, post_delete], sender=FieldActivity)
+@receiver([post_save, post_delete], sender=FaultReport)
+@receiver([post_save, post_delete], sender=Staff)
+def _bump_resource_version(sender, **kwargs):
+    _on_commit(sender.__name__, partial(versions.bump_for_model, sender.__name__))
+
+
+@receiver(post_delete, sender=FaultReport)
+def _release_fault_attachment(sender, instance, **kwargs):
+    if instance.attachment:
+        release_attachment(instance.attachment.name)
+
+
+@receiver(post_save, sender=FaultReport)
+def _schedule_renditions(sender, instance, raw=False, **kwargs):
+    if raw or not instance.attachment or not renditions.is_image(instance.attachment.name):
+        return
+    name = instance.attachment.name
+    transaction.on_commit(lambda: renditions.schedule(name))
@@ -0,0 +1,212 @@
+"""Resolution of staff references (an id or a name) to Staff rows.
+
+Names are matched on ``Staff.name_key`` (see ``normalize_staff_name``), which
+is unique and indexed. Lookups are batched, so any number of references costs
+at most one query. Results are kept in a bounded, process-local LRU cache of
+``STAFF_CACHE_SIZE`` entries, so resolving a known name on a hot POST path
+does not touch the database. The cache only holds committed rows (a row this
+process creates is cached once its transaction commits) and is valid for one
+value of the shared ``staff`` version stamp (gridapp/versions.py): any
+committed Staff write, in any worker, moves the stamp and the next lookup here
+starts from an empty cache.
+"""
+import threading
+from collections import OrderedDict
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Staff, normalize_staff_name
+from .versions import bump_for_model, get_versions
+
+
+STAFF_CACHE_SIZE = getattr(settings, 'STAFF_CACHE_SIZE', 1024)
+
+_lock = threading.Lock()
+_by_key = OrderedDict()  # name_key -> Staff, least recently used first
+_by_id = OrderedDict()  # id -> Staff
+_version = None  # 'staff' version stamp the cached rows were read under
+
+
+def clear_cache():
+    with _lock:
+        _by_key.clear()
+        _by_id.clear()
+
+
+def _sync_version():
+    """Drop the cache if a Staff write was committed since it was filled; returns the current stamp."""
+    global _version
+    version = get_versions(['staff'])[0]
+    with _lock:
+        if version != _version:
+            _by_key.clear()
+            _by_id.clear()
+            _version = version
+    return version
+
+
+def forget(staff):
+    """Evict ``staff`` from the cache, under its current and any previous name."""
+    with _lock:
+        _by_id.pop(staff.pk, None)
+        for key in [k for k, cached in _by_key.items() if cached.pk == staff.pk]:
+            del _by_key[key]
+
+
+def _as_id(ref):
+    if isinstance(ref, bool):
+        return None
+    if isinstance(ref, int):
+        return ref
+    if isinstance(ref, str) and ref.strip().isdigit():
+        return int(ref.strip())
+    return None
+
+
+def _cached(table, key):
+    staff = table.get(key)
+    if staff is not None:
+        table.move_to_end(key)
+    return staff
+
+
+def _remember(staff, version):
+    # caller holds _lock; rows read under an older stamp may already be stale
+    if version != _version:
+        return
+    _by_id[staff.pk] = staff
+    _by_id.move_to_end(staff.pk)
+    _by_key[staff.name_key] = staff
+    _by_key.move_to_end(staff.name_key)
+    while len(_by_id) > STAFF_CACHE_SIZE:
+        _by_id.popitem(last=False)
+    while len(_by_key) > STAFF_CACHE_SIZE:
+        _by_key.popitem(last=False)
+
+
+def resolve_staff(refs):
+    """Map each reference in ``refs`` to a Staff instance, or None if unknown.
+
+    Numeric references (ints or digit strings) match on id first and fall back
+    to the name; anything else matches the normalized name.
+    """
+    refs = [r for r in refs if r not in (None, '')]
+    version = _sync_version()
+    resolved = {}
+    want_ids, want_keys = set(), set()
+    with _lock:
+        for ref in refs:
+            staff_id = _as_id(ref)
+            if staff_id is not None:
+                staff = _cached(_by_id, staff_id)
+                if staff is not None:
+                    resolved[ref] = staff
+                    continue
+                want_ids.add(staff_id)
+            if isinstance(ref, str):
+                staff = _cached(_by_key, normalize_staff_name(ref))
+                if staff is not None:
+                    resolved[ref] = staff
+                    continue
+                want_keys.add(normalize_staff_name(ref))
+
+    if want_ids or want_keys:
+        rows = list(Staff.objects.filter(Q(id__in=want_ids) | Q(name_key__in=want_keys)))
+        by_id = {staff.pk: staff for staff in rows}
+        by_key = {staff.name_key: staff for staff in rows}
+        with _lock:
+            for staff in rows:
+                _remember(staff, version)
+        for ref in refs:
+            if ref in resolved:
+                continue
+            staff_id = _as_id(ref)
+            staff = by_id.get(staff_id) if staff_id is not None else None
+            if staff is None and isinstance(ref, str):
+                staff = by_key.get(normalize_staff_name(ref))
+            if staff is not None:
+                resolved[ref] = staff
+
+    return {ref: resolved.get(ref) for ref in refs}
+
+
+def resolve_one(ref):
+    """Resolve a single staff reference; returns None if it matches nobody."""
+    if ref in (None, ''):
+        return None
+    return resolve_staff([ref]).get(ref)
+
+
+def get_or_create_staff(name):
+    """The Staff row for ``name`` (matched on its normalized key), created if missing.
+
+    Returns None for a blank name. Safe against a concurrent request creating
+    the same person: the unique key makes the loser fetch the winner's row.
+    """
+    key = normalize_staff_name(name)
+    if not key:
+        return None
+    version = _sync_version()
+    with _lock:
+        staff = _cached(_by_key, key)
+    if staff is not None:
+        return staff
+    staff = Staff.objects.filter(name_key=key).first()
+    if staff is None:
+        try:
+            with transaction.atomic():
+                staff = Staff.objects.create(name=name.strip())
+        except IntegrityError:
+            staff = Staff.objects.get(name_key=key)
+        else:
+            # cached only if the caller's transaction commits; a rollback leaves no pk behind
+            transaction.on_commit(partial(_remember_committed, staff))
+            return staff
+    with _lock:
+        _remember(staff, version)
+    return staff
+
+
+def _remember_committed(*rows):
+    version = _sync_version()
+    with _lock:
+        for staff in rows:
+            _remember(staff, version)
+
+
+def get_or_create_many(names):
+    """Map each of ``names`` to its Staff row, bulk-creating the missing ones.
+
+    Costs at most one lookup query, plus an insert and a re-read when some are new.
+    """
+    names = {name for name in names if normalize_staff_name(name)}
+    keys = {name: normalize_staff_name(name) for name in names}
+    version = _sync_version()
+    found = {}
+    with _lock:
+        for key in set(keys.values()):
+            staff = _cached(_by_key, key)
+            if staff is not None:
+                found[key] = staff
+    missing = set(keys.values()) - found.keys()
+    if missing:
+        rows = {staff.name_key: staff for staff in Staff.objects.filter(name_key__in=missing)}
+        with _lock:
+            for staff in rows.values():
+                _remember(staff, version)
+        found.update(rows)
+        new = {key: name.strip() for name, key in keys.items() if key in missing and key not in rows}
+        if new:
+            # rows a concurrent request created meanwhile are skipped, then fetched below
+            Staff.objects.bulk_create(
+                [Staff(name=name, name_key=key) for key, name in new.items()], ignore_conflicts=True,
+            )
+            created = list(Staff.objects.filter(name_key__in=new))
+            found.update((staff.name_key, staff) for staff in created)
+            # bulk_create skips the post_save signal
+            transaction.on_commit(partial(bump_for_model, 'Staff'))
+            transaction.on_commit(partial(_remember_committed, *created))
+    return {name: found[key] for name, key in keys.items()}
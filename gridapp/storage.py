@@ -0,0 +1,104 @@
+"""Content-addressed storage for fault attachments.
+
+Every file is stored once, at ``cas/<aa>/<bb>/<sha256><ext>``; uploading bytes
+that are already stored just returns the existing name, so attaching the same
+photo to several faults costs one copy on disk. The FaultReport rows pointing
+at a name are its references, and ``release_attachment`` deletes the bytes only
+once the last of them is gone.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+
+CAS_PREFIX = 'cas'
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, digest, ext):
+        return f'{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        ext = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        if hasattr(content, 'temporary_file_path'):
+            # already on disk (large upload or finished chunked upload): hash, then move
+            digest = _hash_file(content.temporary_file_path())
+            target = self.content_name(digest, ext)
+            if not self.exists(target):
+                saved = self._save(target, content)
+                if saved != target:
+                    # a concurrent upload of the same bytes got there first; no row will
+                    # reference the copy _save put under another name
+                    self.delete(saved)
+            return target
+
+        # stream into a temp file next to the store while hashing, then rename into place
+        tmp_dir = self.path(CAS_PREFIX)
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix='.tmp')
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    out.write(chunk)
+            target = self.content_name(sha.hexdigest(), ext)
+            full_path = self.path(target)
+            if os.path.exists(full_path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+                os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return target
+
+
+def _hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(HASH_BLOCK_SIZE), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+_attachment_storage = ContentAddressedStorage()
+
+
+def attachment_storage():
+    return _attachment_storage
+
+
+def release_attachment(name, exclude_pk=None):
+    """Delete the stored bytes for ``name`` after commit, unless a FaultReport still references them."""
+    if not name:
+        return
+
+    def release():
+        from .models import FaultReport
+        with transaction.atomic():
+            # lock the remaining references so none is re-pointed at ``name`` between
+            # the check and the delete
+            refs = FaultReport.objects.select_for_update().filter(attachment=name)
+            if exclude_pk is not None:
+                refs = refs.exclude(pk=exclude_pk)
+            if list(refs.values_list('pk', flat=True)):
+                return
+            from .renditions import delete_renditions
+            _attachment_storage.delete(name)
+            delete_renditions(name)
+
+    transaction.on_commit(release)
@@ -0,0 +1,1394 @@
+import csv
+import datetime
+import io
+import json
+import os
+import runpy
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.db.models import Count
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from openpyxl import load_workbook
+from rest_framework_simplejwt.tokens import AccessToken
+
+from backend import async_views, audit, bulk, exports, file_delivery, ingest, jobs, metrics, spool, upload_views, views
+from backend.database import parse_database_url
+from backend.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_filter, keyset_page
+
+from . import history, renditions, search, staff, versions
+from .admin import export_as_xlsx
+from .management.commands import bench_endpoints
+from .storage import attachment_storage, release_attachment
+from .models import AuditLog, FaultReport, FieldActivity, Job, ServerRoomEntry, ServerRoomVisitor, Staff
+
+
+def scratch_dirs(test):
+    """Point MEDIA_ROOT and the write spool at temporary directories for the test."""
+    root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, root, ignore_errors=True)
+    test.enterContext(override_settings(MEDIA_ROOT=os.path.join(root, 'media')))
+    test.enterContext(mock.patch.object(spool, 'WRITE_SPOOL_DIR', os.path.join(root, 'spool')))
+    test.enterContext(mock.patch.object(upload_views, 'UPLOAD_TEMP_DIR', os.path.join(root, 'partial')))
+
+
+class GridTestCase(TestCase):
+    """Starts every test with an empty cache, a scratch MEDIA_ROOT and an empty spool."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        scratch_dirs(self)
+
+
+def make_fault(**kwargs):
+    values = {
+        'title': 'Fault', 'description': '', 'date_reported': datetime.date(2026, 1, 1),
+        'location': 'HQ', 'severity': 'low', **kwargs,
+    }
+    return FaultReport.objects.create(**values)
+
+
+def _cursor_page(qs, fields, values):
+    """The query keyset_page runs for a page after the row with sort values ``values``."""
+    return qs.filter(keyset_filter(fields, values)).order_by(*[f'-{f}' for f in fields])[:51]
+
+
+def hot_lookups():
+    """The date/staff/substation lookups behind the dashboard, daily records and exports."""
+    day = datetime.date.today()
+    week = (day - datetime.timedelta(days=6), day)
+    return {
+        'server room entries for a day': ServerRoomEntry.objects.filter(date=day),
+        'server room entries for a range': ServerRoomEntry.objects.filter(date__range=week),
+        'server room staff per day': ServerRoomEntry.objects.filter(date__range=week).order_by()
+            .values('date').annotate(n=Count('staff', distinct=True)),
+        'field activities for a day': FieldActivity.objects.filter(date=day),
+        'field activities for a range': FieldActivity.objects.filter(date__range=week),
+        'field activities at a substation': FieldActivity.objects.filter(substation='X', date__range=week),
+        'visitors for a day': ServerRoomVisitor.objects.filter(date=day),
+        'faults for a day': FaultReport.objects.filter(date_reported=day),
+        'open faults, newest first': FaultReport.objects.filter(status='open').order_by('-date_reported'),
+    }
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'query plan checks are written for SQLite')
+class QueryPlanTests(TestCase):
+    """Hot lookups must use an index; cursor pages must seek one, not sort every older row."""
+
+    def assertRangeScan(self, qs, index_fields):
+        plan = qs.explain()
+        self.assertRegex(plan, r'SEARCH \w+ USING (COVERING )?INDEX', plan)
+        self.assertIn(index_fields, plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        self.assertNotIn('MULTI-INDEX OR', plan)
+
+    def test_hot_lookups_use_an_index(self):
+        for label, qs in hot_lookups().items():
+            with self.subTest(label):
+                plan = qs.explain()
+                # "SCAN <table>" without "USING ... INDEX" means every row is read
+                table = qs.model._meta.db_table
+                self.assertNotRegex(plan, rf'\bSCAN {table}\b(?! USING (COVERING )?INDEX)', plan)
+
+    def test_fault_cursor_page(self):
+        qs = _cursor_page(FaultReport.objects.all(), ['date_reported', 'id'], ['2026-01-01', 10])
+        self.assertRangeScan(qs, '(date_reported<?)')
+
+    def test_fault_cursor_page_by_status(self):
+        qs = _cursor_page(FaultReport.objects.filter(status='open'), ['date_reported', 'id'], ['2026-01-01', 10])
+        self.assertRangeScan(qs, '(status=? AND date_reported<?)')
+
+    def test_audit_log_cursor_page(self):
+        at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        qs = _cursor_page(AuditLog.objects.all(), ['timestamp', 'id'], [at, 10])
+        self.assertRangeScan(qs, '(timestamp<?)')
+
+    def test_audit_log_cursor_page_by_user(self):
+        at = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        qs = _cursor_page(AuditLog.objects.filter(user='ann'), ['timestamp', 'id'], [at, 10])
+        self.assertRangeScan(qs, '(user=? AND timestamp<?)')
+
+
+class KeysetPageTests(GridTestCase):
+
+    def test_pages_follow_on(self):
+        day = datetime.date(2026, 1, 1)
+        for i in range(7):
+            FaultReport.objects.create(
+                title=f'F{i}', description='', date_reported=day - datetime.timedelta(days=i // 3),
+                location='HQ', severity='low',
+            )
+        expected = list(FaultReport.objects.order_by('-date_reported', '-id').values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(
+                FaultReport.objects.all(), ['date_reported', 'id'], cursor=cursor, limit=3,
+                key=lambda f: [f.date_reported.isoformat(), f.id],
+            )
+            seen += [f.id for f in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+
+class InvalidationTests(GridTestCase):
+    """Version stamps and dashboard snapshots move only once the write has committed."""
+
+    def test_save_bumps_after_commit(self):
+        before = versions.get_versions(['fault_reports'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            make_fault()
+            self.assertEqual(versions.get_versions(['fault_reports']), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(versions.get_versions(['fault_reports']), before)
+
+    def test_bulk_delete_bumps_once(self):
+        ids = [make_fault().id for _ in range(5)]
+        with mock.patch.object(versions, 'bump', wraps=versions.bump) as bump, \
+                mock.patch('gridapp.signals.invalidate_dashboard') as invalidate, \
+                self.captureOnCommitCallbacks(execute=True):
+            bulk.delete_faults(ids)
+        self.assertEqual(bump.call_args_list.count(mock.call('fault_reports')), 1)
+        # once for the deleted rows, once after the rollup refresh; not once per row
+        self.assertEqual(invalidate.call_count, 2)
+
+
+class AdminExportTests(GridTestCase):
+
+    def test_fault_xlsx_export(self):
+        day = datetime.date(2026, 1, 1)
+        FaultReport.objects.create(title='Plain', description='', date_reported=day, location='HQ', severity='low')
+        FaultReport.objects.create(
+            title='Photo', description='', date_reported=day, location='HQ', severity='low',
+            attachment='cas/ab/cd/abcd.jpg', attachment_name='pole.jpg',
+        )
+        response = export_as_xlsx(site._registry[FaultReport], None, FaultReport.objects.order_by('title'))
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.iter_rows(values_only=True))
+        column = rows[0].index('attachment')
+        self.assertEqual([row[column] for row in rows[1:]], ['cas/ab/cd/abcd.jpg', None])
+
+
+class StaffAdminTests(GridTestCase):
+
+    def test_rename_to_existing_name_is_a_form_error(self):
+        Staff.objects.create(name='Ann Lee')
+        bob = Staff.objects.create(name='Bob')
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        response = self.client.post(f'/admin/gridapp/staff/{bob.pk}/change/', {
+            'name': '  ann  LEE', 'email': '', 'is_active': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('name', response.context['adminform'].form.errors)
+        bob.refresh_from_db()
+        self.assertEqual(bob.name, 'Bob')
+
+
+class ResponseCacheTests(GridTestCase):
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get('/api/server-room-visitors/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get('/api/server-room-visitors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_write_changes_etag_and_body(self):
+        first = self.client.get('/api/server-room-visitors/')
+        self.assertEqual(first.json(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            ServerRoomVisitor.objects.create(staff_id='7', name='Vic', purpose='audit', time_in='09:00')
+        second = self.client.get('/api/server-room-visitors/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual([v['name'] for v in second.json()], ['Vic'])
+
+    def test_cached_body_is_served_until_a_write(self):
+        ServerRoomVisitor.objects.create(staff_id='7', name='Vic', purpose='audit', time_in='09:00')
+        self.client.get('/api/server-room-visitors/')
+        # a change that skips the signals is not seen while the versions stand
+        ServerRoomVisitor.objects.update(name='Changed')
+        self.assertEqual(self.client.get('/api/server-room-visitors/').json()[0]['name'], 'Vic')
+        versions.bump_for_model('ServerRoomVisitor')
+        self.assertEqual(self.client.get('/api/server-room-visitors/').json()[0]['name'], 'Changed')
+
+
+class DatabaseUrlTests(unittest.TestCase):
+
+    def test_sqlite_relative_to_base_dir(self):
+        config = parse_database_url('sqlite:///db.sqlite3', base_dir=Path('/srv/gridco'))
+        self.assertEqual(config['NAME'], '/srv/gridco/db.sqlite3')
+        self.assertIn('journal_mode=WAL', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_sqlite_without_wal(self):
+        config = parse_database_url('sqlite:////srv/gridco/db.sqlite3', sqlite_wal=False)
+        self.assertEqual(config['NAME'], '/srv/gridco/db.sqlite3')
+        self.assertNotIn('journal_mode', config['OPTIONS']['init_command'])
+        self.assertIn('busy_timeout', config['OPTIONS']['init_command'])
+
+    def test_postgres(self):
+        config = parse_database_url('postgres://u:p%40ss@db:5433/grid?sslmode=require')
+        self.assertEqual(
+            (config['NAME'], config['USER'], config['PASSWORD'], config['HOST'], config['PORT']),
+            ('grid', 'u', 'p@ss', 'db', '5433'),
+        )
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+
+
+def _audit_entries(n, action='UPDATE'):
+    for i in range(n):
+        audit.record(action, 'FaultReport', i, user='ann', changes={'n': i})
+
+
+class AuditWriterTests(TransactionTestCase):
+    """The background writer: batches, flush(), and nothing before or without a commit."""
+
+    def setUp(self):
+        scratch_dirs(self)
+        self.enterContext(mock.patch.object(audit, 'AUDIT_ASYNC', True))
+        self.enterContext(mock.patch.object(audit, 'AUDIT_BATCH_SIZE', 3))
+        # long enough that only a full batch or flush() ends one
+        self.enterContext(mock.patch.object(audit, 'AUDIT_FLUSH_INTERVAL', 60000))
+        self.write = self.enterContext(mock.patch.object(audit, 'write', wraps=audit.write))
+        self.addCleanup(audit.stop)
+
+    def test_entries_are_written_in_batches(self):
+        _audit_entries(7)
+        self.assertTrue(audit.flush())
+        self.assertEqual([len(c.args[0]) for c in self.write.call_args_list], [3, 3, 1])
+        self.assertEqual(
+            list(AuditLog.objects.order_by('object_id').values_list('object_id', flat=True)), list(range(7)),
+        )
+
+    def test_queued_only_after_commit(self):
+        with transaction.atomic():
+            _audit_entries(2)
+            self.assertTrue(audit._writer is None or audit._writer.queue.empty())
+        self.assertTrue(audit.flush())
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_rolled_back_entries_are_dropped(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            _audit_entries(2)
+            raise ValueError
+        self.assertTrue(audit.flush())
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.write.assert_not_called()
+
+
+class AuditSpoolTests(GridTestCase):
+
+    def test_sync_write_is_part_of_the_transaction(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            _audit_entries(1)
+            raise ValueError
+        self.assertEqual(AuditLog.objects.count(), 0)
+        _audit_entries(1)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_unwritable_entries_are_spooled_and_replayed(self):
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('backend.audit', 'WARNING'):
+            _audit_entries(3)
+        self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertTrue(spool.pending('audit_log'))
+        self.assertEqual(spool.replay('audit_log'), {'audit_log': 3})
+        self.assertFalse(spool.pending('audit_log'))
+        entry = AuditLog.objects.get(object_id=2)
+        self.assertEqual((entry.action, entry.user, entry.changes), ('UPDATE', 'ann', {'n': 2}))
+
+
+class WriteSpoolTests(GridTestCase):
+
+    visit = {'staff_id': '7', 'name': 'Vic', 'purpose': 'audit', 'date': '2026-01-01', 'time_in': '09:00'}
+
+    def post_visit(self):
+        return self.client.post('/api/server-room-visitors/', self.visit, content_type='application/json')
+
+    def test_refused_write_is_spooled_and_replayed_off_the_request_path(self):
+        with mock.patch.object(ServerRoomVisitor.objects, 'create', side_effect=OperationalError('database is locked')):
+            response = self.post_visit()
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(response.json()['id'])
+        self.assertTrue(response.json()['spool_id'])
+        # a later successful request does not replay inline
+        self.assertEqual(self.post_visit().status_code, 201)
+        self.assertTrue(spool.pending('server_room_visitors'))
+        self.assertEqual(ServerRoomVisitor.objects.count(), 1)
+
+        out = io.StringIO()
+        call_command('run_jobs', once=True, workers=1, stdout=out)
+        self.assertIn('Replayed 1 spooled server_room_visitors record(s)', out.getvalue())
+        self.assertFalse(spool.pending('server_room_visitors'))
+        self.assertEqual(ServerRoomVisitor.objects.filter(name='Vic').count(), 2)
+
+    def test_unreadable_and_invalid_records_are_quarantined(self):
+        spool.extend('server_room_visitors', [self.visit, {**self.visit, 'time_in': 'noon'}])
+        with open(os.path.join(spool.WRITE_SPOOL_DIR, 'server_room_visitors.jsonl'), 'ab') as fh:
+            fh.write(b'{"payload": {"torn')
+        with self.assertLogs('backend.spool', 'WARNING'):
+            self.assertEqual(spool.replay('server_room_visitors'), {'server_room_visitors': 1})
+        self.assertFalse(spool.pending('server_room_visitors'))
+        bad = [n for n in os.listdir(spool.WRITE_SPOOL_DIR) if n.endswith('.bad')]
+        self.assertEqual(len(bad), 1)
+        with open(os.path.join(spool.WRITE_SPOOL_DIR, bad[0]), 'rb') as fh:
+            self.assertEqual(len(fh.readlines()), 2)
+
+    def test_replay_pending_keeps_records_while_the_database_refuses(self):
+        spool.append('server_room_visitors', self.visit)
+        with mock.patch('backend.ingest.insert', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('backend.spool', 'ERROR'):
+            self.assertEqual(spool.replay_pending(), {})
+        self.assertTrue(spool.pending('server_room_visitors'))
+        self.assertEqual(spool.replay_pending(), {'server_room_visitors': 1})
+
+
+class StaffCacheTests(GridTestCase):
+
+    def test_rolled_back_create_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                ghost = staff.get_or_create_staff('Gus Ghost')
+                raise ValueError
+        self.assertFalse(Staff.objects.filter(pk=ghost.pk).exists())
+        self.assertIsNone(staff.resolve_one('Gus Ghost'))
+        self.assertIsNone(staff.resolve_one(ghost.pk))
+        real = staff.get_or_create_staff('Gus Ghost')
+        self.assertTrue(Staff.objects.filter(pk=real.pk).exists())
+
+    def test_rolled_back_bulk_create_is_not_cached(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                ghosts = staff.get_or_create_many(['Ann', 'Bob'])
+                raise ValueError
+        self.assertIsNone(staff.resolve_one('Ann'))
+        self.assertIsNone(staff.resolve_one(ghosts['Bob'].pk))
+
+    def test_committed_create_is_served_from_the_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            created = staff.get_or_create_staff('Cat')
+        with self.assertNumQueries(0):
+            self.assertEqual(staff.resolve_one(' cat ').pk, created.pk)
+
+    def test_write_from_another_worker_invalidates(self):
+        ann = Staff.objects.create(name='Ann')
+        self.assertEqual(staff.resolve_one('Ann').pk, ann.pk)
+        # as another worker would: rename the row (no signals here), then move the shared stamp
+        Staff.objects.filter(pk=ann.pk).update(name='Annie', name_key='annie')
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(staff.resolve_one('Ann'))
+        versions.bump_for_model('Staff')
+        self.assertIsNone(staff.resolve_one('Ann'))
+
+
+class FaultListTests(GridTestCase):
+
+    def setUp(self):
+        super().setUp()
+        day = datetime.date(2026, 1, 1)
+        FaultReport.objects.bulk_create([
+            FaultReport(title=f'F{i}', description='', date_reported=day - datetime.timedelta(days=i % 7),
+                        location='HQ', severity='low', status='open' if i % 2 else 'closed')
+            for i in range(DEFAULT_PAGE_SIZE + 10)
+        ])
+
+    def test_plain_get_is_the_first_page(self):
+        data = self.client.get('/api/fault-reports/').json()
+        self.assertEqual(len(data['results']), DEFAULT_PAGE_SIZE)
+        rest = self.client.get('/api/fault-reports/', {'cursor': data['next_cursor']}).json()
+        self.assertEqual(len(rest['results']), 10)
+        self.assertIsNone(rest['next_cursor'])
+        ids = [f['id'] for f in data['results'] + rest['results']]
+        self.assertEqual(ids, list(FaultReport.objects.order_by('-date_reported', '-id').values_list('id', flat=True)))
+
+    def test_filters_and_limit(self):
+        data = self.client.get('/api/fault-reports/', {'status': 'open', 'limit': 5}).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual({f['status'] for f in data['results']}, {'open'})
+
+    def test_whole_table_only_on_request(self):
+        data = self.client.get('/api/fault-reports/', {'all': '1'}).json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), DEFAULT_PAGE_SIZE + 10)
+
+    def test_bad_paging_arguments(self):
+        for params in ({'limit': '0'}, {'limit': 'x'}, {'cursor': 'garbage'}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get('/api/fault-reports/', params).status_code, 400)
+
+
+class DashboardTests(GridTestCase):
+
+    def test_snapshot_is_cached_until_a_write_commits(self):
+        self.assertEqual(self.client.get('/api/dashboard/').json()['active_faults'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/dashboard/').json()['active_faults'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_fault(date_reported=datetime.date.today())
+        data = self.client.get('/api/dashboard/').json()
+        self.assertEqual(data['active_faults'], 1)
+        self.assertEqual(data['faults_trend'][-1], 1)
+
+    def test_most_visited_comes_from_the_rollup_window(self):
+        ann = Staff.objects.create(name='Ann')
+        today = datetime.date.today()
+        visits = [('North', 0), ('North', 1), ('South', 2), ('West', 2), ('West', 2), ('West', 30), ('', 0)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for substation, ago in visits:
+                FieldActivity.objects.create(
+                    staff=ann, substation=substation, date=today - datetime.timedelta(days=ago), time_out='08:00',
+                )
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/dashboard/').json()
+        self.assertEqual(data['most_visited_substations'], [
+            {'name': 'North', 'count': 2}, {'name': 'West', 'count': 2}, {'name': 'South', 'count': 1},
+        ])
+        cache.clear()
+        data = self.client.get('/api/dashboard/', {'days': 31}).json()
+        self.assertEqual(data['most_visited_substations'][0], {'name': 'West', 'count': 3})
+
+    def test_days_window(self):
+        self.assertEqual(len(self.client.get('/api/dashboard/', {'days': 3}).json()['dates']), 3)
+        self.assertEqual(len(self.client.get('/api/dashboard/', {'days': 1000}).json()['dates']), 90)
+        self.assertEqual(self.client.get('/api/dashboard/', {'days': 'x'}).status_code, 400)
+
+
+class DailyRecordsExportTests(GridTestCase):
+
+    url = '/api/export/daily-records/csv/'
+
+    def setUp(self):
+        super().setUp()
+        make_fault(title='Pole down', date_reported=datetime.date(2026, 1, 1))
+
+    def test_csv_by_default(self):
+        response = self.client.get(self.url, {'date': '2026-01-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('daily_records_2026-01-01.csv', response['Content-Disposition'])
+        self.assertIn(b'Pole down', b''.join(response.streaming_content))
+
+    def test_xlsx(self):
+        response = self.client.get(self.url, {'date': '2026-01-01', 'format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertIn('Pole down', [c for row in sheet.iter_rows(values_only=True) for c in row])
+
+    def test_unsupported_format_is_a_json_400(self):
+        response = self.client.get(self.url, {'format': 'pdf'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'unsupported format, use csv or xlsx'})
+
+
+class FaultHistoryTests(GridTestCase):
+    """Point-in-time fault states: T0 create, T1 update, T2 checkpoint, T3 update, T4 checkpoint, T5 update."""
+
+    T = [datetime.datetime(2026, 3, 1, 9, tzinfo=datetime.timezone.utc) + datetime.timedelta(hours=h) for h in range(6)]
+
+    def at(self, t):
+        return mock.patch('django.utils.timezone.now', return_value=t)
+
+    def change(self, fault, t, **values):
+        with self.at(t):
+            changes = {}
+            for field, value in values.items():
+                changes[field] = {'old': getattr(fault, field), 'new': value}
+                setattr(fault, field, value)
+            fault.save()
+            audit.record('UPDATE', 'FaultReport', fault.pk, changes=changes)
+
+    def setUp(self):
+        super().setUp()
+        with self.at(self.T[0]):
+            response = self.client.post('/api/fault-reports/', {
+                'title': 'Pole down', 'description': 'Leaning pole', 'date_reported': '2026-03-01',
+                'reported_by': 'Ann', 'location': 'North', 'severity': 'low', 'status': 'open',
+            })
+        self.assertEqual(response.status_code, 201)
+        self.fault = FaultReport.objects.get(pk=response.json()['id'])
+        self.change(self.fault, self.T[1], severity='high')
+        with self.at(self.T[2]):
+            history.snapshot('FaultReport', [self.fault.pk])
+        self.change(self.fault, self.T[3], status='closed')
+        with self.at(self.T[4]):
+            history.snapshot('FaultReport', [self.fault.pk])
+        self.change(self.fault, self.T[5], resolution_remarks='Replaced')
+
+    def state(self, t):
+        return history.state_at('FaultReport', self.fault.pk, t)
+
+    def test_create_logs_the_whole_row(self):
+        entry = AuditLog.objects.get(object_id=self.fault.pk, action='CREATE')
+        self.assertEqual(set(entry.changes), {
+            'title', 'description', 'date_reported', 'reported_by', 'assigned_to', 'location',
+            'severity', 'status', 'resolution_remarks', 'attachment', 'attachment_name',
+        })
+        self.assertEqual(
+            {field: change['new'] for field, change in entry.changes.items()},
+            {**self.state(self.T[0]), 'severity': 'low', 'status': 'open'},
+        )
+        self.assertEqual(entry.changes['reported_by']['new'], 'Ann')
+        self.assertEqual(entry.changes['location']['new'], 'North')
+
+    def test_before_creation(self):
+        self.assertIsNone(self.state(self.T[0] - datetime.timedelta(seconds=1)))
+        # no checkpoint: rolled back from the live row
+        with self.at(self.T[3]):
+            later = make_fault()
+            audit.record('CREATE', 'FaultReport', later.pk, changes=history.creation_changes('FaultReport', later.pk))
+        self.assertIsNone(history.state_at('FaultReport', later.pk, self.T[2]))
+        self.assertEqual(history.state_at('FaultReport', later.pk, self.T[3])['title'], 'Fault')
+        response = self.client.get(f'/api/faults/{self.fault.pk}/history/', {'at': '2026-02-28'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_between_create_and_first_checkpoint(self):
+        state = self.state(self.T[0])
+        self.assertEqual((state['severity'], state['status'], state['description']), ('low', 'open', 'Leaning pole'))
+        self.assertEqual(self.state(self.T[1])['severity'], 'high')
+
+    def test_at_a_checkpoint(self):
+        state = self.state(self.T[2])
+        self.assertEqual((state['severity'], state['status']), ('high', 'open'))
+
+    def test_between_checkpoints(self):
+        self.assertEqual(self.state(self.T[3])['status'], 'closed')
+        self.assertEqual(self.state(self.T[4])['resolution_remarks'], '')
+        self.assertEqual(self.state(self.T[5])['resolution_remarks'], 'Replaced')
+
+    def test_record_without_create_entry_has_no_history(self):
+        untracked = make_fault()
+        self.assertIsNone(history.state_at('FaultReport', untracked.pk, self.T[5]))
+        self.assertEqual([i for i, _ in history.iter_states('FaultReport', self.T[5])], [self.fault.pk])
+
+    def test_deleted_record_is_rebuilt_from_its_create_entry(self):
+        with self.at(self.T[0]):
+            response = self.client.post('/api/fault-reports/', {
+                'title': 'Gone', 'description': '', 'date_reported': '2026-03-01',
+                'reported_by': 'Bob', 'location': 'South', 'severity': 'low', 'status': 'open',
+            })
+        gone = response.json()['id']
+        FaultReport.objects.filter(pk=gone).delete()
+        with self.at(self.T[1]):
+            audit.record('DELETE', 'FaultReport', gone, changes={'deleted': True})
+        state = history.state_at('FaultReport', gone, self.T[0])
+        self.assertEqual((state['title'], state['location'], state['reported_by']), ('Gone', 'South', 'Bob'))
+        self.assertIsNone(history.state_at('FaultReport', gone, self.T[1]))
+
+
+@unittest.skipIf(metrics.prometheus_client is None, 'needs prometheus-client')
+class MetricsTests(GridTestCase):
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get('/api/dashboard/')
+        response = self.client.get('/api/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('gridco_http_request_duration_seconds_count{method="GET",route="api/dashboard/"}', body)
+        self.assertIn('gridco_http_db_queries_sum{method="GET",route="api/dashboard/"}', body)
+        self.assertIn('gridco_http_responses_total{method="GET",route="api/dashboard/",status="200"}', body)
+
+    def test_other_addresses_are_refused(self):
+        self.assertEqual(self.client.get('/api/metrics', REMOTE_ADDR='203.0.113.5').status_code, 403)
+
+    def test_allowed_network(self):
+        with mock.patch.object(metrics, 'METRICS_ALLOWED_IPS', ['10.0.0.0/8']):
+            self.assertEqual(self.client.get('/api/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+            self.assertEqual(self.client.get('/api/metrics').status_code, 403)
+
+    def test_token(self):
+        with mock.patch.object(metrics, 'METRICS_TOKEN', 's3cret'):
+            remote = {'REMOTE_ADDR': '203.0.113.5'}
+            self.assertEqual(self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer s3cret', **remote).status_code, 200)
+            self.assertEqual(self.client.get('/api/metrics', HTTP_AUTHORIZATION='Bearer nope', **remote).status_code, 403)
+
+    def test_gunicorn_marks_exited_workers_dead(self):
+        config = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py'))
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        open(os.path.join(directory, 'counter_1.db'), 'w').close()
+        with mock.patch.dict(os.environ, {'PROMETHEUS_MULTIPROC_DIR': directory}), \
+                mock.patch('prometheus_client.multiprocess.mark_process_dead') as mark_dead:
+            config['on_starting'](None)
+            config['child_exit'](None, mock.Mock(pid=4242))
+        self.assertEqual(os.listdir(directory), [])
+        mark_dead.assert_called_once_with(4242)
+
+
+def read_csv(response):
+    return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+
+class CsvExportTests(GridTestCase):
+
+    def setUp(self):
+        super().setUp()
+        ann = Staff.objects.create(name='Ann')
+        for day in (1, 2, 3):
+            make_fault(title=f'Fault {day}', date_reported=datetime.date(2026, 1, day), reported_by=ann)
+
+    def test_faults_stream_in_chunks(self):
+        with mock.patch.object(exports, 'EXPORT_CHUNK_SIZE', 2):
+            response = self.client.get('/api/export/fault-reports/csv/')
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Disposition'], 'attachment; filename="fault_reports.csv"')
+            rows = read_csv(response)
+        self.assertEqual(rows[0][:5], ['id', 'title', 'description', 'date_reported', 'reported_by'])
+        self.assertEqual(sorted((r[1], r[3], r[4]) for r in rows[1:]), [
+            ('Fault 1', '2026-01-01', 'Ann'), ('Fault 2', '2026-01-02', 'Ann'), ('Fault 3', '2026-01-03', 'Ann'),
+        ])
+
+    def test_xlsx_keeps_dates_typed(self):
+        response = self.client.get('/api/export/fault-reports/csv/', {'format': 'xlsx'})
+        self.assertIn('fault_reports.xlsx', response['Content-Disposition'])
+        rows = list(load_workbook(io.BytesIO(b''.join(response.streaming_content))).active.iter_rows(values_only=True))
+        self.assertEqual(len(rows), 4)
+        self.assertIsInstance(rows[1][3], datetime.datetime)
+
+    def test_weekly_activity_report_window(self):
+        ann = Staff.objects.get(name='Ann')
+        for day in (1, 8, 9):
+            FieldActivity.objects.create(staff=ann, substation=f'S{day}', date=datetime.date(2026, 1, day), time_out='08:00')
+        response = self.client.get('/api/export/activity-reports/weekly/', {'end': '2026-01-08'})
+        self.assertIn('activity_reports_2026-01-02_2026-01-08.csv', response['Content-Disposition'])
+        self.assertEqual([r[2] for r in read_csv(response)[1:]], ['S8'])
+
+    def test_rows_are_flushed_in_batches(self):
+        rows = [[i, datetime.date(2026, 1, 1), None] for i in range(5)]
+        chunks = list(exports._csv_chunks(['n', 'day', 'empty'], rows, batch=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(''.join(chunks).splitlines()[:2], ['n,day,empty', '0,2026-01-01,'])
+
+
+class BulkFaultTests(GridTestCase):
+
+    def post(self, url, body):
+        return self.client.post(url, body, content_type='application/json')
+
+    def faults(self, n, **kwargs):
+        return [make_fault(title=f'F{i}', **kwargs).pk for i in range(n)]
+
+    def update_queries(self, n):
+        ids = self.faults(n)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            self.post('/api/bulk/faults/update/', {'ids': ids, 'updates': {'status': 'closed'}})
+        return len(queries)
+
+    def test_update_results_and_audit_entries(self):
+        ids = self.faults(3)
+        FaultReport.objects.filter(pk=ids[0]).update(status='closed')
+        response = self.post('/api/bulk/faults/update/', {
+            'ids': ids + [999999], 'updates': {'status': 'closed', 'severity': 'low'}, 'user': 'ann',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated_count'], 2)
+        self.assertEqual(response.json()['results'], {
+            str(ids[0]): 'unchanged', str(ids[1]): 'updated', str(ids[2]): 'updated', '999999': 'not_found',
+        })
+        self.assertEqual(set(FaultReport.objects.values_list('status', flat=True)), {'closed'})
+        entries = AuditLog.objects.filter(action='BULK_UPDATE').order_by('object_id')
+        self.assertEqual([e.object_id for e in entries], ids[1:])
+        self.assertEqual(entries[0].changes, {'status': {'old': 'open', 'new': 'closed'}})
+        self.assertEqual(entries[0].user, 'ann')
+
+    def test_update_queries_do_not_grow_with_the_batch(self):
+        self.assertEqual(self.update_queries(3), self.update_queries(30))
+
+    def test_invalid_updates(self):
+        ids = self.faults(1)
+        self.assertEqual(self.post('/api/bulk/faults/update/', {'ids': ids, 'updates': {'title': 'x'}}).status_code, 400)
+        self.assertEqual(self.post('/api/bulk/faults/update/', {'ids': ['a'], 'updates': {'status': 'x'}}).status_code, 400)
+
+    def test_update_is_all_or_nothing(self):
+        ids = self.faults(3)
+        with mock.patch.object(AuditLog.objects, 'bulk_create', side_effect=OperationalError('disk full')):
+            response = self.post('/api/bulk/faults/update/', {'ids': ids, 'updates': {'status': 'closed'}})
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(set(FaultReport.objects.values_list('status', flat=True)), {'open'})
+
+    def test_delete(self):
+        ids = self.faults(2)
+        response = self.post('/api/bulk/faults/delete/', {'ids': ids + [999999], 'user': 'ann'})
+        self.assertEqual(response.json()['deleted_count'], 2)
+        self.assertEqual(response.json()['results']['999999'], 'not_found')
+        self.assertFalse(FaultReport.objects.exists())
+        self.assertEqual(
+            sorted(AuditLog.objects.filter(action='DELETE').values_list('object_id', flat=True)), sorted(ids),
+        )
+
+
+class StaffResolverTests(GridTestCase):
+
+    def test_mixed_references_cost_one_query(self):
+        ann = Staff.objects.create(name='Ann Lee')
+        bob = Staff.objects.create(name='Bob')
+        numbered = Staff.objects.create(name='4242')
+        with self.assertNumQueries(1):
+            found = staff.resolve_staff([ann.pk, str(bob.pk), '  ANN   lee ', '4242', 'nobody', None])
+        self.assertEqual(found, {ann.pk: ann, str(bob.pk): bob, '  ANN   lee ': ann, '4242': numbered, 'nobody': None})
+        # the second time round everything known comes from the cache
+        with self.assertNumQueries(0):
+            staff.resolve_staff([ann.pk, 'ann lee'])
+
+    def test_bulk_assignment_resolves_the_assignee_once(self):
+        ann = Staff.objects.create(name='Ann')
+        ids = [make_fault().pk for _ in range(4)]
+        with mock.patch('backend.bulk.resolve_one', wraps=staff.resolve_one) as resolve:
+            response = self.client.post(
+                '/api/bulk/faults/update/', {'ids': ids, 'updates': {'assigned_to': 'ann'}}, content_type='application/json',
+            )
+        self.assertEqual(response.json()['updated_count'], 4)
+        resolve.assert_called_once_with('ann')
+        self.assertEqual(set(FaultReport.objects.values_list('assigned_to', flat=True)), {ann.pk})
+
+    def test_unknown_assignee_leaves_assignments_alone(self):
+        ann = Staff.objects.create(name='Ann')
+        fault = make_fault(assigned_to=ann)
+        response = self.client.post(
+            '/api/bulk/faults/update/', {'ids': [fault.pk], 'updates': {'assigned_to': 'Nobody', 'status': 'closed'}},
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['results'], {str(fault.pk): 'updated'})
+        fault.refresh_from_db()
+        self.assertEqual((fault.assigned_to, fault.status), (ann, 'closed'))
+
+
+class ChunkedUploadTests(GridTestCase):
+
+    data = b'%PDF-1.4 chunked upload body'
+
+    def setUp(self):
+        super().setUp()
+        self.fault = make_fault()
+
+    def start(self, filename='report.pdf', size=None):
+        return self.client.post(
+            f'/api/faults/{self.fault.pk}/uploads/', {'filename': filename, 'size': size or len(self.data), 'user': 'ann'},
+            content_type='application/json',
+        )
+
+    def put(self, upload, body, offset=None, **headers):
+        url = f'/api/uploads/{upload}/' + ('' if offset is None else f'?offset={offset}')
+        return self.client.put(url, body, content_type='application/octet-stream', **headers)
+
+    def test_resumable_upload(self):
+        upload = self.start().json()['id']
+        self.assertEqual(self.put(upload, self.data[:10], offset=0).json()['received'], 10)
+        # a gap is refused and reports where to resume
+        response = self.put(upload, self.data[15:], offset=15)
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.json()['received'], 10)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload}/').json()['received'], 10)
+        # resending an overlapping chunk is harmless
+        self.assertEqual(self.put(upload, self.data[5:12], offset=5).json()['received'], 12)
+        response = self.put(upload, self.data[12:], HTTP_CONTENT_RANGE=f'bytes 12-{len(self.data) - 1}/{len(self.data)}')
+        self.assertTrue(response.json()['complete'])
+
+        response = self.client.post(f'/api/uploads/{upload}/complete/')
+        self.assertEqual(response.status_code, 200)
+        self.fault.refresh_from_db()
+        self.assertEqual(self.fault.attachment_name, 'report.pdf')
+        with self.fault.attachment.open('rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertEqual(os.listdir(upload_views.UPLOAD_TEMP_DIR), [])
+        entry = AuditLog.objects.get(object_id=self.fault.pk, action='UPDATE')
+        self.assertEqual(entry.changes['attachment']['new'], self.fault.attachment.name)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload}/').status_code, 404)
+
+    def test_incomplete_upload_cannot_complete(self):
+        upload = self.start().json()['id']
+        self.put(upload, self.data[:4], offset=0)
+        self.assertEqual(self.client.post(f'/api/uploads/{upload}/complete/').status_code, 409)
+        self.fault.refresh_from_db()
+        self.assertFalse(self.fault.attachment)
+
+    def test_chunk_past_the_announced_size(self):
+        upload = self.start(size=4).json()['id']
+        self.assertEqual(self.put(upload, self.data, offset=0).status_code, 400)
+
+    def test_announced_file_is_validated(self):
+        self.assertEqual(self.start(filename='run.exe').status_code, 400)
+        self.assertEqual(self.start(size=11 * 1024 * 1024).status_code, 400)
+
+    def test_cancel(self):
+        upload = self.start().json()['id']
+        self.assertEqual(self.client.delete(f'/api/uploads/{upload}/').status_code, 200)
+        self.assertEqual(os.listdir(upload_views.UPLOAD_TEMP_DIR), [])
+
+
+def attach(fault, data, name='notes.pdf'):
+    fault.attachment.save(name, ContentFile(data), save=False)
+    fault.attachment_name = name
+    fault.save()
+    return fault
+
+
+class AttachmentDeliveryTests(GridTestCase):
+
+    data = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.fault = attach(make_fault(), self.data)
+        self.url = f'/api/faults/{self.fault.pk}/attachment/'
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_whole_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.data)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertIn('notes.pdf', response['Content-Disposition'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.data)}')
+        self.assertEqual(self.body(response), self.data[10:20])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(self.body(response), self.data[-5:])
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+
+    def test_if_range(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(self.body(stale), self.data)
+
+    def test_offload_to_nginx(self):
+        with mock.patch.object(file_delivery, 'ATTACHMENT_OFFLOAD', 'x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.fault.attachment.name)
+        self.assertEqual(response.content, b'')
+
+    def test_parse_range(self):
+        self.assertEqual(file_delivery.parse_range('bytes=0-', 10), (0, 9))
+        self.assertEqual(file_delivery.parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(file_delivery.parse_range('bytes=-20', 10), (0, 9))
+        self.assertIsNone(file_delivery.parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(file_delivery.parse_range('lines=1-2', 10))
+        self.assertFalse(file_delivery.parse_range('bytes=7-3', 10))
+        self.assertFalse(file_delivery.parse_range('bytes=-0', 10))
+
+
+class AttachmentStoreTests(GridTestCase):
+
+    def stored_files(self):
+        root = attachment_storage().path('cas')
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    def test_identical_bytes_are_stored_once(self):
+        first = attach(make_fault(), b'same photo', 'pole.jpg')
+        second = attach(make_fault(), b'same photo', 'POLE-copy.JPG')
+        other = attach(make_fault(), b'another photo', 'pole.jpg')
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertRegex(first.attachment.name, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertNotEqual(first.attachment.name, other.attachment.name)
+        self.assertEqual(len(self.stored_files()), 2)
+        # each fault keeps the name it was uploaded under
+        self.assertEqual(second.attachment_name, 'POLE-copy.JPG')
+
+    def test_bytes_are_released_with_the_last_reference(self):
+        first = attach(make_fault(), b'same photo', 'pole.jpg')
+        second = attach(make_fault(), b'same photo', 'pole.jpg')
+        name = first.attachment.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(attachment_storage().exists(name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(attachment_storage().exists(name))
+
+    def test_release_is_undone_by_a_rollback(self):
+        fault = attach(make_fault(), b'kept photo', 'pole.jpg')
+        name = fault.attachment.name
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                release_attachment(name, exclude_pk=fault.pk)
+                raise ValueError
+        self.assertTrue(attachment_storage().exists(name))
+
+
+def png_bytes(size=(1200, 800), mode='RGBA'):
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else 0).save(out, 'PNG')
+    return out.getvalue()
+
+
+class _InlineExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@unittest.skipUnless(renditions.available(), 'needs Pillow')
+class RenditionTests(GridTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fault = attach(make_fault(), png_bytes(), 'pole.png')
+        self.url = f'/api/faults/{self.fault.pk}/attachment/'
+
+    def image(self, response):
+        from PIL import Image
+
+        return Image.open(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_variants_are_scaled_jpegs(self):
+        for variant, bound in (('thumb', 320), ('web', 1600)):
+            with self.subTest(variant):
+                response = self.client.get(self.url, {'variant': variant})
+                self.assertEqual(response['Content-Type'], 'image/jpeg')
+                self.assertIn(f'pole-{variant}.jpg', response['Content-Disposition'])
+                image = self.image(response)
+                self.assertEqual(image.format, 'JPEG')
+                self.assertEqual(max(image.size), min(bound, 1200))
+        self.assertEqual(self.client.get(self.url, {'variant': 'huge'}).status_code, 400)
+
+    def test_scheduled_after_commit_and_removed_with_the_original(self):
+        with mock.patch.object(renditions, '_executor', _InlineExecutor()), \
+                self.captureOnCommitCallbacks(execute=True):
+            fault = attach(make_fault(), png_bytes((64, 64), 'L'), 'small.png')
+        name = fault.attachment.name
+        names = [renditions.rendition_name(name, v) for v in renditions.RENDITIONS]
+        self.assertTrue(all(renditions.rendition_storage.exists(n) for n in names))
+        with self.captureOnCommitCallbacks(execute=True):
+            fault.delete()
+        self.assertFalse(any(renditions.rendition_storage.exists(n) for n in names))
+
+    def test_undecodable_image_falls_back_to_the_original(self):
+        broken = attach(make_fault(), b'not really a png', 'broken.png')
+        with self.assertLogs('gridapp.renditions', 'ERROR'):
+            response = self.client.get(f'/api/faults/{broken.pk}/attachment/', {'variant': 'thumb'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'not really a png')
+
+    def test_non_images_are_served_as_they_are(self):
+        pdf = attach(make_fault(), b'%PDF-1.4', 'notes.pdf')
+        response = self.client.get(f'/api/faults/{pdf.pk}/attachment/', {'variant': 'thumb'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+class AsyncReadViewTests(GridTestCase):
+    """The ASGI read views answer exactly what the sync views do."""
+
+    def setUp(self):
+        super().setUp()
+        ann = Staff.objects.create(name='Ann')
+        today = datetime.date.today()
+        for i in range(3):
+            make_fault(title=f'F{i}', date_reported=today, reported_by=ann)
+            ServerRoomEntry.objects.create(staff=ann, date=today, time_in='09:00', reason=f'R{i}', supervisor='Sam')
+            FieldActivity.objects.create(staff=ann, substation=f'S{i}', date=today, time_out='08:00')
+
+    async def assertSameAsSync(self, name, path, *args):
+        cache.clear()
+        expected = await sync_to_async(getattr(views, name))(RequestFactory().get(path), *args)
+        cache.clear()
+        response = await getattr(async_views, name)(AsyncRequestFactory().get(path), *args)
+        self.assertEqual(response.status_code, expected.status_code, path)
+        self.assertEqual(response.content, expected.content, path)
+        return response
+
+    async def test_same_payloads(self):
+        fault = await FaultReport.objects.afirst()
+        for name, path, args in (
+            ('server_room', '/api/server-room/', ()),
+            ('field_activities', '/api/field-activities/', ()),
+            ('fault_reports', '/api/fault-reports/?limit=2', ()),
+            ('fault_reports', '/api/fault-reports/?all=1&severity=low', ()),
+            ('fault_reports', '/api/fault-reports/?cursor=bad', ()),
+            ('dashboard', '/api/dashboard/?days=3', ()),
+            ('get_fault_feedbacks', f'/api/fault-feedbacks/{fault.pk}/', (fault.pk,)),
+        ):
+            with self.subTest(path):
+                await self.assertSameAsSync(name, path, *args)
+
+    async def test_cached_response_is_revalidated(self):
+        response = await async_views.server_room(AsyncRequestFactory().get('/api/server-room/'))
+        again = await async_views.server_room(
+            AsyncRequestFactory().get('/api/server-room/', headers={'If-None-Match': response['ETag']}),
+        )
+        self.assertEqual(again.status_code, 304)
+
+    async def test_daily_records_needs_a_token(self):
+        request = AsyncRequestFactory().get('/api/daily-records/')
+        self.assertEqual((await async_views.daily_records(request)).status_code, 401)
+        user = await User.objects.acreate(username='ann')
+        token = str(AccessToken.for_user(user))
+        request = AsyncRequestFactory().get('/api/daily-records/', headers={'Authorization': f'Bearer {token}'})
+        data = json.loads((await async_views.daily_records(request)).content)
+        self.assertEqual(
+            (len(data['server_room_entries']), len(data['field_activities']), len(data['faults'])), (3, 3, 3),
+        )
+
+    async def test_writes_go_to_the_sync_view(self):
+        request = AsyncRequestFactory().delete('/api/server-room/')
+        self.assertEqual((await async_views.server_room(request)).status_code, 405)
+
+
+class JobTests(GridTestCase):
+    """Jobs are queued by the endpoints and executed by claim/run as ``run_jobs`` does."""
+
+    def setUp(self):
+        super().setUp()
+        # run() recycles connections like a pool worker; the test's must survive
+        self.enterContext(mock.patch.object(jobs, 'close_old_connections'))
+
+    def run_queued(self):
+        return [jobs.run(job_id) for job_id in jobs.claim(10)]
+
+    def test_background_export_runs_and_downloads(self):
+        make_fault(title='Pole down')
+        response = self.client.get('/api/export/fault-reports/csv/?background=1')
+        self.assertEqual(response.status_code, 202)
+        status_url = response['Location']
+        self.assertEqual(self.client.get(status_url + 'download/').status_code, 409)
+
+        self.assertEqual(self.run_queued(), ['succeeded'])
+        job = self.client.get(status_url).json()
+        self.assertEqual((job['status'], job['progress']), ('succeeded', {'done': 1, 'total': 1}))
+        self.assertEqual(job['result'], {'rows': 1, 'filename': 'fault_reports.csv'})
+        rows = read_csv(self.client.get(job['download_url']))
+        self.assertEqual(rows[1][1], 'Pole down')
+
+    def test_bulk_update_job_reports_per_id_results(self):
+        ids = [make_fault(title=f'F{i}').pk for i in range(2)]
+        response = self.client.post('/api/jobs/', {
+            'kind': 'bulk_update_faults', 'params': {'ids': ids + [999999], 'updates': {'status': 'closed'}},
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.run_queued(), ['succeeded'])
+        result = self.client.get(response['Location']).json()['result']
+        self.assertEqual(result['updated_count'], 2)
+        self.assertEqual(result['results']['999999'], 'not_found')
+        self.assertEqual(set(FaultReport.objects.values_list('status', flat=True)), {'closed'})
+
+    def test_invalid_submissions(self):
+        for body in ({'kind': 'nope'}, {'kind': 'bulk_delete_faults', 'params': {'ids': ['a']}},
+                     {'kind': 'export', 'params': {'source': 'faults', 'start': 'soon'}}):
+            with self.subTest(body):
+                response = self.client.post('/api/jobs/', body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_each_job_is_claimed_once(self):
+        job = jobs.submit('bulk_delete_faults', {'ids': [1]})
+        self.assertEqual(jobs.claim(5), [job.pk])
+        self.assertEqual(jobs.claim(5), [])
+
+    def test_cancelled_job_stops_at_its_next_progress_update(self):
+        fault = make_fault()
+        job = jobs.submit('bulk_delete_faults', {'ids': [fault.pk]})
+        jobs.claim(1)
+        response = self.client.delete(f'/api/jobs/{job.pk}/')
+        self.assertEqual(response.json()['status'], 'cancelled')
+        self.assertEqual(jobs.run(job.pk), 'cancelled')
+        self.assertTrue(FaultReport.objects.filter(pk=fault.pk).exists())
+
+    def test_handler_errors_fail_the_job(self):
+        job = jobs.submit('export', {'source': 'faults'})
+        Job.objects.filter(pk=job.pk).update(params={'source': 'gone'})
+        self.assertEqual(self.run_queued(), ['failed'])
+        job.refresh_from_db()
+        self.assertIn('KeyError', job.error)
+
+    def test_stale_jobs_are_requeued_and_old_ones_purged(self):
+        stale = jobs.submit('bulk_delete_faults', {'ids': [1]})
+        done = jobs.submit('bulk_delete_faults', {'ids': [2]})
+        long_ago = timezone.now() - datetime.timedelta(days=30)
+        Job.objects.filter(pk=stale.pk).update(status='running', updated_at=long_ago)
+        Job.objects.filter(pk=done.pk).update(status='succeeded', finished_at=long_ago)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.purge(), 1)
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), ['queued'])
+
+
+class IngestTests(GridTestCase):
+
+    def entry(self, staff='Ann', **kwargs):
+        return {'staff': staff, 'date': '2026-01-05', 'time_in': '09:00', 'time_out': None, 'reason': 'patching',
+                'equipment_touched': '', 'supervisor': 'Sam', **kwargs}
+
+    def post(self, url, rows):
+        return self.client.post(url, rows, content_type='application/json')
+
+    def test_per_row_results(self):
+        Staff.objects.create(name='Ann')
+        response = self.post('/api/bulk/server-room/', [
+            self.entry(), self.entry(date='5th'), self.entry('Bob'), 'nope', {'staff': 'Ann'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 3))
+        results = body['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'invalid', 'created', 'invalid', 'invalid'])
+        self.assertEqual([r['index'] for r in results], list(range(5)))
+        self.assertEqual(list(results[1]['errors']), ['date'])
+        self.assertEqual(results[3]['errors'], {'row': 'expected an object'})
+        self.assertEqual(results[4]['errors']['time_in'], 'missing field')
+        self.assertEqual(
+            list(ServerRoomEntry.objects.filter(pk__in=[results[0]['id'], results[2]['id']])
+                 .order_by('pk').values_list('staff__name', flat=True)),
+            ['Ann', 'Bob'],
+        )
+        self.assertEqual(Staff.objects.filter(name='Ann').count(), 1)
+
+    def test_ndjson_body(self):
+        lines = [json.dumps({'staff_id': 'S1', 'name': 'Visitor', 'purpose': 'audit', 'time_in': '10:00'}),
+                 '', '{not json', json.dumps({'staff_id': 'S2', 'name': '', 'purpose': '', 'time_in': '11:00'})]
+        response = self.client.post('/api/bulk/server-room-visitors/', '\n'.join(lines),
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'invalid', 'invalid'])
+        self.assertEqual(results[1]['errors'], {'row': 'invalid json'})
+        self.assertEqual(results[2]['errors'], {'name': 'may not be blank'})
+        self.assertEqual(ServerRoomVisitor.objects.get().date, datetime.date.today())
+
+    def test_rejected_batches(self):
+        self.assertEqual(self.post('/api/bulk/field-activities/', []).status_code, 400)
+        self.assertEqual(self.post('/api/bulk/field-activities/', {'staff': 'Ann'}).status_code, 400)
+        self.assertEqual(self.post('/api/bulk/server-room/', [self.entry(date='bad')]).status_code, 400)
+        with mock.patch.object(ingest, 'INGEST_MAX_ROWS', 2):
+            self.assertEqual(self.post('/api/bulk/server-room/', [self.entry()] * 3).status_code, 413)
+        self.assertFalse(ServerRoomEntry.objects.exists())
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        def queries(prefix, n):
+            rows = [{'staff': f'{prefix}{i}', 'substation': 'Sub', 'date': '2026-01-05', 'time_out': '08:00',
+                     'time_returned': None, 'purpose': '', 'work_done': '', 'materials_used': '',
+                     'supervisor_approval': ''} for i in range(n)]
+            with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.post('/api/bulk/field-activities/', rows).status_code, 201)
+            return len(captured)
+        queries('W', 1)  # the day's rollup row exists from here on
+        self.assertEqual(queries('A', 3), queries('B', 30))
+        self.assertEqual(FieldActivity.objects.count(), 34)
+
+
+class SearchTests(GridTestCase):
+
+    def fault(self, title, description='', **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_fault(title=title, description=description, **kwargs)
+
+    def search(self, query, **params):
+        response = self.client.get('/api/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, query, **params):
+        return [(r['type'], r['id']) for r in self.search(query, **params)['results']]
+
+    def test_title_matches_rank_first(self):
+        in_body = self.fault('Outage at depot', 'the transformer tripped')
+        in_title = self.fault('Transformer overheating', 'oil leak')
+        self.fault('Broken gate')
+        self.assertEqual(search._backend(), 'fts5')
+        self.assertEqual(self.ids('transformer'), [('fault', in_title.pk), ('fault', in_body.pk)])
+
+    def test_every_word_must_match_and_the_last_is_a_prefix(self):
+        both = self.fault('Transformer oil leak')
+        self.fault('Transformer fan noise')
+        self.assertEqual(self.ids('transformer le'), [('fault', both.pk)])
+
+    def test_sources_and_type_filter(self):
+        staff = Staff.objects.create(name='Ann')
+        fault = self.fault('Cable fault', 'cable cut')
+        with self.captureOnCommitCallbacks(execute=True):
+            activity = FieldActivity.objects.create(staff=staff, substation='North', date=datetime.date.today(),
+                                                    time_out='08:00', work_done='spliced the cable')
+            entry = ServerRoomEntry.objects.create(staff=staff, date=datetime.date.today(), time_in='09:00',
+                                                   reason='cable management')
+        self.assertEqual(set(self.ids('cable')), {
+            ('fault', fault.pk), ('field_activity', activity.pk), ('server_room', entry.pk),
+        })
+        self.assertEqual(set(self.ids('cable', type='server_room,field_activity')),
+                         {('field_activity', activity.pk), ('server_room', entry.pk)})
+
+    def test_edits_and_deletes_follow_the_rows(self):
+        fault = self.fault('Relay chatter')
+        with self.captureOnCommitCallbacks(execute=True):
+            fault.title = 'Breaker chatter'
+            fault.save()
+        self.assertEqual(self.ids('relay'), [])
+        self.assertEqual(self.ids('breaker'), [('fault', fault.pk)])
+        with self.captureOnCommitCallbacks(execute=True):
+            fault.delete()
+        self.assertEqual(self.ids('breaker'), [])
+
+    def test_cursor_pages_through_every_match_once(self):
+        faults = {self.fault(f'Pylon {"rust " * (i % 3)}{i}').pk for i in range(7)}
+        seen, params = [], {'limit': 3}
+        while True:
+            page = self.search('pylon', **params)
+            seen += [r['id'] for r in page['results']]
+            if not page['next_cursor']:
+                break
+            params['cursor'] = page['next_cursor']
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(set(seen), faults)
+
+    def test_query_syntax_is_escaped(self):
+        fault = self.fault('Meter NEAR substation')
+        for query in ('"meter', 'meter OR', 'NEAR(meter', 'meter* -x', "meter'); DROP TABLE x; --"):
+            with self.subTest(query):
+                self.search(query)
+        self.assertEqual(self.ids('meter near'), [('fault', fault.pk)])
+
+    def test_bad_requests(self):
+        for params in ({'q': ''}, {'q': '*()"'}, {'q': 'x', 'type': 'staff'}, {'q': 'x', 'cursor': 'junk'}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get('/api/search/', params).status_code, 400)
+
+
+class AuditLogViewTests(GridTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.start = datetime.datetime(2026, 3, 1, tzinfo=datetime.timezone.utc)
+        for i, user in enumerate(['ann', 'anna', 'bob', 'Ann', 'ann']):
+            AuditLog.objects.create(action='UPDATE', model_name='FaultReport', object_id=i, user=user,
+                                    timestamp=self.start + datetime.timedelta(days=i))
+
+    def get(self, **params):
+        response = self.client.get('/api/audit-log/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def objects(self, **params):
+        return [row['object_id'] for row in self.get(**params)]
+
+    def test_user_filters_are_exact_or_prefix(self):
+        self.assertEqual(self.objects(user='ann'), [4, 0])
+        self.assertEqual(self.objects(user_prefix='ann'), [4, 1, 0])
+        self.assertEqual(self.objects(user_prefix='Ann'), [3])
+
+    def test_user_filters_use_the_user_index(self):
+        plan = views._audit_queryset({'user': 'ann'}).order_by('-timestamp', '-id').explain()
+        self.assertIn('(user=?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+        # a prefix spans several users, so only the matching rows are sorted
+        plan = views._audit_queryset({'user_prefix': 'ann'}).order_by('-timestamp', '-id').explain()
+        self.assertIn('(user>? AND user<?)', plan)
+
+    def test_time_window(self):
+        self.assertEqual(self.objects(since='2026-03-02', until='2026-03-04'), [2, 1])
+        self.assertEqual(self.objects(since='2026-03-03T12:00:00+00:00'), [4, 3])
+        self.assertEqual(self.objects(until='2026-03-01'), [])
+
+    def test_cursor_pages_break_timestamp_ties(self):
+        AuditLog.objects.update(timestamp=self.start)
+        expected = list(AuditLog.objects.order_by('-id').values_list('id', flat=True))
+        seen, cursor = [], ''
+        while cursor is not None:
+            page = self.get(cursor=cursor, limit=2)
+            self.assertLessEqual(len(page['results']), 2)
+            seen += [row['id'] for row in page['results']]
+            cursor = page['next_cursor']
+        self.assertEqual(seen, expected)
+
+    def test_plain_list_is_limited(self):
+        rows = self.get(limit=2)
+        self.assertEqual([row['object_id'] for row in rows], [4, 3])
+        self.assertEqual(set(rows[0]), set(views.AUDIT_LOG_FIELDS))
+
+    def test_ndjson_streams_every_match(self):
+        response = self.client.get('/api/audit-log/', {'format': 'ndjson', 'user_prefix': 'an', 'limit': 1})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['object_id'] for line in lines], [4, 1, 0])
+
+    def test_bad_parameters(self):
+        for params in ({'since': 'yesterday'}, {'object_id': 'x'}, {'cursor': 'junk'},
+                       {'cursor': encode_cursor(['not a time', 1])}):
+            with self.subTest(params):
+                self.assertEqual(self.client.get('/api/audit-log/', params).status_code, 400)
+
+
+class BenchmarkTests(GridTestCase):
+
+    def test_scales(self):
+        self.assertEqual(bench_endpoints.parse_scale('100K'), 100_000)
+        self.assertEqual(bench_endpoints.parse_scale('250'), 250)
+        for value in ('10', 'lots'):
+            with self.subTest(value), self.assertRaises(CommandError):
+                bench_endpoints.parse_scale(value)
+
+    def test_every_route_has_a_case_or_a_reason(self):
+        ctx = dict.fromkeys(['fault_id', 'attachment_fault_id', 'feedback_fault_id', 'job_id', 'upload_id'], 1)
+        covered = {case[1] for case in bench_endpoints.cases({**ctx, 'fault_ids': [1]})}
+        self.assertEqual([r for r in bench_endpoints._routes() if r not in covered | set(bench_endpoints.SKIPPED)], [])
+
+    def test_seeded_run_answers_every_case(self):
+        bench_endpoints.seed(100, lambda message: None)
+        self.assertEqual(FaultReport.objects.count(), 100)
+        command = bench_endpoints.Command(stdout=io.StringIO(), stderr=io.StringIO())
+        results = command._run_cases({'only': None, 'warmup': 0, 'repeat': 2})
+        self.assertEqual(set(results), {case[0] for case in bench_endpoints.cases(command._context())})
+        self.assertEqual(results['fault-reports page']['status'], 200)
+        self.assertGreater(results['fault-reports page']['queries'], 0)
+        # the rolled-back writes leave the seeded rows as they were
+        self.assertEqual(FaultReport.objects.count(), 100)
+
+    def compare(self, now, before, **options):
+        paths = []
+        for data in (now, before):
+            fd, path = tempfile.mkstemp(suffix='.json')
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(data, fh)
+            self.addCleanup(os.remove, path)
+            paths.append(path)
+        out = io.StringIO()
+        call_command('bench_endpoints', results=paths[0], compare=paths[1], stdout=out, stderr=io.StringIO(),
+                     **options)
+        return out.getvalue()
+
+    def results(self, p95=10.0, queries=3, status=200, peak=100_000, label='dashboard'):
+        return {
+            'meta': {'rows': 1000, 'scale': '1k', 'peak_rss_kb': peak},
+            'endpoints': {label: {'status': status, 'queries': queries, 'p95_ms': p95}},
+        }
+
+    def test_compare_flags_regressions(self):
+        for now in (self.results(p95=20.0), self.results(queries=4), self.results(status=500),
+                    self.results(peak=200_000)):
+            with self.subTest(now), self.assertRaises(CommandError):
+                self.compare(now, self.results())
+
+    def test_compare_tolerates_noise(self):
+        self.assertIn('No regressions', self.compare(self.results(p95=11.0), self.results()))
+        # past the threshold but under --min-ms
+        self.assertIn('No regressions', self.compare(self.results(p95=1.5), self.results(p95=1.0)))
+        out = self.compare(self.results(p95=4.0, label='search'), self.results())
+        self.assertIn('new       search', out)
+        self.assertIn('missing   dashboard', out)
+        self.assertIn('faster', self.compare(self.results(p95=5.0), self.results()))
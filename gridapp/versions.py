@@ -0,0 +1,51 @@
+"""Per-resource version stamps used for HTTP validators and response caching.
+
+A resource's version is the ``time.time_ns()`` of its last recorded write,
+kept in the default cache so every worker sharing that cache sees the same
+value. A missing stamp (fresh or evicted cache) is re-seeded with the current
+time, so versions never move backwards.
+"""
+import time
+
+from django.core.cache import cache
+
+
+# model name -> API resources whose payloads include that model's rows
+MODEL_RESOURCES = {
+    'ServerRoomEntry': ('server_room',),
+    'ServerRoomVisitor': ('server_room_visitors',),
+    'FieldActivity': ('field_activities', 'activity_reports'),
+    'FaultReport': ('fault_reports',),
+    # staff names are embedded in entries, activities and faults; 'staff' guards the
+    # per-worker lookup cache in gridapp/staff.py
+    'Staff': ('staff', 'server_room', 'field_activities', 'activity_reports', 'fault_reports'),
+}
+
+
+def _key(resource):
+    return f'resource-version:{resource}'
+
+
+def get_versions(resources):
+    """Return the current version stamp of each resource, in order."""
+    keys = [_key(r) for r in resources]
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    if missing:
+        now = time.time_ns()
+        for k in missing:
+            cache.add(k, now, None)
+        found.update(cache.get_many(missing))
+    return [found.get(k, 0) for k in keys]
+
+
+def bump(*resources):
+    """Record a write to ``resources``, invalidating their validators and cached responses."""
+    now = time.time_ns()
+    cache.set_many({_key(r): now for r in resources}, None)
+
+
+def bump_for_model(model_name):
+    resources = MODEL_RESOURCES.get(model_name)
+    if resources:
+        bump(*resources)
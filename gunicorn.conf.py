@@ -0,0 +1,27 @@
+"""Gunicorn settings: ``gunicorn -c gunicorn.conf.py backend.wsgi``.
+
+With ``PROMETHEUS_MULTIPROC_DIR`` set (see backend/metrics.py), the directory
+is emptied when the server starts and a worker's files are marked dead when
+it exits, so restarted workers do not leave stale live samples behind.
+"""
+import glob
+import os
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+
+def on_starting(server):
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)